@@ -1,6 +1,7 @@
 from .src.sapphirerenderer.utility_objects.particle_manager import ParticleManager
 from .src.sapphirerenderer.utility_objects.camera import Camera
 from .src.sapphirerenderer.main import SapphireRenderer
+from .src.sapphirerenderer.batch_render import render_batch
 
 from .src.sapphirerenderer.object_classes.base_object import Object
 from .src.sapphirerenderer.object_classes.flat_faces_object import FlatFacesObject
@@ -0,0 +1,135 @@
+import os
+import signal
+import multiprocessing
+import numpy as np
+import pygame
+from .main import SapphireRenderer
+from .utility_objects.camera import Camera
+from .utility_objects.scene_buffer import SceneBuffer
+from .utility_objects.shared_scene_buffer import SharedSceneBuffer, share_scene_buffer
+
+# the headless renderer of a worker process, made once by _init_worker
+_worker_renderer = None
+
+
+def _stop_worker(signum, frame):
+    os._exit(1)
+
+
+def _init_worker(block_name, layout, settings, objects):
+    """
+    Build the headless renderer of a worker process around the shared scene
+    :param block_name: the name of the shared memory block with the compiled scene
+    :param layout: the layout of the arrays in the block
+    :param settings: the settings of the renderer the scene comes from
+    :param objects: the objects that are not compiled, they are drawn one by one like in the render loop
+    :return:
+    """
+    global _worker_renderer
+
+    width, height = settings["display_size"]
+    renderer = SapphireRenderer(width, height, headless=True)
+    renderer.render_backend = settings["render_backend"]
+    renderer.far_distance = settings["far_distance"]
+    renderer.damage_tracking = False
+    renderer.scene_buffer = SharedSceneBuffer(
+        block_name, layout, *settings["scene"], stats=renderer.frame_stats
+    )
+
+    for obj in objects:
+        renderer.direct_add_object(obj)
+
+    # pygame turns SIGTERM into a quit event unless a handler is set, the pool needs it to stop its workers
+    signal.signal(signal.SIGTERM, _stop_worker)
+
+    _worker_renderer = renderer
+
+
+def _render_task(task):
+    """
+    Render one frame in a worker process and save it
+    :param task: (camera position, camera rotation, camera fov, path of the image)
+    :return: the path of the image
+    """
+    position, rotation, fov, path = task
+    renderer = _worker_renderer
+
+    camera = Camera(
+        renderer,
+        position=np.array(position, dtype=float),
+        rotation=np.array(rotation, dtype=float),
+        fov=fov,
+    )
+    renderer.render_frame(camera)
+    pygame.image.save(renderer.display, path)
+
+    return path
+
+
+def render_batch(
+    renderer, cameras, output_dir, file_name="frame_{:05d}.png", processes=None
+):
+    """
+    Render a static scene from many cameras on a pool of headless worker processes.
+    The compiled objects are put in shared memory once, only the camera poses are sent per frame.
+    Worker processes are spawned, so scripts calling this need an if __name__ == "__main__" guard
+    :param renderer: the renderer with the scene, its objects must not change while rendering
+    :param cameras: the cameras to render from, one image per camera
+    :param output_dir: the directory to write the images to
+    :param file_name: the file name of every image, formatted with the index of its camera
+    :param processes: the number of worker processes, defaults to the number of cores
+    :return: the paths of the images in the order of the cameras
+    """
+    os.makedirs(output_dir, exist_ok=True)
+
+    # compile every object without culling so any camera can be drawn from the buffer
+    scene_buffer = SceneBuffer(
+        renderer.scene_buffer.tile_size,
+        renderer.scene_buffer.threads,
+        renderer.scene_buffer.face_culling,
+        renderer.scene_buffer.min_face_area,
+    )
+    objects = list(renderer.instance_objects)
+    scene_buffer.sync([obj for obj in objects if obj.compile_verts])
+
+    settings = {
+        "display_size": renderer.display_size,
+        "render_backend": renderer.render_backend,
+        "far_distance": renderer.far_distance,
+        "scene": (
+            scene_buffer.tile_size,
+            scene_buffer.threads,
+            scene_buffer.face_culling,
+            scene_buffer.min_face_area,
+        ),
+    }
+    other_objects = [obj for obj in objects if not obj.compile_verts]
+
+    tasks = [
+        (
+            tuple(np.ravel(camera.position)),
+            tuple(np.ravel(camera.rotation)),
+            camera.fov,
+            os.path.join(output_dir, file_name.format(i)),
+        )
+        for i, camera in enumerate(cameras)
+    ]
+
+    block, layout = share_scene_buffer(scene_buffer)
+    try:
+        # fork would copy the render thread and pygame state of this process, so start clean processes
+        context = multiprocessing.get_context("spawn")
+        with context.Pool(
+            processes,
+            initializer=_init_worker,
+            initargs=(block.name, layout, settings, other_objects),
+        ) as pool:
+            chunk_size = max(1, len(tasks) // (4 * (processes or os.cpu_count() or 1)))
+            paths = list(pool.imap(_render_task, tasks, chunk_size))
+            pool.close()
+            pool.join()
+    finally:
+        block.close()
+        block.unlink()
+
+    return paths
@@ -0,0 +1,2 @@
+from .scene_benchmark import run_scene, run_benchmarks
+from .scenes import scenes, camera_paths
@@ -0,0 +1,4 @@
+from .scene_benchmark import main
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,404 @@
+import os
+import sys
+import json
+import argparse
+import tempfile
+from types import SimpleNamespace
+from time import perf_counter
+import numpy as np
+import numba
+
+# the benchmarks never open a window
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+from .scene_benchmark import get_environment
+from ..point_math.project_point import project_point, project_points_into
+from ..point_math.matricies import get_pitch_yaw_roll_matrix
+from ..point_math.average_points import average_points
+from ..object_classes.flat_faces_object import (
+    get_vertex_distances,
+    get_face_distances,
+    get_packed_face_distances,
+    get_selected_face_distances,
+)
+from ..utility_objects.camera import Camera
+from ..utility_objects.packed_faces import PackedFaces
+from ..mesh_loading.obj_loader import load_obj
+from ..mesh_loading.mesh_cache import mesh_cache
+from ..objects.fstl import Fstl
+from ..objects.stl_ import Stl
+
+default_sizes = (1000, 10000, 100000, 1000000)
+
+# a scaling exponent above this between the two largest sizes is reported as a warning
+superlinear_exponent = 1.5
+
+
+def make_grid_mesh(face_count):
+    """
+    Bumpy triangulated grid with about the given number of faces
+    :param face_count: the number of triangles to aim for
+    :return: (n, 3) vertices, (m, 3) int64 triangles
+    """
+    side = max(2, int(np.sqrt(face_count / 2)) + 1)
+    x, y = np.meshgrid(np.linspace(0, 10, side), np.linspace(0, 10, side))
+    z = np.sin(x) * np.cos(y)
+    vertices = np.stack((x.ravel(), y.ravel(), z.ravel()), axis=-1)
+
+    i, j = np.meshgrid(np.arange(side - 1), np.arange(side - 1), indexing="ij")
+    a = (i * side + j).ravel()
+    b, c, d = a + 1, a + side + 1, a + side
+    triangles = np.concatenate(
+        (np.stack((a, b, c), axis=-1), np.stack((a, c, d), axis=-1))
+    )
+    return vertices, triangles.astype(np.int64)
+
+
+def write_stl(path, vertices, triangles):
+    """
+    Write a mesh as a binary STL file
+    :param path: the path of the file
+    :param vertices: (n, 3) vertices
+    :param triangles: (m, 3) triangles
+    :return:
+    """
+    corners = vertices[triangles]
+    normals = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+    normals /= np.linalg.norm(normals, axis=1)[:, None]
+
+    records = np.zeros(
+        len(triangles),
+        dtype=[("normal", "<f4", 3), ("vertices", "<f4", (3, 3)), ("attribute", "<u2")],
+    )
+    records["normal"] = normals
+    records["vertices"] = corners
+
+    with open(path, "wb") as file:
+        file.write(b"\0" * 80)
+        file.write(np.uint32(len(triangles)).tobytes())
+        file.write(records.tobytes())
+
+
+def write_obj(path, vertices, triangles):
+    """
+    Write a mesh as an OBJ file
+    :param path: the path of the file
+    :param vertices: (n, 3) vertices
+    :param triangles: (m, 3) triangles
+    :return:
+    """
+    with open(path, "w") as file:
+        np.savetxt(file, vertices, fmt="v %.6f %.6f %.6f")
+        np.savetxt(file, triangles + 1, fmt="f %d %d %d")
+
+
+def time_call(function, min_time=0.2, max_repeats=1000):
+    """
+    Time the steady state of a function by calling it until min_time has passed
+    :param function: the function to time, called without arguments
+    :param min_time: keep calling the function for at least this long
+    :param max_repeats: never call the function more often than this
+    :return: the median time of a call in seconds
+    """
+    times = []
+    total = 0.0
+    while total < min_time and len(times) < max_repeats:
+        start = perf_counter()
+        function()
+        elapsed = perf_counter() - start
+        times.append(elapsed)
+        total += elapsed
+    return float(np.median(times))
+
+
+def time_jit(kernel, args, min_time=0.2):
+    """
+    Time the numba compile of a kernel, on a fresh copy so kernels compiled at import or by an
+    earlier size are compiled again
+    :param kernel: the numba dispatcher
+    :param args: the arguments to call it with
+    :param min_time: see time_call
+    :return: the time of the first call minus the time of later calls in seconds
+    """
+    options = dict(kernel.targetoptions)
+    options.pop("nopython", None)
+    fresh_kernel = numba.njit(**options)(kernel.py_func)
+
+    start = perf_counter()
+    fresh_kernel(*args)
+    first_call = perf_counter() - start
+
+    return max(first_call - time_call(lambda: fresh_kernel(*args), min_time), 0.0)
+
+
+def _random_vertices(n):
+    return np.random.default_rng(0).uniform(-10, 10, (n, 3))
+
+
+def _camera():
+    # the camera only needs the size of the screen from the renderer
+    return Camera(
+        SimpleNamespace(width=800, height=600), position=np.array([0.0, -30.0, 0.0])
+    )
+
+
+def _setup_project_point(n):
+    camera = _camera()
+    points = _random_vertices(n) + np.array([0.0, 30.0, 0.0])
+    screen_size = np.array([800.0, 600.0])
+    args = (
+        points[0],
+        camera.offset_array,
+        camera.focal_length,
+        screen_size,
+        camera.fov_side,
+        camera.fov_top,
+    )
+
+    def call():
+        for point in points:
+            project_point(point, *args[1:])
+
+    return call, (project_point, args)
+
+
+def _setup_project_points_into(n):
+    camera = _camera()
+    args = (
+        _random_vertices(n),
+        camera.position,
+        camera.rotation_matrix,
+        camera.offset_array,
+        camera.focal_length,
+        np.array([800.0, 600.0]),
+        camera.fov_side,
+        camera.fov_top,
+        np.zeros((n, 2)),
+        np.empty(n, dtype=np.bool_),
+        np.empty(n),
+        np.empty(n),
+    )
+    return lambda: project_points_into(*args), (project_points_into, args)
+
+
+def _setup_vertex_distances(n):
+    args = (_random_vertices(n), np.array([0.0, -30.0, 0.0]))
+    return lambda: get_vertex_distances(*args), (get_vertex_distances, args)
+
+
+def _setup_face_distances(n):
+    vertices, triangles = make_grid_mesh(n)
+    faces = PackedFaces.from_polygons(triangles, (0, 0, 0))
+    camera_position = np.array([0.0, -30.0, 0.0])
+    return (
+        lambda: get_face_distances(faces, vertices, camera_position),
+        (
+            get_packed_face_distances,
+            (faces.offsets, faces.indices, vertices, camera_position),
+        ),
+    )
+
+
+def _setup_selected_face_distances(n):
+    vertices, triangles = make_grid_mesh(n)
+    faces = PackedFaces.from_polygons(triangles, (0, 0, 0))
+    # every other face, like faces left after culling
+    args = (
+        np.arange(0, len(faces), 2),
+        faces.offsets,
+        faces.indices,
+        vertices,
+        np.array([0.0, -30.0, 0.0]),
+    )
+    return (
+        lambda: get_selected_face_distances(*args),
+        (get_selected_face_distances, args),
+    )
+
+
+def _setup_matrix_builders(n):
+    angles = np.random.default_rng(0).uniform(-np.pi, np.pi, (n, 3))
+
+    def call():
+        for yaw, pitch, roll in angles:
+            get_pitch_yaw_roll_matrix(yaw, pitch, roll)
+
+    return call, None
+
+
+def _setup_average_points(n):
+    vertices = _random_vertices(n)
+    return lambda: average_points(vertices), None
+
+
+def _setup_loader(write, load):
+    def setup(n, directory):
+        vertices, triangles = make_grid_mesh(n)
+        path = os.path.join(directory, f"mesh_{n}")
+        write(path, vertices, triangles)
+        return lambda: load(path), None
+
+    return setup
+
+
+# name: (setup taking the size, unit of the size), setup returns (call, (numba kernel, args) or None)
+kernels = {
+    "project_point": (_setup_project_point, "points"),
+    "project_points_into": (_setup_project_points_into, "points"),
+    "get_vertex_distances": (_setup_vertex_distances, "vertices"),
+    "get_face_distances": (_setup_face_distances, "faces"),
+    "get_selected_face_distances": (_setup_selected_face_distances, "faces"),
+    "matrix_builders": (_setup_matrix_builders, "calls"),
+    "average_points": (_setup_average_points, "points"),
+}
+
+# name: (setup taking the size and a directory for the mesh file, unit of the size)
+loaders = {
+    "load_obj": (_setup_loader(write_obj, load_obj), "faces"),
+    "Fstl": (_setup_loader(write_stl, Fstl), "faces"),
+    "Stl": (_setup_loader(write_stl, Stl), "faces"),
+}
+
+
+def get_scaling_exponent(sizes, times):
+    """
+    Estimate how the time grows with the size from the two largest sizes, 1 is linear, 2 is quadratic
+    :param sizes: the sizes that were timed
+    :param times: the time of each size
+    :return: the exponent, None with fewer than two sizes
+    """
+    if len(sizes) < 2 or times[-2] <= 0:
+        return None
+    return float(np.log(times[-1] / times[-2]) / np.log(sizes[-1] / sizes[-2]))
+
+
+def run_benchmark(setup, sizes, max_time=10.0, min_time=0.2, directory=None):
+    """
+    Time a kernel or loader at increasing sizes
+    :param setup: the setup function of the benchmark
+    :param sizes: the sizes to time, in increasing order
+    :param max_time: sizes a single call is expected to take longer than this for are skipped
+    :param min_time: see time_call
+    :param directory: the directory for mesh files, only for loaders
+    :return: dict with the compile time, the timed sizes, the time per call and per item,
+        the scaling exponent and the skipped sizes
+    """
+    extra = () if directory is None else (directory,)
+    result = {"jit_time": None, "sizes": [], "times": [], "per_item": [], "skipped": []}
+
+    for n in sizes:
+        if result["times"]:
+            # guess the time of this size from the growth so far, at least linear
+            exponent = get_scaling_exponent(result["sizes"], result["times"]) or 1.0
+            predicted = result["times"][-1] * (n / result["sizes"][-1]) ** max(
+                exponent, 1.0
+            )
+            if predicted > max_time:
+                result["skipped"].append(n)
+                continue
+
+        call, kernel = setup(n, *extra)
+        if kernel is not None and result["jit_time"] is None:
+            result["jit_time"] = time_jit(*kernel, min_time)
+
+        if not result["times"]:
+            # the first call compiles kernels and warms caches, it is not part of the steady state
+            call()
+
+        steady = time_call(call, min_time)
+        result["sizes"].append(n)
+        result["times"].append(steady)
+        result["per_item"].append(steady / n)
+
+    result["exponent"] = get_scaling_exponent(result["sizes"], result["times"])
+    return result
+
+
+def run_kernel_benchmarks(names=None, sizes=default_sizes, max_time=10.0, min_time=0.2):
+    """
+    Run the kernel and loader micro benchmarks
+    :param names: the benchmarks to run, None for all of them
+    :param sizes: the sizes to time every benchmark at
+    :param max_time: sizes a single call is expected to take longer than this for are skipped
+    :param min_time: keep calling a function for at least this long to time it
+    :return: dict with information about the machine and commit, the result of every benchmark
+        and warnings about benchmarks that scale worse than linearly
+    """
+    names = list(kernels) + list(loaders) if names is None else names
+    sizes = sorted(sizes)
+
+    results = {}
+    # time parsing the files, not getting them from the mesh cache
+    cache_enabled = mesh_cache.enabled
+    mesh_cache.disable()
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            for name in names:
+                if name in kernels:
+                    setup, unit = kernels[name]
+                    result = run_benchmark(setup, sizes, max_time, min_time)
+                else:
+                    setup, unit = loaders[name]
+                    result = run_benchmark(setup, sizes, max_time, min_time, directory)
+                results[name] = {"unit": unit, **result}
+    finally:
+        mesh_cache.enabled = cache_enabled
+
+    warnings = [
+        f"{name} scales with exponent {result['exponent']:.2f} between "
+        f"{result['sizes'][-2]} and {result['sizes'][-1]} {result['unit']}"
+        for name, result in results.items()
+        if result["exponent"] is not None and result["exponent"] > superlinear_exponent
+    ]
+
+    return {
+        **get_environment(),
+        "settings": {"sizes": sizes, "max_time": max_time, "min_time": min_time},
+        "benchmarks": results,
+        "warnings": warnings,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Time the point math kernels and mesh loaders at increasing sizes and report "
+        "their scaling as json"
+    )
+    parser.add_argument(
+        "benchmarks",
+        nargs="*",
+        help=f"the benchmarks to run, all by default, one of {', '.join(list(kernels) + list(loaders))}",
+    )
+    parser.add_argument("--sizes", type=int, nargs="+", default=default_sizes)
+    parser.add_argument(
+        "--max-time",
+        type=float,
+        default=10.0,
+        help="skip sizes a single call is expected to take longer than this many seconds for",
+    )
+    parser.add_argument("--min-time", type=float, default=0.2)
+    parser.add_argument(
+        "--output", help="write the json to this file instead of printing it"
+    )
+    args = parser.parse_args(argv)
+
+    for name in args.benchmarks:
+        if name not in kernels and name not in loaders:
+            parser.error(f"unknown benchmark {name}")
+
+    results = run_kernel_benchmarks(
+        args.benchmarks or None, args.sizes, args.max_time, args.min_time
+    )
+    for warning in results["warnings"]:
+        print(f"warning: {warning}", file=sys.stderr)
+
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(text)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,298 @@
+import os
+import sys
+import json
+import time
+import signal
+import argparse
+import platform
+import subprocess
+import multiprocessing
+import numpy as np
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# the benchmarks never open a window
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+from .scenes import scenes, camera_paths
+
+
+def get_peak_memory():
+    """
+    Get the peak resident memory of this process
+    :return: the peak memory in MiB, None where it can not be read
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # linux reports KiB, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def get_commit():
+    """
+    Get the git commit the package is run from, so results of different commits can be told apart
+    :return: the commit hash, None outside of a git checkout
+    """
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=os.path.dirname(__file__),
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def get_environment():
+    """
+    Describe the code and machine the benchmarks run on
+    :return: dict with the commit, the time, the versions of python and the libraries and the platform
+    """
+    import numba
+    import pygame
+
+    return {
+        "commit": get_commit(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "numba": numba.__version__,
+        "pygame": pygame.version.ver,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def run_scene(
+    name,
+    count=None,
+    frames=300,
+    warmup=30,
+    width=800,
+    height=600,
+    backend="painter",
+    path="orbit",
+):
+    """
+    Build a scene in a headless renderer and fly a camera path through it
+    :param name: the name of the scene, one of scenes
+    :param count: the size of the scene, defaults to the size of the scene in scenes
+    :param frames: the number of frames to time
+    :param warmup: the number of frames to render before timing, they compile the numba kernels
+    :param width: the width of the frames
+    :param height: the height of the frames
+    :param backend: the render backend to draw with
+    :param path: the name of the camera path, one of camera_paths
+    :return: dict with the build time, fps, frame time percentiles, mean stage times and counters,
+        the most expensive objects and the peak memory
+    """
+    from ..main import SapphireRenderer
+    from ..utility_objects.camera import Camera
+    from ..utility_objects.frame_stats import FrameStats
+
+    builder, default_count = scenes[name]
+    count = default_count if count is None else count
+
+    renderer = SapphireRenderer(width, height, movement_handling=False, headless=True)
+    renderer.render_backend = backend
+
+    build_start = time.perf_counter()
+    radius = builder(renderer, count)
+    build_time = time.perf_counter() - build_start
+
+    path_function, distance, height_factor = camera_paths[path]
+    poses = path_function(frames, radius * distance, radius * height_factor)
+
+    def render(pose):
+        position, rotation = pose
+        renderer.render_frame(Camera(renderer, position=position, rotation=rotation))
+
+    warmup_start = time.perf_counter()
+    for i in range(warmup):
+        render(poses[i % len(poses)])
+    warmup_time = time.perf_counter() - warmup_start
+
+    # keep every timed frame, the warmup frames are left out
+    stats = FrameStats(max(frames, 1))
+    renderer.frame_stats = stats
+    renderer.scene_buffer.stats = stats
+
+    start = time.perf_counter()
+    for pose in poses:
+        render(pose)
+    total_time = time.perf_counter() - start
+
+    summary = stats.summary()
+    frame_times = stats.frame_times[: min(stats.frame_count, stats.size)]
+
+    return {
+        "scene": name,
+        "count": count,
+        "objects": len(renderer.instance_objects),
+        "build_time": build_time,
+        "warmup_time": warmup_time,
+        "frames": frames,
+        "fps": frames / total_time if total_time > 0 else 0.0,
+        "frame_time": {
+            "mean": float(frame_times.mean()),
+            "p50": float(np.percentile(frame_times, 50)),
+            "p95": float(np.percentile(frame_times, 95)),
+            "max": float(frame_times.max()),
+        },
+        "stages": {
+            stage: values["mean"] for stage, values in summary["stages"].items()
+        },
+        "counters": {
+            counter: values["mean"] for counter, values in summary["counters"].items()
+        },
+        "top_objects": stats.object_report(5),
+        "peak_memory_mb": get_peak_memory(),
+    }
+
+
+def _stop_worker(signum, frame):
+    os._exit(1)
+
+
+def _init_worker():
+    # pygame turns SIGTERM into a quit event unless a handler is set, the pool needs it to stop its workers
+    signal.signal(signal.SIGTERM, _stop_worker)
+
+
+def _run_scene_task(kwargs):
+    return run_scene(**kwargs)
+
+
+def run_benchmarks(
+    names=None,
+    frames=300,
+    warmup=30,
+    width=800,
+    height=600,
+    backend="painter",
+    path="orbit",
+    counts=None,
+    isolate=True,
+):
+    """
+    Run the scene benchmarks
+    :param names: the scenes to run, None for all of them
+    :param frames: the number of frames to time per scene
+    :param warmup: the number of frames to render before timing
+    :param width: the width of the frames
+    :param height: the height of the frames
+    :param backend: the render backend to draw with
+    :param path: the name of the camera path
+    :param counts: dict of scene name to scene size, scenes not in it use their default size
+    :param isolate: run every scene in a fresh process, so the peak memory of one scene does not
+        hide the next and every scene pays its own numba compile
+    :return: dict with information about the machine and commit and the results of every scene
+    """
+    names = list(scenes) if names is None else names
+    counts = counts or {}
+
+    tasks = [
+        {
+            "name": name,
+            "count": counts.get(name),
+            "frames": frames,
+            "warmup": warmup,
+            "width": width,
+            "height": height,
+            "backend": backend,
+            "path": path,
+        }
+        for name in names
+    ]
+
+    results = {}
+    for task in tasks:
+        if isolate:
+            context = multiprocessing.get_context("spawn")
+            with context.Pool(1, initializer=_init_worker) as pool:
+                results[task["name"]] = pool.apply(_run_scene_task, (task,))
+                pool.close()
+                pool.join()
+        else:
+            results[task["name"]] = _run_scene_task(task)
+
+    return {
+        **get_environment(),
+        "settings": {
+            "frames": frames,
+            "warmup": warmup,
+            "size": [width, height],
+            "backend": backend,
+            "path": path,
+        },
+        "scenes": results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Render scripted scenes headlessly and report their performance as json"
+    )
+    parser.add_argument(
+        "scenes",
+        nargs="*",
+        help=f"the scenes to run, all by default, one of {', '.join(scenes)}",
+    )
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--warmup", type=int, default=30)
+    parser.add_argument("--size", type=int, nargs=2, default=(800, 600))
+    parser.add_argument(
+        "--backend", choices=("painter", "zbuffer", "tiled"), default="painter"
+    )
+    parser.add_argument("--path", choices=list(camera_paths), default="orbit")
+    parser.add_argument(
+        "--count",
+        action="append",
+        default=[],
+        metavar="SCENE=N",
+        help="change the size of a scene, for example --count cubes=1000",
+    )
+    parser.add_argument(
+        "--no-isolate",
+        action="store_true",
+        help="run every scene in this process instead of a fresh one",
+    )
+    parser.add_argument(
+        "--output", help="write the json to this file instead of printing it"
+    )
+    args = parser.parse_args(argv)
+
+    for name in args.scenes:
+        if name not in scenes:
+            parser.error(f"unknown scene {name}")
+
+    counts = {}
+    for count in args.count:
+        name, _, value = count.partition("=")
+        if name not in scenes or not value.isdigit():
+            parser.error(f"--count expects SCENE=N, got {count}")
+        counts[name] = int(value)
+
+    results = run_benchmarks(
+        args.scenes or None,
+        args.frames,
+        args.warmup,
+        *args.size,
+        backend=args.backend,
+        path=args.path,
+        counts=counts,
+        isolate=not args.no_isolate,
+    )
+
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(text)
+    else:
+        print(text)
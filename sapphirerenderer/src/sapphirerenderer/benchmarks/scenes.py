@@ -0,0 +1,233 @@
+import os
+import importlib.util
+import numpy as np
+from ..object_classes.flat_faces_object import FlatFacesObject
+from ..utility_objects.packed_faces import PackedFaces
+
+examples_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), "examples")
+tree_game_dir = os.path.join(examples_dir, "Tree Cutting Game")
+spruce_tree_path = os.path.join(tree_game_dir, "SpruceTree1.stl")
+
+
+def _terrain_grid(size, rows, cols, z_scale=0.5, color_randomness=0.1):
+    """
+    Bumpy green grid like the Grass object of the tree cutting game, used when Grass can not be built
+    :param size: the width of the grid
+    :param rows: the number of rows of vertices
+    :param cols: the number of columns of vertices
+    :param z_scale: the height of the bumps
+    :param color_randomness: how much the green of the faces varies
+    :return: the grid object
+    """
+    x, y = np.meshgrid(np.linspace(0, size, cols), np.linspace(0, size, rows))
+    z = (np.sin(x * 1.3) + np.cos(y * 0.7)) * z_scale / 2
+    vertices = np.stack((x.ravel(), y.ravel(), z.ravel()), axis=-1)
+
+    i, j = np.meshgrid(np.arange(rows - 1), np.arange(cols - 1), indexing="ij")
+    corners = (i * cols + j).ravel()
+    polygons = np.stack(
+        (corners, corners + 1, corners + cols + 1, corners + cols), axis=-1
+    )
+
+    rng = np.random.default_rng(0)
+    colors = np.clip(
+        np.array((0, 255, 0))
+        + rng.uniform(-color_randomness, color_randomness, (len(polygons), 3)) * 255,
+        0,
+        255,
+    ).astype(np.uint8)
+
+    normals = -np.cross(
+        vertices[polygons[:, 1]] - vertices[polygons[:, 0]],
+        vertices[polygons[:, 2]] - vertices[polygons[:, 0]],
+    )
+    normals *= 255 / np.linalg.norm(normals, axis=1)[:, None]
+
+    faces = PackedFaces.from_polygons(polygons, colors, normals)
+    return FlatFacesObject(
+        vertices, faces, shadow=True, shadow_effect=1, back_face_culling=False
+    )
+
+
+def _make_grass(size, rows, cols):
+    """
+    Build the Grass terrain of the tree cutting game, it lives outside the package and needs scipy and noise
+    :param size: the width of the terrain
+    :param rows: the number of rows of vertices
+    :param cols: the number of columns of vertices
+    :return: the terrain object
+    """
+    path = os.path.join(tree_game_dir, "game_objects", "grass.py")
+    try:
+        spec = importlib.util.spec_from_file_location("tree_game_grass", path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        return module.Grass(size=size, rows=rows, cols=cols, z_scale=0.5)
+    except Exception as e:
+        reason = str(e).splitlines()[0] if str(e) else type(e).__name__
+        print(f"Failed to build Grass, using a terrain grid instead: {reason}")
+        return _terrain_grid(size, rows, cols)
+
+
+def build_cubes(renderer, count=400):
+    """
+    A flat grid of filled cubes
+    :param renderer: the renderer to add the objects to
+    :param count: the number of cubes
+    :return: the radius of the scene around the origin
+    """
+    side = int(np.ceil(np.sqrt(count)))
+    for i in range(count):
+        row, col = divmod(i, side)
+        renderer.add_object(
+            "Fcube",
+            args=(
+                np.array([2.0 * col - side, 2.0 * row - side, 0.0]),
+                ((37 * i) % 256, 255 - (53 * i) % 256, 160),
+                1,
+            ),
+        )
+    return float(side)
+
+
+def build_grass(renderer, count=60):
+    """
+    The Grass terrain grid of the tree cutting game
+    :param renderer: the renderer to add the objects to
+    :param count: the number of rows and columns of vertices
+    :return: the radius of the scene around the origin
+    """
+    size = 20.0
+    grass = _make_grass(size, count, count)
+    grass.move_absolute(np.array([-size / 2, -size / 2, 0.0]))
+    renderer.direct_add_object(grass)
+    return size / 2
+
+
+def build_spruce_trees(renderer, count=20):
+    """
+    Spruce tree STL models of the tree cutting game
+    :param renderer: the renderer to add the objects to
+    :param count: the number of trees
+    :return: the radius of the scene around the origin
+    """
+    side = int(np.ceil(np.sqrt(count)))
+    for i in range(count):
+        row, col = divmod(i, side)
+        tree = renderer.add_object(
+            "Fstl",
+            args=(
+                spruce_tree_path,
+                np.array([0.0, 0.0, 0.0]),
+                (0, 160, 60),
+                False,
+                True,
+            ),
+        )
+        # the model is huge and lies on its side
+        tree.set_scale(1 / max(np.ptp(tree.vertices, axis=0)))
+        tree.rotate_local(90, 0, 0)
+        tree.move_absolute(np.array([2.0 * col - side, 2.0 * row - side, 0.0]))
+    return float(side)
+
+
+def build_wireframes(renderer, count=4):
+    """
+    Dense Sphere and Torus wireframes
+    :param renderer: the renderer to add the objects to
+    :param count: the number of spheres and of tori
+    :return: the radius of the scene around the origin
+    """
+    for i in range(count):
+        x = 4.0 * i - 2.0 * (count - 1)
+        renderer.add_object(
+            "Sphere", args=(1.0, np.array([x, 2.0, 0.0]), (0, 0, 255), 60)
+        )
+        renderer.add_object(
+            "Torus", args=(np.array([x, -2.0, 0.0]), (255, 0, 0), 1.5, 0.5, 60)
+        )
+    return 2.0 * count + 2
+
+
+def build_labels(renderer, count=200):
+    """
+    Many Text labels spread over a grid
+    :param renderer: the renderer to add the objects to
+    :param count: the number of labels
+    :return: the radius of the scene around the origin
+    """
+    side = int(np.ceil(np.sqrt(count)))
+    for i in range(count):
+        row, col = divmod(i, side)
+        renderer.add_object(
+            "Text",
+            args=(
+                f"label {i}",
+                np.array([1.0 * col - side / 2, 1.0 * row - side / 2, 0.0]),
+                (0, 0, 0),
+                0.5,
+            ),
+        )
+    return side / 2
+
+
+# scene name: (builder, default count)
+scenes = {
+    "cubes": (build_cubes, 400),
+    "grass": (build_grass, 60),
+    "spruce_trees": (build_spruce_trees, 20),
+    "wireframes": (build_wireframes, 4),
+    "labels": (build_labels, 200),
+}
+
+
+def look_at(position, target):
+    """
+    Get the camera rotation that looks from a position at a target
+    :param position: the position of the camera
+    :param target: the point to look at
+    :return: (pitch, yaw) rotation of the camera
+    """
+    direction = np.asarray(target, dtype=float) - np.asarray(position, dtype=float)
+    yaw = np.arctan2(direction[0], direction[1])
+    pitch = np.arctan2(-direction[2], np.hypot(direction[0], direction[1]))
+    return np.array([pitch, yaw])
+
+
+def orbit_path(frames, radius, height):
+    """
+    Circle around the origin while looking at it
+    :param frames: the number of camera poses
+    :param radius: the distance of the camera from the vertical axis
+    :param height: the height of the camera
+    :return: list of (position, rotation) camera poses
+    """
+    poses = []
+    for angle in np.linspace(0, 2 * np.pi, frames, endpoint=False):
+        position = np.array([radius * np.sin(angle), -radius * np.cos(angle), height])
+        poses.append((position, look_at(position, (0.0, 0.0, 0.0))))
+    return poses
+
+
+def flythrough_path(frames, radius, height):
+    """
+    Fly straight across the scene at a low height while looking ahead
+    :param frames: the number of camera poses
+    :param radius: the camera starts and ends this far from the origin
+    :param height: the height of the camera
+    :return: list of (position, rotation) camera poses
+    """
+    start = np.array([-radius, -radius, height])
+    end = np.array([radius, radius, height])
+    rotation = look_at(start, (end[0], end[1], 0.0))
+    return [
+        (start + (end - start) * t, rotation)
+        for t in np.linspace(0, 1, frames, endpoint=False)
+    ]
+
+
+# path name: (path function, distance factor, height factor), both are multiplied by the scene radius
+camera_paths = {
+    "orbit": (orbit_path, 1.6, 0.6),
+    "flythrough": (flythrough_path, 1.0, 0.15),
+}
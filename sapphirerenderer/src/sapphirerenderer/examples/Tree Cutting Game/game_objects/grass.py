@@ -69,4 +69,12 @@ class Grass(FlatFacesObject):
 
                 faces.append((face_indices, tuple(color_array), normal))
 
-        super().__init__(vertices, faces, position, color, True, shadow_effect)
+        super().__init__(
+            vertices,
+            faces,
+            position,
+            color,
+            True,
+            shadow_effect,
+            back_face_culling=False,
+        )
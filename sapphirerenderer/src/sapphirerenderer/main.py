@@ -6,20 +6,44 @@ from .settings import (
     camera_rotate_speed,
     fps,
     show_fps,
+    show_stats,
+    stats_size,
     lock_fps,
+    render_backend,
+    render_tile_size,
+    render_threads,
+    face_culling,
+    min_face_area,
+    far_distance,
+    damage_tracking,
+    max_damage_fraction,
+    trace,
+    trace_size,
+    mesh_cache_size,
+    mesh_cache_dir,
+    load_threads,
+    load_processes,
 )
-from time import time
+from time import time, perf_counter
 import threading
-from .point_math.project_point import project_point
-from .object_classes.flat_faces_object import get_face_distances
+from .utility_objects.scene_buffer import SceneBuffer
+from .utility_objects.depth_sorter import insertion_sort_descending
+from .utility_objects.damage_tracker import DamageTracker
+from .utility_objects.frame_stats import FrameStats
+from .utility_objects.tracer import tracer
+from .mesh_loading.mesh_cache import mesh_cache
+from .utility_objects.async_loader import AsyncLoader, ObjectHandle
 import pygame
 
-average_fps_list = []
-
 
 class SapphireRenderer:
     def __init__(
-        self, width=1000, height=1000, draw_axis=False, movement_handling=True
+        self,
+        width=1000,
+        height=1000,
+        draw_axis=False,
+        movement_handling=True,
+        headless=False,
     ):
         """
         Initialize the renderer
@@ -27,8 +51,11 @@ class SapphireRenderer:
         :param height: Height of the window
         :param draw_axis: Draws the axis lines, use-full for debugging
         ;param: movement_handling: Whether to handle movement of the camera
+        :param headless: Render offscreen without a window or render thread, frames are drawn by calling render_frame
         """
         self.display = None
+        self.framebuffer = None
+        self.headless = headless
 
         self.movement_handling = movement_handling
 
@@ -38,20 +65,50 @@ class SapphireRenderer:
 
         self.camera_rotate_speed = camera_rotate_speed
         self.camera_move_speed = camera_move_speed
+        self.render_backend = render_backend
+        self.far_distance = far_distance
 
         self.camera = Camera(self, position=np.array((0.0, -3.0, 0.0)))
 
         self.loaded_objects = []
         self.instance_objects = []
+        # held while the object list changes, objects can be added from any thread
+        self._objects_lock = threading.Lock()
+        self.scene_version = 0
+        self.damage_tracking = damage_tracking
+        self.damage_tracker = DamageTracker(max_damage_fraction)
+        self.frame_stats = FrameStats(stats_size)
+        self.show_stats = show_stats
+        self._overlay_rect = None
+        self.scene_buffer = SceneBuffer(
+            render_tile_size,
+            render_threads,
+            face_culling,
+            min_face_area,
+            self.frame_stats,
+        )
+        self.async_loader = AsyncLoader(load_threads, load_processes)
         self.load_objects()
 
         if draw_axis:
             self.add_object("Axes")
 
+        if trace:
+            tracer.enable(trace_size)
+        mesh_cache.configure(mesh_cache_size, mesh_cache_dir)
+
         self.running = True
 
-        self.thread = threading.Thread(target=self.render_loop)
-        self.thread.start()
+        if headless:
+            # the display draws straight into the framebuffer array
+            self.framebuffer = np.full((height, width, 3), 255, dtype=np.uint8)
+            self.display = pygame.image.frombuffer(
+                self.framebuffer, self.display_size, "RGB"
+            )
+            self.thread = None
+        else:
+            self.thread = threading.Thread(target=self.render_loop, name="render")
+            self.thread.start()
 
     @staticmethod
     def get_pygame_object():
@@ -78,8 +135,43 @@ class SapphireRenderer:
         for obj_class_name, obj_class in self.loaded_objects:
             if obj_class_name == obj_name:
                 obj = obj_class(*args) if args is not None else obj_class()
-                self.instance_objects.append(obj)
-                return obj
+                return self.direct_add_object(obj)
+
+    def add_object_async(self, obj_name, args=None, placeholder=None):
+        """
+        Adds an object to the scene without waiting for it to be built, use it for objects that load files.
+        The object is built on a loader thread and put into the scene at the start of a frame
+        :param obj_name: The class name of the object
+        :param args: The args to pass to the init of the class
+        :param placeholder: What to show until the object is in the scene, None shows nothing.
+            Either an object, or the (bottom_corner, top_corner) of a box around the object to show as a cuboid,
+            the size of a mesh is only known after its file is parsed so the corners have to be given
+        :return: returns a handle of the object, calls on it are queued until the object is built,
+            reading its attributes waits for it, see ObjectHandle
+        """
+        for obj_class_name, obj_class in self.loaded_objects:
+            if obj_class_name == obj_name:
+                if placeholder is not None:
+                    if isinstance(placeholder, (tuple, list)):
+                        bottom_corner, top_corner = placeholder
+                        placeholder = self.add_object(
+                            "Cuboid",
+                            args=(
+                                np.asarray(bottom_corner, dtype=float),
+                                np.asarray(top_corner, dtype=float),
+                            ),
+                        )
+                    else:
+                        self.direct_add_object(placeholder)
+                return self.async_loader.load(obj_class, args, placeholder)
+
+    def wait_for_loading(self, timeout=None):
+        """
+        Wait for the objects added with add_object_async to be built
+        :param timeout: The number of seconds to wait for each object, None waits until they are built
+        :return: whether every object was built, they are in the scene from the next frame on
+        """
+        return self.async_loader.wait(timeout)
 
     def direct_add_object(self, obj):
         """
@@ -87,21 +179,155 @@ class SapphireRenderer:
         :param obj: The object to add
         :return:
         """
-        self.instance_objects.append(obj)
+        with self._objects_lock:
+            self.instance_objects.append(obj)
+            self.scene_version += 1
         return obj
 
     def remove_object(self, obj):
         """
         Removes an object from the scene
-        :param obj: The object to remove
+        :param obj: The object to remove, or the handle of an object added with add_object_async
+        :return:
+        """
+        if isinstance(obj, ObjectHandle):
+            # the object is in the scene, or it never will be and its placeholder is
+            self.async_loader.discard(obj)
+            if obj.loaded_object in self.instance_objects:
+                obj = obj.loaded_object
+            else:
+                obj = obj.placeholder
+                if obj is None or obj not in self.instance_objects:
+                    return
+
+        with self._objects_lock:
+            self.instance_objects.remove(obj)
+            self.scene_version += 1
+
+    def save_scene(self, path):
+        """
+        Save the objects of the scene into a file, see scene_file.save_scene
+        :param path: The path of the file
+        :return:
+        """
+        from .scene_file import save_scene
+
+        save_scene(self.instance_objects, path)
+
+    def load_scene(self, path):
+        """
+        Add the objects saved with save_scene to the scene, they are memory mapped from the file instead of built again
+        :param path: The path of the file
+        :return: the objects added
+        """
+        from .scene_file import load_scene
+
+        objects = load_scene(path)
+        for obj in objects:
+            self.direct_add_object(obj)
+        return objects
+
+    def invalidate(self):
+        """
+        Redraw the whole screen next frame, needed after changing object attributes directly
+        instead of through their methods, or after drawing on the display outside the renderer
+        :return:
+        """
+        self.damage_tracker.invalidate()
+
+    def get_damage(self):
+        """
+        Get the part of the screen that has to be redrawn this frame
+        :return: a pygame Rect, the whole screen when damage tracking is off, or None if nothing changed
+        """
+        if not self.damage_tracking:
+            return pygame.Rect((0, 0), self.display_size)
+
+        damage = self.damage_tracker.get_damage(
+            self.instance_objects, self.scene_version, self.camera, self.display_size
+        )
+
+        # the stats overlay changes every frame, the last one has to be cleared
+        if self.show_stats or self._overlay_rect is not None:
+            overlay_rect = self._overlay_rect or pygame.Rect(0, 0, 1, 1)
+            damage = overlay_rect if damage is None else damage.union(overlay_rect)
+
+        return damage
+
+    def stats(self):
+        """
+        Get timings of the render stages and counts of drawn and culled objects, faces and vertices
+        over the last frames
+        :return: the summary of the frame stats, see FrameStats.summary
+        """
+        return self.frame_stats.summary()
+
+    def object_report(self, top=10):
+        """
+        Find the objects that cost the most time to compile or draw over the last frames
+        :param top: the number of objects to report, None for all of them
+        :return: the most expensive objects first, see FrameStats.object_report
+        """
+        return self.frame_stats.object_report(top)
+
+    @staticmethod
+    def start_trace(max_events=None):
+        """
+        Start recording spans of the render stages, object draws, mutations and waits on every thread
+        :param max_events: the number of spans to keep, None keeps the current size
         :return:
         """
-        self.instance_objects.remove(obj)
+        tracer.enable(max_events)
+
+    @staticmethod
+    def stop_trace():
+        tracer.disable()
+
+    @staticmethod
+    def save_trace(path):
+        """
+        Save the recorded spans as Chrome trace event json, open it in chrome://tracing or ui.perfetto.dev
+        :param path: the path of the file
+        :return:
+        """
+        tracer.save(path)
+
+    def sort_objects(self):
+        """
+        Sort objects by distance from camera, furthest first so that objects closer to camera are drawn last.
+        The list is still sorted from the last frame, so it is only repaired
+        :return:
+        """
+        objects = list(self.instance_objects)
+        if len(objects) < 2:
+            return
+
+        positions = np.array([obj.position for obj in objects], dtype=float)
+        distances = np.sqrt(np.sum((positions - self.camera.position) ** 2, axis=1))
+        order = np.arange(len(objects))
+
+        if not insertion_sort_descending(order, distances, 8 * len(objects)):
+            order = order[np.argsort(distances, kind="stable")[::-1]]
+
+        if np.any(order != np.arange(len(objects))):
+            with self._objects_lock:
+                # objects added or removed while sorting are kept, the list is sorted again next frame
+                if len(self.instance_objects) != len(objects) or any(
+                    a is not b for a, b in zip(self.instance_objects, objects)
+                ):
+                    return
+                self.instance_objects[:] = [objects[i] for i in order]
 
     def update(self):
+        # objects that finished loading enter the scene between frames
+        with self._objects_lock:
+            if self.async_loader.swap(self.instance_objects):
+                self.scene_version += 1
+
         self.camera.update()
         for obj in self.instance_objects:
             obj.update()
+            obj.update_view(self.camera, self.far_distance)
 
     def user_input(self, pygame, scale_factor=1.0):
         # wasd to move camera
@@ -134,132 +360,117 @@ class SapphireRenderer:
 
     def compiled_draw(self, surface, camera):
         """
-        Draw the compiled objects were all verts and faces are put together, sorted, and drawn
+        Draw the compiled objects were all verts and faces are put together, sorted, and drawn.
+        The verts and faces are kept in a persistent scene buffer, only objects that changed are rewritten
         :param surface: the pygame surface to draw on
         :param camera: the camera to draw from
         :return:
         """
-        compiled_faces = []
-        compiled_verts = []
-        index_offset = 0
-
         # Filter objects that need compilation
-        compile_objs = [
-            obj
-            for obj in self.instance_objects
-            if obj.compile_verts and not obj.is_hidden()
-        ]
-        if not compile_objs:
-            return
+        compile_objs = [obj for obj in self.instance_objects if obj.compile_verts]
 
-        for obj in compile_objs:
-            obj.drawing = True
-            obj.wait_for_ambiguous()
-
-            compiled_verts.extend(obj.vertices.copy())
-
-            # append if the object has shadow, the strength of shadow, and the reverse rotation matrix to each face
-            for face in obj.faces:
-                if len(face) == 3:
-                    face = (
-                        [vertex + index_offset for vertex in face[0]],
-                        face[1],
-                        face[2],
-                    )
-                else:
-                    face = (
-                        [vertex + index_offset for vertex in face[0]],
-                        face[1],
-                        None,
-                    )
-
-                compiled_faces.append(
-                    face
-                    + (
-                        obj.shadow,
-                        obj.shadow_effect,
-                        obj.negative_rotation_matrix,
-                    )
-                )
-            obj.drawing = False
-            index_offset += len(obj.vertices)
+        self.scene_buffer.sync(compile_objs, camera, self.far_distance)
+        self.scene_buffer.draw(surface, camera, self.display_size, self.render_backend)
 
-        face_distances = get_face_distances(
-            compiled_faces, compiled_verts, camera.position
-        )
+    def draw_frame(self, damage):
+        """
+        Draw the scene on the display
+        :param damage: the part of the display to clear and redraw
+        :return: the part of the display that changed
+        """
+        stats = self.frame_stats
 
-        sorted_indices = np.argsort(face_distances)[
-            ::-1
-        ]  # Sorting indices in descending order
-
-        compiled_faces = [compiled_faces[i] for i in sorted_indices]
-
-        moved_vertices = np.array(compiled_verts) - camera.position
-        reshaped_vertices = moved_vertices.reshape(-1, 1, moved_vertices.shape[1])
-        rotated_vertices = np.sum(camera.rotation_matrix * reshaped_vertices, axis=-1)
-
-        projected_vertices = [
-            project_point(
-                vertex,
-                camera.offset_array,
-                camera.focal_length,
-                self.display_size,
-                self.camera.fov_side,
-                self.camera.fov_top,
-            )[0]
-            for vertex in rotated_vertices
-        ]
-
-        for face in compiled_faces:
-            face_verts = face[0]
-
-            valid_verts = [
-                vertex
-                for vertex in [projected_vertices[vertex] for vertex in face_verts]
-                if vertex is not None
-            ]
-            if len(valid_verts) < 3:
-                continue
-
-            face_color = face[1]
-            face_normal = face[2]
-            face_shadow = face[3]
-
-            if not face_shadow:
-                pygame.draw.polygon(
-                    surface,
-                    face_color,
-                    valid_verts,
-                )
-                continue
+        with stats.stage("object_sort"):
+            self.sort_objects()
 
-            shadow_effect = face[4]
-            negative_rotation_matrix = face[5]
+        with stats.stage("draw"):
+            # only the damaged part of the display is cleared and drawn on
+            self.display.set_clip(damage)
+            self.display.fill((255, 255, 255))
 
-            # rotate face normal by object rotation
-            if face_normal is not None:
-                face_normal = np.dot(face_normal, negative_rotation_matrix)
+            self.compiled_draw(self.display, self.camera)
+            drawn_objects = int(self.scene_buffer.visible_objects.sum())
 
-                shadow_normal = ((face_normal[2] + 255) / 510) * 255
+            for obj in self.instance_objects:
+                if obj.compile_verts or obj.is_hidden():
+                    continue
+
+                with stats.stage("culling"):
+                    in_view = self.camera.object_in_view(obj, self.far_distance)
+                if in_view:
+                    with tracer.span("draw " + str(obj), "object"):
+                        draw_start = perf_counter()
+                        obj.draw(self)
+                        stats.add_object_cost(
+                            obj,
+                            perf_counter() - draw_start,
+                            *obj.get_primitive_counts(),
+                        )
+                    drawn_objects += 1
+
+            self.display.set_clip(None)
+
+        stats.count("objects_submitted", len(self.instance_objects))
+        stats.count("objects_culled", len(self.instance_objects) - drawn_objects)
+        stats.count("objects_drawn", drawn_objects)
+
+        if self.damage_tracking:
+            self.damage_tracker.check_unchanged()
+
+        self._overlay_rect = None
+        if self.show_stats:
+            overlay = stats.get_overlay()
+            self.display.blit(overlay, (0, 0))
+            self._overlay_rect = overlay.get_rect()
+            damage = damage.union(self._overlay_rect)
+
+        return damage
+
+    def render_frame(self, camera=None):
+        """
+        Render one frame offscreen, only available in headless mode
+        :param camera: the camera to render from, defaults to the camera of the renderer
+        :return: (height, width, 3) uint8 rgb array of the frame, the same array is drawn on by the next frame
+        """
+        if not self.headless:
+            raise RuntimeError("render_frame is only available in headless mode")
 
-                shadow_normal /= shadow_effect
+        renderer_camera = self.camera
+        if camera is not None:
+            self.camera = camera
 
-                # if shadow_normal is nan, set it to 255
-                if np.isnan(shadow_normal):
-                    shadow_normal = 255
+        stats = self.frame_stats
+        stats.begin_frame()
+        try:
+            with stats.stage("update"):
+                self.update()
 
-                red = int(face_color[0] * shadow_normal / 255)
-                green = int(face_color[1] * shadow_normal / 255)
-                blue = int(face_color[2] * shadow_normal / 255)
+            with stats.stage("damage"):
+                damage = self.get_damage()
 
-                # dim the color based on the shadow_normal
-                face_color = (red, green, blue)
+            if damage is not None:
+                self.draw_frame(damage)
+        finally:
+            self.camera = renderer_camera
+            stats.end_frame()
 
-            pygame.draw.polygon(
-                surface,
-                face_color,
-                valid_verts,
-            )
+        return self.framebuffer
+
+    def render_batch(
+        self, cameras, output_dir, file_name="frame_{:05d}.png", processes=None
+    ):
+        """
+        Render the scene from many cameras to image files on a pool of worker processes,
+        see batch_render.render_batch
+        :param cameras: the cameras to render from, one image per camera
+        :param output_dir: the directory to write the images to
+        :param file_name: the file name of every image, formatted with the index of its camera
+        :param processes: the number of worker processes, defaults to the number of cores
+        :return: the paths of the images in the order of the cameras
+        """
+        from .batch_render import render_batch
+
+        return render_batch(self, cameras, output_dir, file_name, processes)
 
     def render_loop(self):
         import pygame
@@ -268,45 +479,45 @@ class SapphireRenderer:
         self.display.fill((255, 255, 255))
         pygame.display.set_caption("Sapphire Renderer")
 
+        stats = self.frame_stats
+
         while self.running:
             frame_start = time() + 0.00001
+            stats.begin_frame()
 
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    self.running = False
-
-            self.display.fill((255, 255, 255))
-            self.update()
+            with stats.stage("events"):
+                for event in pygame.event.get():
+                    if event.type == pygame.QUIT:
+                        self.running = False
+                    elif event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+                        self.invalidate()
 
-            # sort objects by distance from camera, reverse so that objects closer to camera are drawn last
-            self.instance_objects.sort(
-                key=lambda obj: np.linalg.norm(obj.position - self.camera.position),
-                reverse=True,
-            )
+            with stats.stage("update"):
+                self.update()
 
-            self.compiled_draw(self.display, self.camera)
+            with stats.stage("damage"):
+                damage = self.get_damage()
 
-            for obj in self.instance_objects:
-                if not obj.is_hidden() and not obj.compile_verts:
-                    obj.draw(self)
+            if damage is not None:
+                changed = self.draw_frame(damage)
 
-            pygame.display.flip()
+                with stats.stage("flip"):
+                    if changed.size == self.display_size:
+                        pygame.display.flip()
+                    else:
+                        pygame.display.update(changed)
 
-            # if fps is higher than fps setting, wait
-            if lock_fps and time() - frame_start < 1 / fps:
-                pygame.time.wait(int(1000 * (1 / fps - (time() - frame_start))))
+            # if fps is higher than fps setting, wait, when nothing changed there is no reason to go faster
+            with stats.stage("idle"):
+                if (lock_fps or damage is None) and time() - frame_start < 1 / fps:
+                    pygame.time.wait(int(1000 * (1 / fps - (time() - frame_start))))
 
             real_fps = 1 / (time() - frame_start)
-            average_fps_list.append(real_fps)
-
-            average_fps = sum(average_fps_list) / len(average_fps_list)
-
-            if len(average_fps_list) > 10:
-                average_fps_list.pop(0)
+            stats.end_frame()
 
             if show_fps:
                 pygame.display.set_caption(
-                    f"Sapphire Renderer - FPS: {int(average_fps)}"
+                    f"Sapphire Renderer - FPS: {int(stats.get_fps())}"
                 )
 
             if self.movement_handling:
@@ -316,4 +527,6 @@ class SapphireRenderer:
 
     def stop(self):
         self.running = False
-        self.thread.join()
+        if self.thread is not None:
+            self.thread.join()
+        self.async_loader.shutdown()
@@ -0,0 +1,326 @@
+import os
+import sys
+import json
+import argparse
+import numpy as np
+from .stl_loader import unique_points
+
+chunked_mesh_version = 1
+
+# the detail levels of every chunk, level 1 merges the vertices of each cell of a grid over the chunk
+level_count = 2
+coarse_grid_size = 16
+
+# triangles read from the source at a time while sorting them into chunks
+read_batch_size = 1 << 20
+
+_stl_record = np.dtype(
+    [("normal", "<f4", (3,)), ("vertices", "<f4", (3, 3)), ("attribute", "<u2")]
+)
+
+_level_arrays = (
+    ("vertices", "<f4", (3,)),
+    ("triangles", "<i4", (3,)),
+    ("normals", "<f4", (3,)),
+    ("windings", "i1", ()),
+)
+
+
+def stl_triangles(filename):
+    """
+    Memory map the triangles of a binary STL file, nothing is read until the triangles are used
+    :param filename: the path of the STL file
+    :return: (n, 3, 3) float32 corners of the triangles, (n, 3) float32 normals of the triangles
+    """
+    size = os.path.getsize(filename)
+    with open(filename, "rb") as file:
+        file.seek(80)
+        count = int(np.frombuffer(file.read(4), dtype="<u4")[0]) if size >= 84 else -1
+
+    if size != 84 + count * _stl_record.itemsize:
+        raise ValueError(
+            f"{filename} is not a binary STL file, only those can be streamed"
+        )
+
+    records = np.memmap(filename, dtype=_stl_record, mode="r", offset=84, shape=count)
+    return records["vertices"], records["normal"]
+
+
+def _spread_bits(values):
+    """
+    Spread the lowest 21 bits of every value out so two zero bits follow each of them
+    :param values: uint64 array
+    :return: uint64 array
+    """
+    values = values & np.uint64(0x1FFFFF)
+    for shift, mask in (
+        (32, 0x1F00000000FFFF),
+        (16, 0x1F0000FF0000FF),
+        (8, 0x100F00F00F00F00F),
+        (4, 0x10C30C30C30C30C3),
+        (2, 0x1249249249249249),
+    ):
+        values = (values | (values << np.uint64(shift))) & np.uint64(mask)
+    return values
+
+
+def morton_codes(points, low, high):
+    """
+    Order points along a z curve, points close in the order are close in space
+    :param points: (n, 3) points
+    :param low: the lowest corner of the box around all points
+    :param high: the highest corner of the box around all points
+    :return: (n,) uint64 codes
+    """
+    scale = (2**21 - 1) / np.maximum(high - low, 1e-12)
+    cells = ((points - low) * scale).astype(np.uint64)
+    return (
+        _spread_bits(cells[:, 0])
+        | (_spread_bits(cells[:, 1]) << np.uint64(1))
+        | (_spread_bits(cells[:, 2]) << np.uint64(2))
+    )
+
+
+def _get_windings(vertices, triangles, normals):
+    """
+    Find which way round each triangle is wound like get_face_windings, triangles without a normal count as
+    counter clockwise
+    :param vertices: (n, 3) vertices of the chunk
+    :param triangles: (m, 3) triangles of the chunk
+    :param normals: (m, 3) normals of the triangles, nan for triangles without one
+    :return: (m,) int8 windings
+    """
+    first = vertices[triangles[:, 0]]
+    geometric = np.cross(
+        vertices[triangles[:, 1]] - first, vertices[triangles[:, 2]] - first
+    )
+    windings = np.sign(np.einsum("ij,ij->i", geometric, np.nan_to_num(normals)))
+    windings[np.isnan(normals).any(axis=1)] = 1
+    return windings.astype(np.int8)
+
+
+def _coarsen(vertices, triangles, normals):
+    """
+    Merge the vertices in every cell of a grid over the chunk and drop the triangles that collapse
+    :param vertices: (n, 3) vertices of the chunk
+    :param triangles: (m, 3) triangles of the chunk
+    :param normals: (m, 3) normals of the triangles
+    :return: the vertices, triangles and normals of the coarse chunk
+    """
+    low = vertices.min(axis=0)
+    size = np.maximum(vertices.max(axis=0) - low, 1e-12)
+    cells = np.minimum(
+        ((vertices - low) / size * coarse_grid_size).astype(np.int64),
+        coarse_grid_size - 1,
+    )
+    _, cluster = unique_points(cells)
+    cluster_count = int(cluster.max()) + 1 if len(cluster) else 0
+
+    # every merged vertex is the average of the vertices in its cell
+    counts = np.bincount(cluster, minlength=cluster_count)
+    coarse_vertices = np.stack(
+        [
+            np.bincount(cluster, vertices[:, i], cluster_count) / counts
+            for i in range(3)
+        ],
+        axis=-1,
+    )
+
+    coarse_triangles = cluster[triangles]
+    keep = (
+        (coarse_triangles[:, 0] != coarse_triangles[:, 1])
+        & (coarse_triangles[:, 1] != coarse_triangles[:, 2])
+        & (coarse_triangles[:, 2] != coarse_triangles[:, 0])
+    )
+    return coarse_vertices, coarse_triangles[keep], normals[keep]
+
+
+def build_chunked_mesh(corners, directory, normals=None, chunk_faces=65536):
+    """
+    Split a triangle mesh into chunks of nearby triangles saved in a directory, so an Fchunked object can page in
+    only the chunks it draws. The source is read in batches and can be memory mapped, like stl_triangles,
+    only the sort order of the triangles is kept in memory
+    :param corners: (n, 3, 3) corners of the triangles
+    :param directory: the directory to write the chunks to
+    :param normals: (n, 3) normals of the triangles, None or rows of zeros to compute them from the corners
+    :param chunk_faces: the number of triangles of a chunk
+    :return: the path of the index file
+    """
+    os.makedirs(directory, exist_ok=True)
+    count = len(corners)
+
+    # sort the triangles along a z curve through their centers, so a run of them is a compact chunk
+    low = np.full(3, np.inf)
+    high = np.full(3, -np.inf)
+    for start in range(0, count, read_batch_size):
+        centers = corners[start : start + read_batch_size].mean(axis=1, dtype=float)
+        low = np.minimum(low, centers.min(axis=0))
+        high = np.maximum(high, centers.max(axis=0))
+
+    codes = np.empty(count, dtype=np.uint64)
+    for start in range(0, count, read_batch_size):
+        centers = corners[start : start + read_batch_size].mean(axis=1, dtype=float)
+        codes[start : start + len(centers)] = morton_codes(centers, low, high)
+    order = np.argsort(codes, kind="stable")
+    del codes
+
+    files = {
+        (level, name): open(os.path.join(directory, f"{name}_{level}.bin"), "wb")
+        for level in range(level_count)
+        for name, _, _ in _level_arrays
+    }
+    vertex_starts = [[0] for _ in range(level_count)]
+    face_starts = [[0] for _ in range(level_count)]
+    bounds = []
+    vertex_sum = np.zeros(3)
+
+    try:
+        for start in range(0, count, chunk_faces):
+            # sorted indices read the source front to back
+            chunk = np.sort(order[start : start + chunk_faces])
+            chunk_corners = np.asarray(corners[chunk], dtype=float)
+
+            vertices, inverse = unique_points(chunk_corners.reshape(-1, 3))
+            triangles = inverse.reshape(-1, 3)
+
+            chunk_normals = (
+                None if normals is None else np.asarray(normals[chunk], dtype=float)
+            )
+            if chunk_normals is None or not chunk_normals.any():
+                chunk_normals = np.cross(
+                    chunk_corners[:, 1] - chunk_corners[:, 0],
+                    chunk_corners[:, 2] - chunk_corners[:, 0],
+                )
+            lengths = np.linalg.norm(chunk_normals, axis=1)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                chunk_normals = chunk_normals / lengths[:, np.newaxis] * 255
+            chunk_normals[lengths == 0] = np.nan
+
+            bounds.append(
+                (vertices.min(axis=0).tolist(), vertices.max(axis=0).tolist())
+            )
+            vertex_sum += vertices.sum(axis=0)
+
+            levels = [(vertices, triangles, chunk_normals)]
+            levels.append(_coarsen(vertices, triangles, chunk_normals))
+
+            for level, (level_vertices, level_triangles, level_normals) in enumerate(
+                levels
+            ):
+                arrays = {
+                    "vertices": level_vertices,
+                    "triangles": level_triangles,
+                    "normals": level_normals,
+                    "windings": _get_windings(
+                        level_vertices, level_triangles, level_normals
+                    ),
+                }
+                for name, dtype, _ in _level_arrays:
+                    files[level, name].write(arrays[name].astype(dtype).tobytes())
+
+                vertex_starts[level].append(
+                    vertex_starts[level][-1] + len(level_vertices)
+                )
+                face_starts[level].append(face_starts[level][-1] + len(level_triangles))
+    finally:
+        for file in files.values():
+            file.close()
+
+    index_path = os.path.join(directory, "index.json")
+    with open(index_path, "w") as file:
+        json.dump(
+            {
+                "version": chunked_mesh_version,
+                "face_count": count,
+                "chunk_faces": chunk_faces,
+                "bounds": bounds,
+                # vertices on the border of two chunks are counted in both
+                "center": (vertex_sum / max(vertex_starts[0][-1], 1)).tolist(),
+                "vertex_starts": vertex_starts,
+                "face_starts": face_starts,
+            },
+            file,
+        )
+    return index_path
+
+
+class ChunkFiles:
+    def __init__(self, directory):
+        """
+        The chunks written by build_chunked_mesh, memory mapped so only the chunks that are read are loaded
+        :param directory: the directory of the chunks
+        """
+        with open(os.path.join(directory, "index.json")) as file:
+            index = json.load(file)
+        if index["version"] != chunked_mesh_version:
+            raise ValueError(
+                f"{directory} has version {index['version']} chunks, expected version {chunked_mesh_version}"
+            )
+
+        self.directory = directory
+        self.face_count = index["face_count"]
+        self.bounds = np.array(index["bounds"], dtype=float).reshape(-1, 2, 3)
+        self.center = np.array(index["center"], dtype=float)
+        self.vertex_starts = np.array(index["vertex_starts"], dtype=np.int64)
+        self.face_starts = np.array(index["face_starts"], dtype=np.int64)
+        self.face_counts = np.diff(self.face_starts, axis=1)
+
+        self.arrays = {}
+        for level in range(level_count):
+            rows = {
+                "vertices": int(self.vertex_starts[level, -1]),
+                "triangles": int(self.face_starts[level, -1]),
+                "normals": int(self.face_starts[level, -1]),
+                "windings": int(self.face_starts[level, -1]),
+            }
+            for name, dtype, shape in _level_arrays:
+                path = os.path.join(directory, f"{name}_{level}.bin")
+                if rows[name] == 0:
+                    self.arrays[level, name] = np.zeros((0,) + shape, dtype=dtype)
+                else:
+                    self.arrays[level, name] = np.memmap(
+                        path, dtype=dtype, mode="r", shape=(rows[name],) + shape
+                    )
+
+    def __len__(self):
+        return len(self.bounds)
+
+    def read_chunk(self, chunk, level):
+        """
+        Read a chunk into memory
+        :param chunk: the index of the chunk
+        :param level: the detail level, 0 is the full mesh
+        :return: (vertices, triangles indexing into them, normals, windings)
+        """
+        vertex_start, vertex_end = self.vertex_starts[level, chunk : chunk + 2]
+        face_start, face_end = self.face_starts[level, chunk : chunk + 2]
+        return (
+            np.array(
+                self.arrays[level, "vertices"][vertex_start:vertex_end], dtype=float
+            ),
+            np.array(
+                self.arrays[level, "triangles"][face_start:face_end], dtype=np.int64
+            ),
+            np.array(self.arrays[level, "normals"][face_start:face_end], dtype=float),
+            np.array(self.arrays[level, "windings"][face_start:face_end]),
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Split a binary STL file into chunks for the Fchunked object"
+    )
+    parser.add_argument("stl", help="the binary STL file")
+    parser.add_argument("directory", help="the directory to write the chunks to")
+    parser.add_argument("--chunk-faces", type=int, default=65536)
+    args = parser.parse_args(argv)
+
+    corners, normals = stl_triangles(args.stl)
+    index_path = build_chunked_mesh(corners, args.directory, normals, args.chunk_faces)
+    print(
+        f"Wrote {(len(corners) + args.chunk_faces - 1) // args.chunk_faces} chunks to {index_path}"
+    )
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,280 @@
+import os
+import hashlib
+import numpy as np
+from collections import OrderedDict
+from threading import Lock, Event, get_ident
+
+# bump when a loader returns different arrays for the same file, older files on disk are then ignored
+cache_version = 1
+
+_header_readers = {
+    (1, 0): np.lib.format.read_array_header_1_0,
+    (2, 0): np.lib.format.read_array_header_2_0,
+}
+
+
+def _write_arrays(path, arrays):
+    """
+    Write arrays one after the other as .npy records into one file, the file only appears once it is complete
+    :param path: the path of the file
+    :param arrays: the arrays to write
+    """
+    temp_path = f"{path}.{os.getpid()}.{get_ident()}.tmp"
+    with open(temp_path, "wb") as file:
+        for array in arrays:
+            np.lib.format.write_array(
+                file, np.ascontiguousarray(array), allow_pickle=False
+            )
+    os.replace(temp_path, path)
+
+
+def _read_arrays(path):
+    """
+    Memory map the arrays of a file written by _write_arrays, so only the parts that are used are read
+    :param path: the path of the file
+    :return: tuple of read only arrays
+    """
+    arrays = []
+    with open(path, "rb") as file:
+        size = os.fstat(file.fileno()).st_size
+        while file.tell() < size:
+            version = np.lib.format.read_magic(file)
+            shape, fortran_order, dtype = _header_readers[version](file)
+            offset = file.tell()
+            nbytes = int(np.prod(shape)) * dtype.itemsize
+
+            if nbytes:
+                # a plain array view, numba and the other code treat a memmap as a different type
+                array = np.asarray(
+                    np.memmap(
+                        path,
+                        dtype=dtype,
+                        mode="r",
+                        offset=offset,
+                        shape=shape,
+                        order="F" if fortran_order else "C",
+                    )
+                )
+            else:
+                # an empty file region can not be mapped
+                array = np.zeros(shape, dtype=dtype)
+                array.flags.writeable = False
+
+            arrays.append(array)
+            file.seek(offset + nbytes)
+    return tuple(arrays)
+
+
+class MeshCache:
+    def __init__(self, memory_budget=256 * 1024 * 1024, directory=None):
+        """
+        Cache of parsed mesh files, so a file that is loaded again is not parsed again.
+        Results are kept in memory until they take more than memory_budget bytes, the least recently used are
+        dropped first, and saved in directory, where they are memory mapped when the file is loaded in a later run.
+        Entries are keyed by the loader, the path, the size and the modification time of the file,
+        so changing the file makes it load again.
+        The arrays returned are shared between every load of the file and are read only, copy what is changed
+        :param memory_budget: the number of bytes of arrays to keep in memory
+        :param directory: the directory to save parsed meshes in, None to only keep them in memory
+        """
+        self.enabled = True
+        self.memory_budget = memory_budget
+        self.directory = directory
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._entries = OrderedDict()
+        self._entry_sizes = {}
+        self._memory_used = 0
+        self._loading = {}
+        self._lock = Lock()
+
+    def configure(self, memory_budget=None, directory=None):
+        """
+        Change the memory budget and the directory, entries over the new budget are dropped
+        :param memory_budget: the number of bytes of arrays to keep in memory, None keeps the current budget
+        :param directory: the directory to save parsed meshes in, "~" is expanded, None to not save them
+        """
+        with self._lock:
+            if memory_budget is not None:
+                self.memory_budget = memory_budget
+            self.directory = (
+                None if directory is None else os.path.expanduser(directory)
+            )
+            self._evict()
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        """
+        Load every file from scratch, for example to time the loaders
+        """
+        self.enabled = False
+
+    def clear(self, disk=False):
+        """
+        Drop the meshes kept in memory
+        :param disk: also delete the meshes saved in the directory
+        """
+        with self._lock:
+            self._entries.clear()
+            self._entry_sizes.clear()
+            self._memory_used = 0
+
+        if disk and self.directory is not None and os.path.isdir(self.directory):
+            for name in os.listdir(self.directory):
+                if name.endswith(".npy"):
+                    os.remove(os.path.join(self.directory, name))
+
+    @staticmethod
+    def get_key(loader, filename):
+        """
+        Get what identifies a parsed mesh
+        :param loader: the function that parses the file
+        :param filename: the path of the file
+        :return: (loader name, absolute path, size, modification time in nanoseconds)
+        """
+        path = os.path.realpath(filename)
+        stat = os.stat(path)
+        return (
+            f"{loader.__module__}.{loader.__qualname__}",
+            path,
+            stat.st_size,
+            stat.st_mtime_ns,
+        )
+
+    def get_disk_path(self, key):
+        """
+        Get the path a parsed mesh is saved at, every version of a file shares the prefix of the path
+        :param key: the key of the mesh
+        :return: the path in the directory
+        """
+        loader_name, path, size, mtime = key
+        prefix = hashlib.sha1(f"{loader_name}\0{path}".encode()).hexdigest()[:20]
+        return os.path.join(
+            self.directory, f"{prefix}-{size}-{mtime}-v{cache_version}.npy"
+        )
+
+    def load(self, loader, filename):
+        """
+        Load a mesh file with a loader, or get it from the cache when it was loaded before
+        :param loader: function taking the path and returning a tuple of arrays
+        :param filename: the path of the file
+        :return: the tuple of read only arrays the loader returns
+        """
+        if not self.enabled:
+            return loader(filename)
+
+        key = self.get_key(loader, filename)
+
+        with self._lock:
+            arrays = self._entries.get(key)
+            if arrays is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return arrays
+
+            # when another thread is loading the file, wait for it instead of parsing it twice
+            loading = self._loading.get(key)
+            if loading is None:
+                self._loading[key] = Event()
+
+        if loading is not None:
+            loading.wait()
+            return self.load(loader, filename)
+
+        try:
+            arrays = self._load_disk(key)
+            if arrays is not None:
+                self.disk_hits += 1
+            else:
+                self.misses += 1
+                arrays = tuple(np.asarray(array) for array in loader(filename))
+                for array in arrays:
+                    array.flags.writeable = False
+                self._save_disk(key, arrays)
+
+            self._remember(key, arrays)
+        finally:
+            with self._lock:
+                self._loading.pop(key).set()
+        return arrays
+
+    def _load_disk(self, key):
+        if self.directory is None:
+            return None
+
+        disk_path = self.get_disk_path(key)
+        if not os.path.exists(disk_path):
+            return None
+        try:
+            return _read_arrays(disk_path)
+        except (OSError, ValueError, KeyError):
+            # a broken file is parsed again and overwritten
+            return None
+
+    def _save_disk(self, key, arrays):
+        if self.directory is None:
+            return
+
+        disk_path = self.get_disk_path(key)
+        prefix = os.path.basename(disk_path).split("-")[0]
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            # older versions of the file are not needed anymore
+            for name in os.listdir(self.directory):
+                if name.startswith(prefix + "-") and name.endswith(".npy"):
+                    os.remove(os.path.join(self.directory, name))
+            _write_arrays(disk_path, arrays)
+        except OSError:
+            # the cache only saves time, a directory that can not be written to is not an error
+            pass
+
+    def _remember(self, key, arrays):
+        size = sum(array.nbytes for array in arrays)
+        if size > self.memory_budget:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._memory_used -= self._entry_sizes[key]
+            self._entries[key] = arrays
+            self._entry_sizes[key] = size
+            self._memory_used += size
+            self._evict()
+
+    def _evict(self):
+        while self._memory_used > self.memory_budget and self._entries:
+            key, _ = self._entries.popitem(last=False)
+            self._memory_used -= self._entry_sizes.pop(key)
+
+    def get_info(self):
+        """
+        :return: dict with the hit and miss counts, the number of meshes and bytes kept in memory and the budget
+        """
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "entries": len(self._entries),
+            "memory_used": self._memory_used,
+            "memory_budget": self.memory_budget,
+            "directory": self.directory,
+        }
+
+
+def prefetch_mesh(loader, filename, directory):
+    """
+    Parse a mesh file into a cache directory, so another process can memory map it instead of parsing it
+    :param loader: function taking the path and returning a tuple of arrays
+    :param filename: the path of the file
+    :param directory: the directory of the cache
+    :return:
+    """
+    MeshCache(0, directory).load(loader, filename)
+
+
+mesh_cache = MeshCache()
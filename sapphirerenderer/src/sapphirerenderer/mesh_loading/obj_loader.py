@@ -0,0 +1,224 @@
+import numpy as np
+
+# bytes read from the file at a time, a chunk ends at the last full line in it
+default_chunk_size = 1 << 22
+
+
+def _parse_records(bodies, width):
+    """
+    Parse the numbers of records like "v 1.0 2.0 3.0" in one go
+    :param bodies: the records without their first token
+    :param width: the number of values to keep per record
+    :return: (n, width) float array
+    """
+    if not bodies:
+        return np.zeros((0, width))
+
+    try:
+        values = np.fromstring(b"\n".join(bodies), dtype=float, sep=" ")
+    except ValueError:
+        values = None
+    if values is not None and len(values) == width * len(bodies):
+        return values.reshape(-1, width)
+
+    # records with more values, like vertices with colors
+    return np.array([body.split()[:width] for body in bodies], dtype=float)
+
+
+def _parse_faces(bodies):
+    """
+    Parse face records like "f 1/2/3 4/5/6 7/8/9", "f 1//3 2//4 3//5" or "f 1 2 3 4"
+    :param bodies: the face records without their first token
+    :return: (corner count of every face, vertex index of every corner, normal index of every corner),
+        the indices are as written in the file, normal indices are 0 when a corner has none
+    """
+    if not bodies:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, empty
+
+    text = b"\n".join(bodies)
+    chars = np.frombuffer(text, dtype=np.uint8)
+
+    # every run of characters between white space is a corner
+    space = (chars == 32) | (chars == 9) | (chars == 13) | (chars == 10)
+    corner_starts = ~space
+    corner_starts[1:] &= space[:-1]
+    corner_ids = np.cumsum(corner_starts) - 1
+    line_ids = np.cumsum(chars == 10)
+
+    counts = np.bincount(line_ids[corner_starts], minlength=len(bodies))
+    corner_count = int(counts.sum())
+    slashes = np.bincount(corner_ids[chars == 47], minlength=corner_count)
+
+    if corner_count and (slashes == slashes[0]).all():
+        # every corner has the same fields, a missing texture index becomes 0
+        field_count = int(slashes[0]) + 1
+        try:
+            fields = np.fromstring(
+                text.replace(b"//", b"/0/").replace(b"/", b" "), dtype=np.int64, sep=" "
+            )
+        except ValueError:
+            fields = None
+
+        if fields is not None and len(fields) == corner_count * field_count:
+            fields = fields.reshape(-1, field_count)
+            if field_count >= 3:
+                normal_indices = fields[:, 2]
+            else:
+                normal_indices = np.zeros(corner_count, dtype=np.int64)
+            return counts, fields[:, 0], normal_indices
+
+    # corners with different fields
+    vertex_indices = np.empty(corner_count, dtype=np.int64)
+    normal_indices = np.zeros(corner_count, dtype=np.int64)
+    for i, corner in enumerate(text.split()):
+        corner_fields = corner.split(b"/")
+        vertex_indices[i] = int(corner_fields[0])
+        if len(corner_fields) >= 3 and corner_fields[2]:
+            normal_indices[i] = int(corner_fields[2])
+    return counts, vertex_indices, normal_indices
+
+
+def _resolve_indices(indices, counts, bases):
+    """
+    Turn 1 based and negative OBJ indices into 0 based ones
+    :param indices: the indices of every corner as written in the file, 0 for none
+    :param counts: the corner count of every face
+    :param bases: the number of elements defined before every face, negative indices count back from it
+    :return: the 0 based indices, -1 for none
+    """
+    corner_bases = np.repeat(bases, counts)
+    return np.where(
+        indices > 0, indices - 1, np.where(indices < 0, corner_bases + indices, -1)
+    )
+
+
+def _parse_chunk(chunk, vertex_count, normal_count):
+    """
+    Parse the v, vn and f records of a chunk of whole lines
+    :param chunk: the bytes of the chunk
+    :param vertex_count: the number of vertices in the chunks before
+    :param normal_count: the number of normals in the chunks before
+    :return: (vertices, normals, corner count of every face, 0 based vertex index of every corner,
+        0 based normal index of every corner or -1)
+    """
+    # records can be indented and their tokens separated by tabs, the kind of a record is its first token
+    lines = [line.lstrip() for line in chunk.replace(b"\t", b" ").split(b"\n")]
+    kinds = np.array([line[:3] for line in lines], dtype="S3")
+    short_kinds = kinds.astype("S2")
+
+    vertex_lines = np.flatnonzero(short_kinds == b"v ")
+    normal_lines = np.flatnonzero(kinds == b"vn ")
+    face_lines = np.flatnonzero(short_kinds == b"f ")
+
+    vertices = _parse_records([lines[i][2:] for i in vertex_lines], 3)
+    normals = _parse_records([lines[i][3:] for i in normal_lines], 3)
+    counts, vertex_indices, normal_indices = _parse_faces(
+        [lines[i][2:] for i in face_lines]
+    )
+
+    # negative indices count back from the elements defined before the face
+    vertex_indices = _resolve_indices(
+        vertex_indices,
+        counts,
+        vertex_count + np.searchsorted(vertex_lines, face_lines),
+    )
+    normal_indices = _resolve_indices(
+        normal_indices,
+        counts,
+        normal_count + np.searchsorted(normal_lines, face_lines),
+    )
+
+    return vertices, normals, counts, vertex_indices, normal_indices
+
+
+def triangulate(counts, corners):
+    """
+    Split polygons into triangle fans around their first corner
+    :param counts: the corner count of every polygon
+    :param corners: the corners of all polygons one after the other
+    :return: (m, 3) corners of the triangles, (m,) index of the polygon of every triangle
+    """
+    counts = np.asarray(counts, dtype=np.int64)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1])).astype(np.int64)
+
+    # polygons with fewer than 3 corners have no triangles
+    triangle_counts = np.maximum(counts - 2, 0)
+    polygons = np.repeat(np.arange(len(counts)), triangle_counts)
+    first_triangles = np.concatenate(([0], np.cumsum(triangle_counts)[:-1]))
+    steps = np.arange(len(polygons)) - np.repeat(first_triangles, triangle_counts) + 1
+
+    first = starts[polygons]
+    triangles = np.stack(
+        (corners[first], corners[first + steps], corners[first + steps + 1]), axis=-1
+    )
+    return triangles, polygons
+
+
+def load_obj(filename, chunk_size=default_chunk_size):
+    """
+    Load the vertices and faces of an OBJ file, reading it in chunks so only one chunk of text is in memory at a time.
+    Polygons are split into triangles, their normals are averaged from the vn normals of their corners,
+    or computed from their vertices when a corner has none
+    :param filename: the path of the OBJ file
+    :param chunk_size: the number of bytes to read at a time
+    :return: (n, 3) float vertices, (m, 3) int64 triangles indexing into them,
+        (m, 3) unit face normals scaled to 255, rows of nan for degenerate triangles
+    """
+    vertex_chunks, normal_chunks = [], []
+    count_chunks, corner_chunks, corner_normal_chunks = [], [], []
+    vertex_count = normal_count = 0
+
+    remainder = b""
+    with open(filename, "rb") as file:
+        while True:
+            data = file.read(chunk_size)
+            if data:
+                data = remainder + data
+                end = data.rfind(b"\n") + 1
+                chunk, remainder = data[:end], data[end:]
+            else:
+                chunk, remainder = remainder, b""
+
+            if chunk:
+                vertices, normals, counts, corners, corner_normals = _parse_chunk(
+                    chunk, vertex_count, normal_count
+                )
+                vertex_chunks.append(vertices)
+                normal_chunks.append(normals)
+                count_chunks.append(counts)
+                corner_chunks.append(corners)
+                corner_normal_chunks.append(corner_normals)
+                vertex_count += len(vertices)
+                normal_count += len(normals)
+
+            if not data:
+                break
+
+    vertices = np.concatenate(vertex_chunks)
+    normals = np.concatenate(normal_chunks)
+    corners = np.concatenate(corner_chunks)
+    corner_normals = np.concatenate(corner_normal_chunks)
+
+    if len(corners) and (corners.min() < 0 or corners.max() >= len(vertices)):
+        raise ValueError("OBJ file has faces with vertices that do not exist")
+    if len(corner_normals) and corner_normals.max() >= len(normals):
+        raise ValueError("OBJ file has faces with normals that do not exist")
+
+    counts = np.concatenate(count_chunks)
+    triangles, _ = triangulate(counts, corners)
+    triangle_normals, _ = triangulate(counts, corner_normals)
+
+    a, b, c = (vertices[triangles[:, i]] for i in range(3))
+    face_normals = np.cross(b - a, c - a)
+
+    # the normals in the file are what the model was made with, use them where every corner has one
+    has_normals = (triangle_normals >= 0).all(axis=1)
+    face_normals[has_normals] = normals[triangle_normals[has_normals]].sum(axis=1)
+
+    lengths = np.linalg.norm(face_normals, axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        face_normals = face_normals / lengths[:, np.newaxis] * 255
+    face_normals[lengths == 0] = np.nan
+
+    return vertices, triangles.astype(np.int64), face_normals
@@ -0,0 +1,76 @@
+import numpy as np
+from stl import mesh
+
+
+def unique_points(points):
+    """
+    Deduplicate points in one sort, like np.unique(points, axis=0, return_inverse=True) but without
+    sorting the rows as opaque records, which is many times slower
+    :param points: (n, 3) points
+    :return: (k, 3) unique points in lexicographic order, (n,) int64 index of every point in them
+    """
+    if len(points) == 0:
+        return points.reshape(0, 3), np.zeros(0, dtype=np.int64)
+
+    order = np.lexsort((points[:, 2], points[:, 1], points[:, 0]))
+    sorted_points = points[order]
+
+    # a sorted point starts a new unique point when it differs from the one before it
+    first = np.empty(len(points), dtype=bool)
+    first[0] = True
+    np.any(sorted_points[1:] != sorted_points[:-1], axis=1, out=first[1:])
+
+    inverse = np.empty(len(points), dtype=np.int64)
+    inverse[order] = np.cumsum(first) - 1
+    return sorted_points[first], inverse
+
+
+def load_stl(filename):
+    """
+    Load an STL file into shared vertices and triangles, the corners of all triangles are deduplicated in one pass
+    :param filename: the path of the STL file
+    :return: (n, 3) float vertices, (m, 3) int64 triangles indexing into them,
+        (m, 3) unit face normals scaled to 255, rows of nan for degenerate triangles
+    """
+    mesh_data = mesh.Mesh.from_file(filename)
+
+    vertices, inverse = unique_points(mesh_data.vectors.reshape(-1, 3))
+    triangles = inverse.reshape(-1, 3)
+
+    normals = mesh_data.normals.astype(float)
+    lengths = np.linalg.norm(normals, axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        normals = normals / lengths[:, np.newaxis] * 255
+    normals[lengths == 0] = np.nan
+
+    return vertices.astype(float), triangles, normals
+
+
+def load_stl_edges(filename):
+    """
+    Load an STL file as a wireframe, every edge once, even when two triangles share it
+    :param filename: the path of the STL file
+    :return: (n, 3) float vertices, (k, 2) int64 edges indexing into them
+    """
+    vertices, triangles, _ = load_stl(filename)
+    return vertices, get_edges(triangles)
+
+
+def get_edges(triangles):
+    """
+    Get the edges of a triangle mesh, an edge shared by two triangles is only listed once
+    :param triangles: (m, 3) vertex indices of the triangles
+    :return: (k, 2) int64 vertex indices of the edges, the smaller index first
+    """
+    triangles = np.asarray(triangles, dtype=np.int64)
+    edges = np.concatenate(
+        (triangles[:, [0, 1]], triangles[:, [1, 2]], triangles[:, [2, 0]])
+    )
+    edges.sort(axis=1)
+
+    # one int64 key per edge is much faster to deduplicate than rows
+    vertex_count = int(triangles.max()) + 1 if len(triangles) else 0
+    keys = edges[:, 0] * vertex_count + edges[:, 1]
+    keys.sort()
+    keys = keys[np.concatenate(([True], keys[1:] != keys[:-1]))]
+    return np.stack((keys // vertex_count, keys % vertex_count), axis=-1)
@@ -1,6 +1,12 @@
+import itertools
 import numpy as np
-from time import sleep
+import pygame
+from time import sleep, perf_counter
 from ..point_math.matricies import get_pitch_yaw_roll_matrix
+from ..utility_objects.tracer import tracer
+
+# ids are never reused, so reports can tell apart objects of the same class
+_object_ids = itertools.count()
 
 
 class Object:
@@ -26,42 +32,77 @@ class Object:
 
         self.drawing = False
         self.ambiguous = False
+        self.version = 0
+        self.object_id = next(_object_ids)
 
         self.rotation_matrix = get_pitch_yaw_roll_matrix(*rotation)
 
     def wait_for_draw(self):
+        if not self.drawing:
+            return
+
+        start = perf_counter()
         while self.drawing:
             sleep(0.0001)
+        tracer.add_span(
+            "wait_for_draw", start, perf_counter(), "wait", {"object": str(self)}
+        )
 
     def wait_for_ambiguous(self):
+        if not self.ambiguous:
+            return
+
+        start = perf_counter()
         while self.ambiguous:
             sleep(0.0001)
+        tracer.add_span(
+            "wait_for_ambiguous", start, perf_counter(), "wait", {"object": str(self)}
+        )
+
+    def mark_dirty(self):
+        """
+        Flag that the object changed so the renderer re-reads and redraws it
+        :return:
+        """
+        self.version += 1
 
     def is_hidden(self):
         return self.hidden
 
     def hide(self):
-        self.hidden = True
+        if not self.hidden:
+            self.hidden = True
+            self.mark_dirty()
         return self
 
     def show(self):
-        self.hidden = False
+        if self.hidden:
+            self.hidden = False
+            self.mark_dirty()
         return self
 
     def set_position(self, position):
         self.position = position
+        self.mark_dirty()
 
     def move_relative(self, vector):
         self.position += vector
+        self.mark_dirty()
 
     def set_rotation(self, rotation):
         self.rotation = rotation
+        self.mark_dirty()
 
     def set_scale(self, scale):
         self.scale = scale
+        self.mark_dirty()
 
     def set_color(self, color):
+        # setting the same color every frame should not redraw the object
+        if np.array_equal(self.color, color):
+            return
         self.color = color
+        self.mark_dirty()
 
     def get_position(self):
         return self.position
@@ -75,6 +116,38 @@ class Object:
     def get_color(self):
         return self.color
 
+    def get_bounding_sphere(self):
+        """
+        Sphere that contains the whole object, used to skip objects that are out of view
+        :return: (center, radius), or None if the object can not be culled
+        """
+        return None
+
+    def get_screen_rect(self, camera, screen_size, point_radius=0):
+        """
+        Screen area the object can cover, used to only redraw the parts of the screen that changed
+        :param camera: the camera the object is drawn with
+        :param screen_size: the size of the screen
+        :param point_radius: extra room in pixels at distance 1 for things drawn around the vertices
+        :return: a pygame Rect, empty if nothing is drawn, or None if the area is unknown
+        """
+        if self.is_hidden():
+            return pygame.Rect(0, 0, 0, 0)
+
+        sphere = self.get_bounding_sphere()
+        if sphere is None:
+            return None
+        return camera.sphere_screen_rect(
+            sphere[0], sphere[1], screen_size, point_radius
+        )
+
+    def get_primitive_counts(self):
+        """
+        Get how much geometry the object draws
+        :return: (number of vertices, number of faces or lines)
+        """
+        return 0, 0
+
     def update(self):
         """
         empty update for child classes to override
@@ -82,5 +155,14 @@ class Object:
         """
         pass
 
+    def update_view(self, camera, far_distance=None):
+        """
+        empty update for child classes that change with the camera, called before every frame after update
+        :param camera: the camera the frame is drawn from
+        :param far_distance: the distance objects are drawn up to, None for no limit
+        :return:
+        """
+        pass
+
     def __str__(self):
         return self.__class__.__name__
@@ -1,32 +1,161 @@
-from ..object_classes.base_object import Object
+from ..object_classes.transformed_object import TransformedObject
 import pygame
 from ..point_math.average_points import average_points
 import numpy as np
-from ..point_math.project_point import project_point
+from ..point_math.project_point import project_points
 from ..point_math.matricies import get_pitch_yaw_roll_matrix
+from ..utility_objects.packed_faces import PackedFaces
+from ..utility_objects.tracer import traced
 from numba import njit
 
 pygame.init()
 
 
-@njit("float64[:](float64[:, :], float64[:])", fastmath=True, parallel=False)
+@njit(
+    "float64[:](float64[:, :], float64[:])", fastmath=True, parallel=False, nogil=True
+)
 def get_vertex_distances(vertices, camera_position):
     moved_vertices = vertices - camera_position
     return np.array([np.linalg.norm(vertex) for vertex in moved_vertices])
 
 
-def get_face_distances(faces, vertices, camera_position):
-    vertex_distances = get_vertex_distances(np.array(vertices), camera_position)
-    face_distances = []
-    for face in faces:
-        face_distance = 0
-        for vertex_index in face[0]:
-            face_distance += vertex_distances[vertex_index]
-        face_distances.append(face_distance / len(face[0]))
+@njit(
+    "float64[:](int64[:], int64[:], float64[:, :], float64[:])",
+    fastmath=True,
+    parallel=False,
+    nogil=True,
+)
+def get_packed_face_distances(face_offsets, face_indices, vertices, camera_position):
+    """
+    Average distance from the camera to the vertices of each face
+    :param face_offsets: face i uses face_indices[face_offsets[i]:face_offsets[i + 1]]
+    :param face_indices: the vertex indices of all faces
+    :param vertices: the vertices the faces index into
+    :param camera_position: the position of the camera
+    :return: the distance of every face
+    """
+    vertex_distances = np.empty(len(vertices))
+    for i in range(len(vertices)):
+        x = vertices[i, 0] - camera_position[0]
+        y = vertices[i, 1] - camera_position[1]
+        z = vertices[i, 2] - camera_position[2]
+        vertex_distances[i] = np.sqrt(x * x + y * y + z * z)
+
+    face_count = len(face_offsets) - 1
+    face_distances = np.empty(face_count)
+    for i in range(face_count):
+        start = face_offsets[i]
+        end = face_offsets[i + 1]
+        face_distance = 0.0
+        for j in range(start, end):
+            face_distance += vertex_distances[face_indices[j]]
+        face_distances[i] = face_distance / max(end - start, 1)
+    return face_distances
+
+
+@njit(fastmath=True, nogil=True)
+def get_selected_face_distances(
+    faces, face_offsets, face_indices, vertices, camera_position
+):
+    """
+    Average distance from the camera to the vertices of some of the faces
+    :param faces: the indices of the faces to measure
+    :param face_offsets: face i uses face_indices[face_offsets[i]:face_offsets[i + 1]]
+    :param face_indices: the vertex indices of all faces
+    :param vertices: the vertices the faces index into
+    :param camera_position: the position of the camera
+    :return: the distance of every selected face
+    """
+    face_distances = np.empty(len(faces))
+    for i in range(len(faces)):
+        start = face_offsets[faces[i]]
+        end = face_offsets[faces[i] + 1]
+        face_distance = 0.0
+        for j in range(start, end):
+            vertex = face_indices[j]
+            x = vertices[vertex, 0] - camera_position[0]
+            y = vertices[vertex, 1] - camera_position[1]
+            z = vertices[vertex, 2] - camera_position[2]
+            face_distance += np.sqrt(x * x + y * y + z * z)
+        face_distances[i] = face_distance / max(end - start, 1)
     return face_distances
 
 
-class FlatFacesObject(Object):
+def get_face_distances(faces, vertices, camera_position):
+    """
+    Average distance from the camera to the vertices of each face
+    :param faces: a list of faces or PackedFaces
+    :param vertices: the vertices the faces index into
+    :param camera_position: the position of the camera
+    :return: the distance of every face
+    """
+    if not isinstance(faces, PackedFaces):
+        faces = PackedFaces.from_faces(faces)
+
+    return get_packed_face_distances(
+        faces.offsets,
+        faces.indices,
+        np.asarray(vertices, dtype=float),
+        np.asarray(camera_position, dtype=float),
+    )
+
+
+def shade_face_colors(colors, normals, negative_rotation_matrix, shadow_effect):
+    """
+    Dim face colors based on how their normals face after the object rotation
+    :param colors: (n, 3) face colors
+    :param normals: (n, 3) face normals, faces with nan normals keep their color
+    :param negative_rotation_matrix: the inverse rotation matrix of the object
+    :param shadow_effect: the strength of the shadow
+    :return: (n, 3) int array of shaded colors
+    """
+    rotated_normals = np.dot(normals, negative_rotation_matrix)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        shadow_normal = ((rotated_normals[:, 2] + 255) / 510) * 255
+        shadow_normal /= shadow_effect
+
+    # if shadow_normal is nan, set it to 255
+    shadow_normal[np.isnan(shadow_normal)] = 255
+
+    # dim the color based on the shadow_normal
+    shaded = (colors * shadow_normal[:, np.newaxis] / 255).astype(np.int64)
+    return np.clip(shaded, 0, 255)
+
+
+def get_face_windings(packed_faces, vertices):
+    """
+    Find which way round each face is wound, using the stored face normal when there is one
+    :param packed_faces: the packed faces
+    :param vertices: the vertices in the same frame as the stored normals
+    :return: (n,) int8 array, 1 for counter clockwise seen from outside, -1 for clockwise, 0 if unknown
+    """
+    vertices = np.asarray(vertices, dtype=float)
+    starts = packed_faces.offsets[:-1]
+    has_triangle = packed_faces.face_sizes() >= 3
+    windings = np.zeros(len(packed_faces), dtype=np.int8)
+    if len(vertices) == 0 or not has_triangle.any():
+        return windings
+
+    starts = starts[has_triangle]
+    first = vertices[packed_faces.indices[starts]]
+    second = vertices[packed_faces.indices[starts + 1]]
+    third = vertices[packed_faces.indices[starts + 2]]
+    geometric_normals = np.cross(second - first, third - first)
+
+    # faces without a normal are assumed to be counter clockwise seen from outside
+    normals = packed_faces.normals[has_triangle]
+    has_normal = ~np.isnan(normals).any(axis=1)
+    face_windings = np.ones(len(starts), dtype=np.int8)
+    face_windings[has_normal] = np.sign(
+        np.einsum("ij,ij->i", geometric_normals[has_normal], normals[has_normal])
+    )
+
+    windings[has_triangle] = face_windings
+    return windings
+
+
+class FlatFacesObject(TransformedObject):
     def __init__(
         self,
         vertices,
@@ -37,6 +166,7 @@ class FlatFacesObject(Object):
         shadow_effect=1,
         compile_verts=True,
         move_to_zero=True,
+        back_face_culling=True,
     ):
         """
         Object with flat faces
@@ -47,6 +177,9 @@ class FlatFacesObject(Object):
         :param shadow: whether to render shadows
         :param shadow_effect: the strength of the shadow
         :param compile_verts: whether to compile the vertices in the rendering loop
+        :param move_to_zero: whether to center the vertices on the origin
+        :param back_face_culling: whether faces pointing away from the camera can be skipped,
+            turn off for open meshes that are seen from both sides
         """
         self.drawing = False
         self.ambiguous = False
@@ -56,21 +189,29 @@ class FlatFacesObject(Object):
         super().__init__(color=color, position=self.position)
         self.show()
 
-        self.vertices = vertices
+        # the vertices are never changed, transforms only change the model matrix
+        vertices = np.asarray(vertices, dtype=float)
         if move_to_zero:
-            self.__util_move_to_zero()
-        self.original_vertices = vertices.copy()
+            self.position = np.array([0, 0, 0], dtype=float)
+            vertices = vertices - average_points(vertices)
+        self._set_local_vertices(vertices)
 
         self.faces = faces
+        self._packed_faces = None
+        self._packed_source = None
+        self._face_windings = None
+        self._windings_source = None
+        self.back_face_culling = back_face_culling
         self.shadow_effect = shadow_effect
         self.shadow = shadow
 
         self.rotation = np.array([0, 0, 0], dtype=float)
         self.negative_rotation_matrix = get_pitch_yaw_roll_matrix(*-self.rotation)
-        self.center_point = average_points(vertices)
+        self.center_point = self.get_vertex_average()
 
         self.move_absolute(position)
 
+    @traced
     def move_relative(self, vector):
         """
         Move the object by a relative amount
@@ -81,25 +222,12 @@ class FlatFacesObject(Object):
 
         self.ambiguous = True
         self.position += vector
-        for i in range(len(self.vertices)):
-            self.vertices[i] += vector
-        self.center_point = average_points(self.vertices)
-        self.ambiguous = False
-
-    def __util_move_to_zero(self):
-        """
-        Move the object to the origin
-        :return:
-        """
-        self.wait_for_draw()
-
-        self.ambiguous = True
-        self.center_point = average_points(self.vertices)
-        self.position = np.array([0, 0, 0], dtype=float)
-        for i in range(len(self.vertices)):
-            self.vertices[i] -= self.center_point
+        self._translate_vertices(vector)
+        self.center_point = self.get_vertex_average()
+        self.mark_dirty()
         self.ambiguous = False
 
+    @traced
     def move_absolute(self, vector):
         """
         Move the object to an absolute position
@@ -111,22 +239,25 @@ class FlatFacesObject(Object):
         self.ambiguous = True
         vector = np.array(vector, dtype=float)
         self.position = vector
-        for i in range(len(self.vertices)):
-            self.vertices[i] = self.original_vertices[i] + vector
-        self.center_point = average_points(self.vertices)
+        self._reset_to_original(vector)
+        self.center_point = self.get_vertex_average()
+        self.mark_dirty()
         self.ambiguous = False
 
-    def __rotate(self, x_axis, y_axis, z_axis):
+    def __rotate(self, x_axis, y_axis, z_axis, point):
         self.wait_for_draw()
 
         self.ambiguous = True
         rotation_matrix = get_pitch_yaw_roll_matrix(x_axis, z_axis, y_axis)
-        self.vertices = np.dot(self.vertices, rotation_matrix.T)
-        self.original_vertices = np.dot(self.original_vertices, rotation_matrix.T)
+        self._transform_vertices(rotation_matrix, point)
+        # the original vertices always turn around the origin
+        self._transform_original_vertices(rotation_matrix, np.zeros(3))
         self.rotation += np.array([x_axis, z_axis, y_axis], dtype=float)
         self.negative_rotation_matrix = get_pitch_yaw_roll_matrix(*-self.rotation)
+        self.mark_dirty()
         self.ambiguous = False
 
+    @traced
     def rotate_local(self, x_axis, y_axis, z_axis):
         """
         Rotate the object around its center point
@@ -142,13 +273,11 @@ class FlatFacesObject(Object):
             np.radians(z_axis),
         )
 
-        self.wait_for_draw()
-        self.ambiguous = True
-        self.vertices -= self.center_point
-        self.__rotate(x_axis, y_axis, z_axis)
-        self.vertices += self.center_point
-        self.ambiguous = False
+        self.__rotate(
+            x_axis, y_axis, z_axis, np.asarray(self.center_point, dtype=float)
+        )
 
+    @traced
     def rotate_around_point(
         self, x_axis, y_axis, z_axis, point=np.array([0, 0, 0], dtype=float)
     ):
@@ -168,14 +297,9 @@ class FlatFacesObject(Object):
             np.radians(z_axis),
         )
 
-        self.wait_for_draw()
-
-        self.ambiguous = True
-        self.vertices -= point
-        self.__rotate(x_axis, y_axis, z_axis)
-        self.vertices += point
-        self.ambiguous = False
+        self.__rotate(x_axis, y_axis, z_axis, np.asarray(point, dtype=float))
 
+    @traced
     def set_scale(self, scale_factor, center_point=None):
         """
         Scale the object
@@ -186,18 +310,81 @@ class FlatFacesObject(Object):
         if center_point is None:
             center_point = self.center_point
 
+        center_point = np.asarray(center_point, dtype=float)
+        scale_matrix = np.eye(3) * scale_factor
+
         self.wait_for_draw()
 
         self.ambiguous = True
-        self.vertices -= center_point
-        self.vertices *= scale_factor
-        self.vertices += center_point
-
-        self.original_vertices -= center_point
-        self.original_vertices *= scale_factor
-        self.original_vertices += center_point
+        self._transform_vertices(scale_matrix, center_point)
+        self._transform_original_vertices(scale_matrix, center_point)
+        self.mark_dirty()
         self.ambiguous = False
 
+    def get_packed_faces(self):
+        """
+        Get the faces of the object as flat arrays, repacked only when the face list is replaced
+        :return: the packed faces
+        """
+        if self._packed_source is not self.faces:
+            if isinstance(self.faces, PackedFaces):
+                self._packed_faces = self.faces
+            else:
+                self._packed_faces = PackedFaces.from_faces(self.faces, self.color)
+            self._packed_source = self.faces
+        return self._packed_faces
+
+    def get_face_layout(self):
+        """
+        :return: (key that changes when the faces are replaced, face count, index count)
+        """
+        packed_faces = self.get_packed_faces()
+        return packed_faces, len(packed_faces), len(packed_faces.indices)
+
+    def write_faces(self, indices, offsets, colors, normals):
+        """
+        Copy the packed faces into the scene buffer, called when it lays out the scene
+        :param indices: array to write the vertex indices to, relative to the first vertex of the object
+        :param offsets: array to write the end of every face to, relative to the first index of the object
+        :param colors: (n, 3) array to write the face colors to
+        :param normals: (n, 3) array to write the face normals to
+        :return:
+        """
+        packed_faces = self.get_packed_faces()
+        indices[:] = packed_faces.indices
+        offsets[:] = packed_faces.offsets[1:]
+        colors[:] = packed_faces.colors
+        normals[:] = packed_faces.normals
+
+    def get_primitive_counts(self):
+        return self.get_vertex_count(), len(self.get_packed_faces())
+
+    def get_shaded_colors(self, colors, normals):
+        """
+        Shade the faces by the rotation of the object, called by the scene buffer
+        :param colors: (n, 3) face colors
+        :param normals: (n, 3) face normals
+        :return: (n, 3) shaded colors
+        """
+        return shade_face_colors(
+            colors, normals, self.negative_rotation_matrix, self.shadow_effect
+        )
+
+    def get_face_windings(self):
+        """
+        Get the winding of every face, recomputed only when the face list is replaced,
+        flipped while the object is mirrored
+        :return: (n,) int8 array of face windings
+        """
+        packed_faces = self.get_packed_faces()
+        if self._windings_source is not packed_faces:
+            # the stored normals are in the frame of the local vertices
+            self._face_windings = get_face_windings(packed_faces, self.local_vertices)
+            self._windings_source = packed_faces
+        if self.is_mirrored():
+            return -self._face_windings
+        return self._face_windings
+
     def draw(self, renderer):
         """
         Draw the object
@@ -210,60 +397,45 @@ class FlatFacesObject(Object):
         self.wait_for_ambiguous()
         self.drawing = True
 
-        face_distances = get_face_distances(self.faces, self.vertices, camera.position)
+        packed_faces = self.get_packed_faces()
+        vertices = np.asarray(self.vertices, dtype=float)
+
+        face_distances = get_packed_face_distances(
+            packed_faces.offsets,
+            packed_faces.indices,
+            vertices,
+            np.asarray(camera.position, dtype=float),
+        )
 
         sorted_indices = np.argsort(face_distances)[
             ::-1
         ]  # Sorting indices in descending order
 
-        self.faces = [self.faces[i] for i in sorted_indices]
-
-        moved_vertices = self.vertices - camera.position
-        reshaped_vertices = moved_vertices.reshape(-1, 1, moved_vertices.shape[1])
-        rotated_vertices = np.sum(camera.rotation_matrix * reshaped_vertices, axis=-1)
-
-        projected_vertices = [
-            project_point(
-                vertex,
-                camera.offset_array,
-                camera.focal_length,
-                display_size,
-                camera.fov_side,
-                camera.fov_top,
-            )[0]
-            for vertex in rotated_vertices
-        ]
-
-        for face in self.faces:
-            face_verts = face[0]
-            face_color = face[1] if len(face) > 1 else self.color
-            face_normal = face[2] if len(face) > 2 else None
-
-            # rotate face normal by object rotation
-            if face_normal is not None and self.shadow:
-                face_normal = np.dot(face_normal, self.negative_rotation_matrix)
-
-                shadow_normal = ((face_normal[2] + 255) / 510) * 255
-
-                shadow_normal /= self.shadow_effect
-
-                # if shadow_normal is nan, set it to 255
-                if np.isnan(shadow_normal):
-                    shadow_normal = 255
-
-                # dim the color based on the shadow_normal
-                face_color = tuple(
-                    int(color * shadow_normal / 255) for color in face_color
-                )
-
-            if any(
-                vertex is None
-                for vertex in [projected_vertices[vertex] for vertex in face_verts]
-            ):
+        if self.shadow:
+            face_colors = shade_face_colors(
+                packed_faces.colors,
+                packed_faces.normals,
+                self.negative_rotation_matrix,
+                self.shadow_effect,
+            ).tolist()
+        else:
+            face_colors = packed_faces.colors.tolist()
+
+        projected_vertices, visible, _ = project_points(vertices, camera, display_size)
+        projected_vertices = projected_vertices.tolist()
+        visible = visible.tolist()
+
+        offsets = packed_faces.offsets.tolist()
+        indices = packed_faces.indices.tolist()
+
+        for face in sorted_indices.tolist():
+            face_verts = indices[offsets[face] : offsets[face + 1]]
+
+            if not all(visible[vertex] for vertex in face_verts):
                 continue
             pygame.draw.polygon(
                 surface,
-                face_color,
+                face_colors[face],
                 [projected_vertices[vertex] for vertex in face_verts],
             )
 
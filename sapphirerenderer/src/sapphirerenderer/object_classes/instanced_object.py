@@ -0,0 +1,308 @@
+import numpy as np
+from .base_object import Object
+from .flat_faces_object import shade_face_colors
+from ..point_math.matricies import get_pitch_yaw_roll_matrices
+from ..point_math.transform_instances import transform_instances_into
+from ..utility_objects.tracer import traced
+
+
+class InstancedObject(Object):
+    def __init__(self, mesh, shadow=True, shadow_effect=1, back_face_culling=True):
+        """
+        Many copies of one mesh, each with its own position, rotation, scale and color.
+        The mesh is stored once, the vertices of the copies are only made when the scene buffer
+        writes the object, in one pass over every instance
+        :param mesh: the MeshResource to draw at every instance
+        :param shadow: whether to render shadows
+        :param shadow_effect: the strength of the shadow
+        :param back_face_culling: whether faces pointing away from the camera can be skipped
+        """
+        super().__init__(position=np.zeros(3), color=(0, 0, 0))
+        self.show()
+
+        self.mesh = mesh
+        self.compile_verts = True
+        self.shadow = shadow
+        self.shadow_effect = shadow_effect
+        self.back_face_culling = back_face_culling
+
+        self.positions = np.zeros((0, 3))
+        # rotations are in degrees around the x, y and z axis, like rotate_local
+        self.rotations = np.zeros((0, 3))
+        self.scales = np.zeros(0)
+        # rows of nan keep the colors of the mesh
+        self.colors = np.zeros((0, 3))
+
+        self.matrices = np.zeros((0, 3, 3))
+        self.negative_rotation_matrices = np.zeros((0, 3, 3))
+        self.center_point = np.zeros(3)
+
+        # bumped when the faces have to be laid out again, the scene buffer writes them straight from the mesh
+        self._faces_version = 0
+        self._bounding_sphere = None
+        self._bounds_version = None
+
+    def __len__(self):
+        return len(self.positions)
+
+    def _changed(self, faces_changed=False):
+        """
+        Update what depends on the instances, called while the object is marked ambiguous
+        :param faces_changed: whether the faces have to be laid out again, after instances were added, removed,
+            recolored or turned inside out
+        :return:
+        """
+        x_axis, y_axis, z_axis = np.radians(self.rotations).T
+        rotation_matrices = get_pitch_yaw_roll_matrices(x_axis, z_axis, y_axis)
+        self.matrices = rotation_matrices * self.scales[:, np.newaxis, np.newaxis]
+        self.negative_rotation_matrices = get_pitch_yaw_roll_matrices(
+            -x_axis, -z_axis, -y_axis
+        )
+
+        if len(self):
+            mesh_center = self.mesh.bounding_sphere[0]
+            self.center_point = np.mean(
+                np.einsum("ijk,k->ij", self.matrices, mesh_center) + self.positions,
+                axis=0,
+            )
+        else:
+            self.center_point = np.zeros(3)
+        self.position = self.center_point
+
+        if faces_changed:
+            self._faces_version += 1
+        self.mark_dirty()
+
+    @traced
+    def add_instances(self, positions, rotations=None, scales=None, colors=None):
+        """
+        Add many instances at once
+        :param positions: (n, 3) positions of the instances
+        :param rotations: (n, 3) rotations in degrees around the x, y and z axis, None for no rotation
+        :param scales: (n,) scales of the instances, None for 1
+        :param colors: (n, 3) colors of the instances, None or rows of nan to keep the colors of the mesh
+        :return: the indices of the new instances
+        """
+        positions = np.array(positions, dtype=float).reshape(-1, 3)
+        count = len(positions)
+        rotations = np.zeros((count, 3)) if rotations is None else rotations
+        scales = np.ones(count) if scales is None else scales
+        colors = np.full((count, 3), np.nan) if colors is None else colors
+
+        self.wait_for_draw()
+
+        self.ambiguous = True
+        start = len(self)
+        self.positions = np.concatenate((self.positions, positions))
+        self.rotations = np.concatenate(
+            (
+                self.rotations,
+                np.broadcast_to(np.asarray(rotations, dtype=float), (count, 3)),
+            )
+        )
+        self.scales = np.concatenate(
+            (self.scales, np.broadcast_to(np.asarray(scales, dtype=float), (count,)))
+        )
+        self.colors = np.concatenate(
+            (self.colors, np.broadcast_to(np.asarray(colors, dtype=float), (count, 3)))
+        )
+        self._changed(faces_changed=True)
+        self.ambiguous = False
+        return np.arange(start, start + count)
+
+    def add_instance(self, position, rotation=(0, 0, 0), scale=1, color=None):
+        """
+        Add an instance of the mesh
+        :param position: the position of the instance
+        :param rotation: the rotation in degrees around the x, y and z axis
+        :param scale: the scale of the instance
+        :param color: the color of the instance, None to keep the colors of the mesh
+        :return: the index of the instance
+        """
+        color = np.full(3, np.nan) if color is None else color
+        return int(self.add_instances([position], [rotation], [scale], [color])[0])
+
+    @traced
+    def remove_instances(self, indices):
+        """
+        Remove instances, the instances after them move down to fill the gaps
+        :param indices: the indices of the instances to remove
+        :return:
+        """
+        keep = np.ones(len(self), dtype=bool)
+        keep[np.asarray(indices, dtype=np.int64)] = False
+
+        self.wait_for_draw()
+
+        self.ambiguous = True
+        self.positions = self.positions[keep]
+        self.rotations = self.rotations[keep]
+        self.scales = self.scales[keep]
+        self.colors = self.colors[keep]
+        self._changed(faces_changed=True)
+        self.ambiguous = False
+
+    def remove_instance(self, index):
+        self.remove_instances([index])
+
+    @traced
+    def set_instances(
+        self, indices, positions=None, rotations=None, scales=None, colors=None
+    ):
+        """
+        Change some instances, the values that are None are kept
+        :param indices: the indices of the instances
+        :param positions: the new positions
+        :param rotations: the new rotations in degrees around the x, y and z axis
+        :param scales: the new scales
+        :param colors: the new colors, rows of nan use the colors of the mesh
+        :return:
+        """
+        self.wait_for_draw()
+
+        self.ambiguous = True
+        if positions is not None:
+            self.positions[indices] = positions
+        if rotations is not None:
+            self.rotations[indices] = rotations
+        # a negative scale turns the faces of an instance inside out, which changes their windings
+        flipped = False
+        if scales is not None:
+            old_signs = np.sign(self.scales[indices])
+            self.scales[indices] = scales
+            flipped = np.any(np.sign(self.scales[indices]) != old_signs)
+        if colors is not None:
+            self.colors[indices] = colors
+        self._changed(faces_changed=colors is not None or flipped)
+        self.ambiguous = False
+
+    def set_instance(self, index, position=None, rotation=None, scale=None, color=None):
+        self.set_instances([index], position, rotation, scale, color)
+
+    @traced
+    def move_relative(self, vector):
+        """
+        Move every instance by a relative amount
+        :param vector: the amount to move by
+        :return:
+        """
+        self.wait_for_draw()
+
+        self.ambiguous = True
+        self.positions += np.asarray(vector, dtype=float)
+        self._changed()
+        self.ambiguous = False
+
+    @traced
+    def move_absolute(self, vector):
+        """
+        Move the instances together so their center point is at a position
+        :param vector: the position to move to
+        :return:
+        """
+        self.move_relative(np.asarray(vector, dtype=float) - self.center_point)
+
+    def get_instance_spheres(self):
+        """
+        :return: (n, 3) centers and (n,) radii of the spheres around the instances
+        """
+        mesh_center, mesh_radius = self.mesh.bounding_sphere
+        centers = np.einsum("ijk,k->ij", self.matrices, mesh_center) + self.positions
+        return centers, mesh_radius * np.abs(self.scales)
+
+    def get_bounding_sphere(self):
+        """
+        Sphere around the spheres of every instance, recomputed only after an instance changed
+        :return: (center, radius)
+        """
+        version = self.version
+        if self._bounds_version != version:
+            if len(self):
+                centers, radii = self.get_instance_spheres()
+                radius = np.max(
+                    np.linalg.norm(centers - self.center_point, axis=1) + radii
+                )
+                self._bounding_sphere = self.center_point, float(radius)
+            else:
+                self._bounding_sphere = self.center_point, 0.0
+            self._bounds_version = version
+        return self._bounding_sphere
+
+    def get_face_layout(self):
+        """
+        :return: (key that changes when instances are added, removed, recolored or turned inside out,
+            face count, index count)
+        """
+        return (
+            self._faces_version,
+            len(self) * len(self.mesh),
+            len(self) * len(self.mesh.faces.indices),
+        )
+
+    def write_faces(self, indices, offsets, colors, normals):
+        """
+        Write the faces of the mesh once for every instance, called by the scene buffer when it lays out the scene,
+        so the repeated faces are only stored there
+        :param indices: (n * i,) array to write the vertex indices to, relative to the first vertex of the object
+        :param offsets: (n * f,) array to write the end of every face to, relative to the first index of the object
+        :param colors: (n * f, 3) array to write the face colors to
+        :param normals: (n * f, 3) array to write the face normals to
+        :return:
+        """
+        count = len(self)
+        if count == 0:
+            return
+        mesh_faces = self.mesh.faces
+        instances = np.arange(count)[:, np.newaxis]
+
+        indices = indices.reshape(count, -1)
+        indices[:] = mesh_faces.indices
+        indices += instances * len(self.mesh.vertices)
+
+        offsets = offsets.reshape(count, -1)
+        offsets[:] = mesh_faces.offsets[1:]
+        offsets += instances * len(mesh_faces.indices)
+
+        colors = colors.reshape(count, -1, 3)
+        colors[:] = mesh_faces.colors
+        colored = ~np.isnan(self.colors).any(axis=1)
+        colors[colored] = np.clip(self.colors[colored], 0, 255)[:, np.newaxis]
+
+        normals.reshape(count, -1, 3)[:] = mesh_faces.normals
+
+    def get_face_windings(self):
+        """
+        The windings of the mesh repeated for every instance, flipped for instances with a negative scale
+        :return: (n * f,) int8 array of face windings
+        """
+        signs = np.sign(self.scales).astype(np.int8)
+        return (signs[:, np.newaxis] * self.mesh.windings).ravel()
+
+    def get_primitive_counts(self):
+        return len(self) * len(self.mesh.vertices), len(self) * len(self.mesh)
+
+    def write_vertices(self, out):
+        """
+        Write the vertices of every instance, called by the scene buffer
+        :param out: (n * v, 3) array to write to
+        :return:
+        """
+        transform_instances_into(self.mesh.vertices, self.matrices, self.positions, out)
+
+    def get_shaded_colors(self, colors, normals):
+        """
+        Shade the faces of every instance by its own rotation, called by the scene buffer
+        :param colors: (n * f, 3) face colors of every instance
+        :param normals: (n * f, 3) face normals of every instance
+        :return: (n * f, 3) shaded colors
+        """
+        if len(self) == 0:
+            return np.zeros((0, 3), dtype=np.uint8)
+        rotated_normals = np.einsum(
+            "ifj,ijk->ifk",
+            normals.reshape(len(self), -1, 3),
+            self.negative_rotation_matrices,
+        )
+        return shade_face_colors(
+            colors, rotated_normals.reshape(-1, 3), np.eye(3), self.shadow_effect
+        )
@@ -28,6 +28,7 @@ class TextObject(Object):
         :return:
         """
         self.text = text
+        self.mark_dirty()
 
     def get_text(self):
         """
@@ -36,16 +37,13 @@ class TextObject(Object):
         """
         return self.text
 
-    def draw(self, renderer):
+    def get_layout(self, camera, display_size):
         """
-        Draw the text
-        :param renderer: the renderer to draw with
-        :return:
+        Get the font and screen position the text is drawn with
+        :param camera: the camera to draw from
+        :param display_size: the size of the display
+        :return: (font, position of the left corner), or None if the text is out of view
         """
-        camera = renderer.camera
-        surface = renderer.display
-        display_size = renderer.display_size
-
         # draw text with left corner at position, should also be scaled based on distance from camera
         camera_distance = np.linalg.norm(self.position - camera.position)
 
@@ -61,15 +59,46 @@ class TextObject(Object):
             camera.fov_top,
         )[0]
 
-        if flat_position is not None:
+        if flat_position is None:
+            return None
 
-            # scale text based on distance from camera
-            scale = 1 / camera_distance
+        # scale text based on distance from camera
+        scale = 1 / camera_distance
 
-            font = pygame.font.Font("freesansbold.ttf", int(100 * scale * self.size))
-            text = font.render(self.text, True, self.color)
+        font = pygame.font.Font("freesansbold.ttf", int(100 * scale * self.size))
+
+        # clamp flat position to be between -10000 and 10000
+        flat_position = np.clip(flat_position, -10000, 10000)
+
+        return font, flat_position
+
+    def get_screen_rect(self, camera, screen_size, point_radius=0):
+        """
+        Screen area the text covers
+        :param camera: the camera the text is drawn with
+        :param screen_size: the size of the screen
+        :param point_radius: unused, text has no points
+        :return: a pygame Rect, empty if the text is not drawn
+        """
+        layout = None if self.is_hidden() else self.get_layout(camera, screen_size)
+        if layout is None:
+            return pygame.Rect(0, 0, 0, 0)
+
+        font, flat_position = layout
+        width, height = font.size(self.text)
+        rect = pygame.Rect(int(flat_position[0]), int(flat_position[1]), width, height)
+        return rect.inflate(4, 4).clip(pygame.Rect((0, 0), screen_size))
+
+    def draw(self, renderer):
+        """
+        Draw the text
+        :param renderer: the renderer to draw with
+        :return:
+        """
+        layout = self.get_layout(renderer.camera, renderer.display_size)
 
-            # clamp flat position to be between -10000 and 10000
-            flat_position = np.clip(flat_position, -10000, 10000)
+        if layout is not None:
+            font, flat_position = layout
+            text = font.render(self.text, True, self.color)
 
-            surface.blit(text, flat_position)
+            renderer.display.blit(text, flat_position)
@@ -0,0 +1,175 @@
+import numpy as np
+from .base_object import Object
+from ..point_math.bounding_sphere import bounding_sphere
+from ..point_math.transform_instances import transform_instances_into
+
+
+class TransformedObject(Object):
+    """
+    Object whose vertices are local vertices that never change, moved by a model matrix and offset.
+    Transforms only change the matrix and offset, the vertices are made from them when they are read,
+    once per change, or written straight into the scene buffer. original_vertices, the vertices
+    move_absolute starts from, are kept the same way and share the local vertices
+    """
+
+    def _set_local_vertices(self, vertices):
+        """
+        Start from new local vertices, both the vertices and the original vertices are reset to them
+        :param vertices: (n, 3) local vertices, they are not changed and can be shared
+        :return:
+        """
+        local_vertices = np.asarray(vertices, dtype=float)
+        self._set_vertices(local_vertices)
+        self._set_original_vertices(local_vertices)
+
+    def _set_vertices(self, vertices):
+        self.local_vertices = np.asarray(vertices, dtype=float)
+        self.model_matrix = np.eye(3)
+        self.model_offset = np.zeros(3)
+        self._vertex_cache = None
+        self._bounds_source = None
+        self._sphere_version = None
+
+    def _set_original_vertices(self, vertices):
+        self._original_local_vertices = np.asarray(vertices, dtype=float)
+        self._original_matrix = np.eye(3)
+        self._original_offset = np.zeros(3)
+        self._original_cache = None
+
+    @property
+    def vertices(self):
+        """
+        The world vertices, made from the local vertices when they changed since they were last read.
+        The array is read only, changing it would not move the object, assign a new array instead
+        :return: (n, 3) world vertices
+        """
+        if self._vertex_cache is None:
+            vertices = self.local_vertices @ self.model_matrix.T + self.model_offset
+            vertices.flags.writeable = False
+            self._vertex_cache = vertices
+        return self._vertex_cache
+
+    @vertices.setter
+    def vertices(self, vertices):
+        self._set_vertices(vertices)
+
+    @property
+    def original_vertices(self):
+        if self._original_cache is None:
+            original_vertices = (
+                self._original_local_vertices @ self._original_matrix.T
+                + self._original_offset
+            )
+            original_vertices.flags.writeable = False
+            self._original_cache = original_vertices
+        return self._original_cache
+
+    @original_vertices.setter
+    def original_vertices(self, vertices):
+        self._set_original_vertices(vertices)
+
+    def _transform_vertices(self, matrix, point):
+        """
+        Apply a linear transform around a point to the vertices, on top of the current one
+        :param matrix: the 3x3 matrix
+        :param point: the point that stays in place
+        :return:
+        """
+        self.model_matrix = matrix @ self.model_matrix
+        self.model_offset = (self.model_offset - point) @ matrix.T + point
+        self._vertex_cache = None
+
+    def _transform_original_vertices(self, matrix, point):
+        self._original_matrix = matrix @ self._original_matrix
+        self._original_offset = (self._original_offset - point) @ matrix.T + point
+        self._original_cache = None
+
+    def _translate_vertices(self, vector):
+        self.model_offset = self.model_offset + vector
+        self._vertex_cache = None
+
+    def _reset_to_original(self, vector):
+        """
+        Put the vertices back at the original vertices moved by a vector
+        :param vector: the vector to move by
+        :return:
+        """
+        self.local_vertices = self._original_local_vertices
+        self.model_matrix = self._original_matrix.copy()
+        self.model_offset = self._original_offset + vector
+        self._vertex_cache = None
+
+    def _get_local_bounds(self):
+        """
+        The average and the bounding sphere of the local vertices, found once for every set of local vertices
+        :return: (average, sphere center, sphere radius)
+        """
+        if self._bounds_source is not self.local_vertices:
+            local_vertices = self.local_vertices
+            if len(local_vertices):
+                average = np.mean(local_vertices, axis=0)
+            else:
+                average = np.zeros(3)
+            center, radius = bounding_sphere(local_vertices)
+            self._local_bounds = average, center, radius
+            self._bounds_source = local_vertices
+        return self._local_bounds
+
+    def get_vertex_average(self):
+        """
+        The average of the world vertices, without making them
+        :return: the average point
+        """
+        average = self._get_local_bounds()[0]
+        return self.model_matrix @ average + self.model_offset
+
+    def get_bounding_sphere(self):
+        """
+        Sphere that contains the whole object, the sphere of the local vertices moved by the model matrix,
+        recomputed only after the object changed
+        :return: (center, radius)
+        """
+        version = self.version
+        if (
+            self._sphere_version != version
+            or self._bounds_source is not self.local_vertices
+        ):
+            _, center, radius = self._get_local_bounds()
+            # the largest factor the matrix stretches any direction by
+            stretch = np.linalg.norm(self.model_matrix, 2)
+            self._bounding_sphere = (
+                self.model_matrix @ center + self.model_offset,
+                radius * stretch,
+            )
+            self._sphere_version = version
+        return self._bounding_sphere
+
+    def is_mirrored(self):
+        """
+        Whether the model matrix mirrors the object, like a negative scale, which turns its faces inside out
+        :return: bool
+        """
+        return np.linalg.det(self.model_matrix) < 0
+
+    def get_vertex_count(self):
+        return len(self.local_vertices)
+
+    def write_vertices(self, out):
+        """
+        Write the world vertices into the scene buffer, without making them
+        :param out: (n, 3) array to write to
+        :return:
+        """
+        transform_instances_into(
+            self.local_vertices,
+            self.model_matrix[np.newaxis],
+            self.model_offset[np.newaxis],
+            out,
+        )
+
+    def __getstate__(self):
+        # the world vertices are made again from the local vertices
+        state = dict(vars(self))
+        state["_vertex_cache"] = None
+        state["_original_cache"] = None
+        return state
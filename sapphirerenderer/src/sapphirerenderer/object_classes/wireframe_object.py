@@ -1,4 +1,4 @@
-from ..object_classes.base_object import Object
+from ..object_classes.transformed_object import TransformedObject
 import numpy as np
 import pygame
 from ..settings import (
@@ -7,12 +7,12 @@ from ..settings import (
     line_thickness,
     point_thickness,
 )
-from ..point_math.project_point import project_point
+from ..point_math.project_point import project_points
 from ..point_math.matricies import get_pitch_yaw_roll_matrix
-from ..point_math.average_points import average_points
+from ..utility_objects.tracer import traced
 
 
-class WireframeObject(Object):
+class WireframeObject(TransformedObject):
     def __init__(
         self,
         vertices,
@@ -22,14 +22,14 @@ class WireframeObject(Object):
     ):
         super().__init__(position=position, color=color)
         self.compile_verts = False
-        self.original_vertices = vertices.copy()
-        self.vertices = vertices
+        # the vertices are never changed, transforms only change the model matrix
+        self._set_local_vertices(vertices)
         self.lines = lines
         self.position = np.array([0, 0, 0], dtype=float)
         self.color = color
         self.rotation = np.array([0, 0, 0], dtype=float)
 
-        self.center_point = average_points(self.vertices)
+        self.center_point = self.get_vertex_average()
 
         self.drawing = False
         self.ambiguous = False
@@ -38,6 +38,7 @@ class WireframeObject(Object):
 
         self.show()
 
+    @traced
     def move_relative(self, vector):
         """
         Move the object by a relative amount
@@ -48,11 +49,12 @@ class WireframeObject(Object):
 
         self.ambiguous = True
         self.position += vector
-        for i in range(len(self.vertices)):
-            self.vertices[i] += vector
-        self.center_point = average_points(self.vertices)
+        self._translate_vertices(vector)
+        self.center_point = self.get_vertex_average()
+        self.mark_dirty()
         self.ambiguous = False
 
+    @traced
     def move_absolute(self, vector):
         """
         Move the object to an absolute position
@@ -64,22 +66,25 @@ class WireframeObject(Object):
         self.ambiguous = True
         vector = np.array(vector, dtype=float)
         self.position = vector
-        for i in range(len(self.vertices)):
-            self.vertices[i] = self.original_vertices[i] + vector
-        self.center_point = average_points(self.vertices)
+        self._reset_to_original(vector)
+        self.center_point = self.get_vertex_average()
+        self.mark_dirty()
         self.ambiguous = False
 
-    def __rotate(self, x_axis, y_axis, z_axis):
+    def __rotate(self, x_axis, y_axis, z_axis, point):
         self.wait_for_draw()
 
         self.ambiguous = True
         rotation_matrix = get_pitch_yaw_roll_matrix(x_axis, z_axis, y_axis)
-        self.vertices = np.dot(self.vertices, rotation_matrix.T)
-        self.original_vertices = np.dot(self.original_vertices, rotation_matrix.T)
+        self._transform_vertices(rotation_matrix, point)
+        # the original vertices always turn around the origin
+        self._transform_original_vertices(rotation_matrix, np.zeros(3))
         self.rotation += np.array([x_axis, z_axis, y_axis], dtype=float)
         self.rotation_matrix = get_pitch_yaw_roll_matrix(*self.rotation)
+        self.mark_dirty()
         self.ambiguous = False
 
+    @traced
     def rotate_local(self, x_axis, y_axis, z_axis):
         """
         Rotate the object around a point
@@ -92,6 +97,7 @@ class WireframeObject(Object):
 
         self.rotate_around_point(x_axis, y_axis, z_axis, self.center_point)
 
+    @traced
     def rotate_around_point(
         self, x_axis, y_axis, z_axis, point=np.array([0, 0, 0], dtype=float)
     ):
@@ -111,19 +117,26 @@ class WireframeObject(Object):
             np.radians(z_axis),
         )
 
-        self.wait_for_draw()
-
-        self.ambiguous = True
-        self.vertices -= point
-        self.__rotate(x_axis, y_axis, z_axis)
-        self.vertices += point
-        self.center_point = average_points(self.vertices)
-
-        self.ambiguous = False
+        self.__rotate(x_axis, y_axis, z_axis, np.asarray(point, dtype=float))
+        self.center_point = self.get_vertex_average()
 
     def __str__(self):
         return self.__class__.__name__
 
+    def get_primitive_counts(self):
+        return self.get_vertex_count(), len(self.lines)
+
+    def get_screen_rect(self, camera, screen_size, point_radius=0):
+        """
+        Screen area the object can cover, including the points and thick lines around the vertices
+        :param camera: the camera the object is drawn with
+        :param screen_size: the size of the screen
+        :param point_radius: extra room in pixels at distance 1
+        :return: a pygame Rect, empty if nothing is drawn
+        """
+        point_radius = max(point_radius, point_thickness, line_thickness)
+        return super().get_screen_rect(camera, screen_size, point_radius)
+
     def draw(self, renderer):
         """
         Draw the object
@@ -136,42 +149,37 @@ class WireframeObject(Object):
 
         self.wait_for_ambiguous()
 
-        moved_vertices = self.vertices - camera.position
-        reshaped_vertices = moved_vertices.reshape(-1, 1, moved_vertices.shape[1])
-        rotated_vertices = np.sum(camera.rotation_matrix * reshaped_vertices, axis=-1)
-
-        projected_vertices = [
-            project_point(
-                vertex,
-                camera.offset_array,
-                camera.focal_length,
-                display_size,
-                camera.fov_side,
-                camera.fov_top,
-            )
-            for vertex in rotated_vertices
-        ]
+        projected_vertices, visible, point_sizes = project_points(
+            self.vertices, camera, display_size
+        )
+        projected_vertices = projected_vertices.tolist()
+        visible = visible.tolist()
+        point_sizes = point_sizes.tolist()
 
         if self.lines is not None and draw_lines:
             for line in self.lines:
-                start, s_scale = projected_vertices[line[0]]
-                end, e_scale = projected_vertices[line[1]]
+                start, end = line[0], line[1]
 
-                if start is None or end is None:
+                if not visible[start] or not visible[end]:
                     continue
 
                 pygame.draw.line(
                     surface,
                     line[2] if len(line) > 2 else self.color,
-                    start,
-                    end,
-                    max(int(line_thickness * (s_scale + e_scale) / 2), 1),
+                    projected_vertices[start],
+                    projected_vertices[end],
+                    max(
+                        int(
+                            line_thickness * (point_sizes[start] + point_sizes[end]) / 2
+                        ),
+                        1,
+                    ),
                 )
         if draw_vertices:
-            for vertex in projected_vertices:
-                vertex, scale = vertex
-
-                if draw_vertices and vertex is not None:
+            for vertex, scale, is_visible in zip(
+                projected_vertices, point_sizes, visible
+            ):
+                if is_visible:
                     pygame.draw.circle(
                         surface,
                         self.color,
@@ -0,0 +1,280 @@
+import numpy as np
+from collections import OrderedDict
+from ..object_classes.flat_faces_object import FlatFacesObject
+from ..mesh_loading.chunked_mesh import ChunkFiles
+from ..point_math.matricies import get_pitch_yaw_roll_matrix
+from ..utility_objects.packed_faces import PackedFaces
+from ..utility_objects.tracer import traced
+
+
+class Fchunked(FlatFacesObject):
+    def __init__(
+        self,
+        directory,
+        position=np.array([0.0, 0.0, 0.0]),
+        color=(0, 0, 0),
+        shadow=True,
+        max_faces=1000000,
+        max_resident_bytes=512 * 1024 * 1024,
+        lod_pixels=48,
+    ):
+        """
+        Mesh too big for memory, split into chunks by build_chunked_mesh. Every frame only the chunks in view are
+        picked, nearest first until max_faces, and the chunks that cover few pixels use their coarse level.
+        The picked chunks are read from the memory mapped chunk files and kept in a cache of recently used chunks
+        :param directory: the directory of the chunks
+        :param position: the position of the mesh, the chunks are not centered
+        :param color: the color of the faces
+        :param shadow: whether to render shadows
+        :param max_faces: the most faces to draw
+        :param max_resident_bytes: the most bytes of chunks to keep in memory, chunks that are drawn are always kept
+        :param lod_pixels: chunks whose bounding sphere is smaller than this many pixels use their coarse level
+        """
+        self.chunks = ChunkFiles(directory)
+        self.max_faces = max_faces
+        self.max_resident_bytes = max_resident_bytes
+        self.lod_pixels = lod_pixels
+
+        # world vertices are local vertices @ model_matrix.T + position
+        self.model_matrix = np.eye(3)
+        self.model_scale = 1.0
+
+        self.resident = OrderedDict()
+        self.resident_bytes = 0
+        self.selection = ()
+        self._local_vertices = np.zeros((0, 3))
+        self._selected_windings = np.zeros(0, dtype=np.int8)
+
+        bounds = self.chunks.bounds
+        self._chunk_centers = (bounds[:, 0] + bounds[:, 1]) / 2
+        self._chunk_radii = np.linalg.norm(bounds[:, 1] - bounds[:, 0], axis=1) / 2
+        if len(bounds):
+            corners = np.array((bounds[:, 0].min(axis=0), bounds[:, 1].max(axis=0)))
+        else:
+            corners = np.zeros((2, 3))
+        # the average of the vertices, like the center point of other objects
+        self._local_center = self.chunks.center
+
+        # starts with the corners of the box around the mesh and no faces, update_view fills in the chunks
+        super().__init__(
+            corners,
+            PackedFaces.from_polygons(np.zeros((0, 3)), color),
+            np.array(position, dtype=float),
+            color,
+            shadow,
+            move_to_zero=False,
+        )
+
+    def _apply_transform(self):
+        """
+        Move the vertices of the picked chunks to where the transform puts them, like other objects
+        they are only made when they are read or written into the scene buffer
+        :return:
+        """
+        self.local_vertices = self._local_vertices
+        self.model_offset = self.position
+        self._vertex_cache = None
+        self.center_point = self._local_center @ self.model_matrix.T + self.position
+        self.mark_dirty()
+
+    def _transform(self, matrix, point):
+        """
+        Apply a linear transform around a point on top of the current one
+        :param matrix: the 3x3 matrix
+        :param point: the point that stays in place
+        :return:
+        """
+        self.wait_for_draw()
+
+        self.ambiguous = True
+        self.model_matrix = matrix @ self.model_matrix
+        self.position = (self.position - point) @ matrix.T + point
+        self._apply_transform()
+        self.ambiguous = False
+
+    @traced
+    def move_relative(self, vector):
+        self.move_absolute(self.position + np.asarray(vector, dtype=float))
+
+    @traced
+    def move_absolute(self, vector):
+        """
+        Move the object to an absolute position, the position is where the origin of the chunks ends up
+        :param vector: the position to move to
+        :return:
+        """
+        self.wait_for_draw()
+
+        self.ambiguous = True
+        self.position = np.array(vector, dtype=float)
+        self._apply_transform()
+        self.ambiguous = False
+
+    def _rotate(self, x_axis, y_axis, z_axis, point):
+        x_axis, y_axis, z_axis = np.radians((x_axis, y_axis, z_axis))
+        self.rotation += np.array([x_axis, z_axis, y_axis], dtype=float)
+        self.negative_rotation_matrix = get_pitch_yaw_roll_matrix(*-self.rotation)
+        self._transform(get_pitch_yaw_roll_matrix(x_axis, z_axis, y_axis), point)
+
+    @traced
+    def rotate_local(self, x_axis, y_axis, z_axis):
+        self._rotate(x_axis, y_axis, z_axis, self.center_point)
+
+    @traced
+    def rotate_around_point(
+        self, x_axis, y_axis, z_axis, point=np.array([0, 0, 0], dtype=float)
+    ):
+        self._rotate(x_axis, y_axis, z_axis, np.asarray(point, dtype=float))
+
+    @traced
+    def set_scale(self, scale_factor, center_point=None):
+        if center_point is None:
+            center_point = self.center_point
+        self.model_scale *= scale_factor
+        self._transform(np.eye(3) * scale_factor, np.asarray(center_point, dtype=float))
+
+    def get_bounding_sphere(self):
+        """
+        Sphere around every chunk, not only the picked ones, so the mesh is not culled before it picks chunks
+        :return: (center, radius)
+        """
+        if len(self.chunks) == 0:
+            return self.center_point, 0.0
+        centers, radii = self.get_chunk_spheres()
+        distances = np.linalg.norm(centers - self.center_point, axis=1) + radii
+        return self.center_point, float(distances.max())
+
+    def get_chunk_spheres(self):
+        """
+        :return: (k, 3) world centers and (k,) radii of the spheres around the chunks
+        """
+        centers = self._chunk_centers @ self.model_matrix.T + self.position
+        return centers, self._chunk_radii * abs(self.model_scale)
+
+    def get_face_windings(self):
+        # the windings were found when the chunks were built, against the untransformed vertices
+        if self.is_mirrored():
+            return -self._selected_windings
+        return self._selected_windings
+
+    def pick_chunks(self, camera, far_distance=None):
+        """
+        Pick the chunks to draw from a camera
+        :param camera: the camera
+        :param far_distance: chunks further away than this are skipped, None for no limit
+        :return: tuple of (chunk, level) pairs, nearest chunks first
+        """
+        if len(self.chunks) == 0:
+            return ()
+
+        centers, radii = self.get_chunk_spheres()
+        in_view = np.flatnonzero(camera.spheres_in_view(centers, radii, far_distance))
+        distances = np.linalg.norm(centers[in_view] - camera.position, axis=1)
+        order = np.argsort(distances)
+        chunks, distances = in_view[order], distances[order]
+
+        # the size on screen of the chunk, the near side of its sphere is what the camera sees first
+        near = np.maximum(distances - radii[chunks], 1e-6)
+        levels = (radii[chunks] * camera.focal_length / near < self.lod_pixels).astype(
+            np.int64
+        )
+
+        face_counts = self.chunks.face_counts[levels, chunks]
+        keep = np.cumsum(face_counts) <= self.max_faces
+        return tuple(zip(chunks[keep].tolist(), levels[keep].tolist()))
+
+    def update_view(self, camera, far_distance=None):
+        """
+        Pick the chunks for the frame and swap them in when they changed
+        :param camera: the camera the frame is drawn from
+        :param far_distance: chunks further away than this are skipped, None for no limit
+        :return:
+        """
+        if self.is_hidden():
+            return
+
+        selection = self.pick_chunks(camera, far_distance)
+        if set(selection) != set(self.selection):
+            self.set_selection(selection)
+
+    def _read_chunk(self, key):
+        """
+        Get a chunk from the cache, or read it from the chunk files
+        :param key: (chunk, level)
+        :return: (vertices, triangles, normals, windings)
+        """
+        arrays = self.resident.get(key)
+        if arrays is None:
+            arrays = self.chunks.read_chunk(*key)
+            self.resident[key] = arrays
+            self.resident_bytes += sum(array.nbytes for array in arrays)
+        else:
+            self.resident.move_to_end(key)
+        return arrays
+
+    def set_selection(self, selection):
+        """
+        Replace the drawn chunks
+        :param selection: tuple of (chunk, level) pairs
+        :return:
+        """
+        parts = [self._read_chunk(key) for key in selection]
+
+        # drop the least recently used chunks that are not drawn until the cache fits
+        selected = set(selection)
+        for key in list(self.resident):
+            if self.resident_bytes <= self.max_resident_bytes:
+                break
+            if key not in selected:
+                arrays = self.resident.pop(key)
+                self.resident_bytes -= sum(array.nbytes for array in arrays)
+
+        vertex_offsets = np.cumsum([0] + [len(part[0]) for part in parts])
+        if parts:
+            local_vertices = np.concatenate([part[0] for part in parts])
+            triangles = np.concatenate(
+                [part[1] + offset for part, offset in zip(parts, vertex_offsets)]
+            )
+            normals = np.concatenate([part[2] for part in parts])
+            windings = np.concatenate([part[3] for part in parts])
+        else:
+            local_vertices = np.zeros((0, 3))
+            triangles = np.zeros((0, 3), dtype=np.int64)
+            normals = np.zeros((0, 3))
+            windings = np.zeros(0, dtype=np.int8)
+
+        self.wait_for_draw()
+
+        self.ambiguous = True
+        self.selection = selection
+        self._local_vertices = local_vertices
+        self._selected_windings = windings
+        self.faces = PackedFaces.from_polygons(triangles, self.color, normals)
+        self._apply_transform()
+        self.ambiguous = False
+
+    def __getstate__(self):
+        # the chunk files are opened again from their directory, chunks in memory are read again when drawn
+        state = super().__getstate__()
+        state["chunks"] = self.chunks.directory
+        state["resident"] = OrderedDict()
+        state["resident_bytes"] = 0
+        return state
+
+    def __setstate__(self, state):
+        vars(self).update(state)
+        self.chunks = ChunkFiles(state["chunks"])
+
+    def get_info(self):
+        """
+        :return: dict with the number of chunks, drawn chunks, coarse drawn chunks, drawn faces,
+            chunks in memory and bytes in memory
+        """
+        return {
+            "chunks": len(self.chunks),
+            "drawn_chunks": len(self.selection),
+            "coarse_chunks": sum(level for _, level in self.selection),
+            "drawn_faces": len(self.get_packed_faces()),
+            "resident_chunks": len(self.resident),
+            "resident_bytes": self.resident_bytes,
+        }
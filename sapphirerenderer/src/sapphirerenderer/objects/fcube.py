@@ -19,7 +19,7 @@ class Fcube(FlatFacesObject):
         )
 
         faces = [
-            ([0, 1, 2, 3], (255, 111, 100)),
+            ([0, 3, 2, 1], (255, 111, 100)),
             ([4, 5, 6, 7], (255, 111, 65)),
             ([0, 1, 5, 4], (255, 65, 100)),
             ([1, 2, 6, 5], (65, 111, 100)),
@@ -1,26 +1,14 @@
 import numpy as np
 from ..object_classes.flat_faces_object import FlatFacesObject
-
-
-def load_obj(filename):
-    vertices = []
-    faces = []
-
-    with open(filename, "r") as file:
-        for line in file:
-            if line.startswith("v "):
-                vertex = [float(coord) for coord in line.split()[1:]]
-                vertices.append(vertex)
-            elif line.startswith("f "):
-                face_data = [
-                    [int(index.split("/")[0]) - 1 for index in line.split()[1:]]
-                ]
-                faces.append(face_data)
-
-    return np.array(vertices), faces
+from ..mesh_loading.obj_loader import load_obj
+from ..mesh_loading.mesh_cache import mesh_cache
+from ..utility_objects.packed_faces import PackedFaces
 
 
 class Fobj(FlatFacesObject):
+    # parses the file that is the first arg, see AsyncLoader
+    mesh_loader = staticmethod(load_obj)
+
     def __init__(
         self,
         filename,
@@ -31,13 +19,12 @@ class Fobj(FlatFacesObject):
         if not filename.endswith(".obj"):
             raise ValueError("File must be an OBJ file")
 
-        # Load OBJ file
-        vertices, faces = load_obj(filename)
+        # Load OBJ file, the cached arrays are shared with every other object of the file
+        vertices, triangles, normals = mesh_cache.load(self.mesh_loader, filename)
 
-        for face in faces:
-            if not random_color:
-                face.append(color)
-            else:
-                face.append(np.random.randint(0, 255, 3))
+        colors = (
+            np.random.randint(0, 255, (len(triangles), 3)) if random_color else color
+        )
+        faces = PackedFaces.from_polygons(triangles, colors, normals)
 
         super().__init__(vertices, faces, position, color, True)
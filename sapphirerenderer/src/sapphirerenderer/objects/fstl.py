@@ -1,9 +1,14 @@
 import numpy as np
-from stl import mesh
 from ..object_classes.flat_faces_object import FlatFacesObject
+from ..mesh_loading.stl_loader import load_stl
+from ..mesh_loading.mesh_cache import mesh_cache
+from ..utility_objects.packed_faces import PackedFaces
 
 
 class Fstl(FlatFacesObject):
+    # parses the file that is the first arg, see AsyncLoader
+    mesh_loader = staticmethod(load_stl)
+
     def __init__(
         self,
         filename,
@@ -12,29 +17,12 @@ class Fstl(FlatFacesObject):
         random_color=False,
         shadow=True,
     ):
-        # Load STL file
-        mesh_data = mesh.Mesh.from_file(filename)
-
-        # Extract vertices
-        vertices = np.unique(mesh_data.vectors.reshape(-1, 3), axis=0)
-
-        # Extract faces
-        faces = []
-        for triangle in mesh_data.vectors:
-            face_vertices = []
-            for vertex in triangle:
-                index = np.nonzero((vertices == vertex).all(axis=1))[0][0]
-                face_vertices.append(index)
-            (
-                faces.append([face_vertices, color])
-                if not random_color
-                else faces.append([face_vertices, np.random.randint(0, 255, 3)])
-            )
-
-        normals = mesh_data.normals
-        for i, face in enumerate(faces):
-            face.append(normals[i] / np.linalg.norm(normals[i]) * 255)
+        # Load STL file, the cached arrays are shared with every other object of the file
+        vertices, triangles, normals = mesh_cache.load(self.mesh_loader, filename)
 
-        faces = [tuple(face) for face in faces]
+        colors = (
+            np.random.randint(0, 255, (len(triangles), 3)) if random_color else color
+        )
+        faces = PackedFaces.from_polygons(triangles, colors, normals)
 
         super().__init__(vertices, faces, position, color, shadow)
@@ -0,0 +1,26 @@
+from ..object_classes.instanced_object import InstancedObject
+from ..mesh_loading.stl_loader import load_stl
+from ..mesh_loading.mesh_cache import mesh_cache
+from ..point_math.average_points import average_points
+from ..utility_objects.mesh_resource import MeshResource
+from ..utility_objects.packed_faces import PackedFaces
+
+
+class Instances(InstancedObject):
+    def __init__(self, mesh, color=(0, 0, 0), shadow=True):
+        """
+        Many copies of one mesh, add them with add_instance or add_instances
+        :param mesh: a MeshResource, a flat faces object to copy the mesh of, or the path of an STL file
+        :param color: the color of the faces of a mesh loaded from a file
+        :param shadow: whether to render shadows
+        """
+        if isinstance(mesh, str):
+            vertices, triangles, normals = mesh_cache.load(load_stl, mesh)
+            mesh = MeshResource(
+                vertices - average_points(vertices),
+                PackedFaces.from_polygons(triangles, color, normals),
+            )
+        elif not isinstance(mesh, MeshResource):
+            mesh = MeshResource.from_object(mesh)
+
+        super().__init__(mesh, shadow)
@@ -19,12 +19,18 @@ class Line(WireframeObject):
     def change_color(self, color):
         self.lines[0][2] = color
         self.color = color
+        self.mark_dirty()
 
     def change_vertices(self, vertices):
         self.vertices = vertices
+        self.mark_dirty()
 
     def change_start(self, start):
-        self.vertices[0] = start
+        vertices = self.vertices.copy()
+        vertices[0] = start
+        self.change_vertices(vertices)
 
     def change_end(self, end):
-        self.vertices[1] = end
+        vertices = self.vertices.copy()
+        vertices[1] = end
+        self.change_vertices(vertices)
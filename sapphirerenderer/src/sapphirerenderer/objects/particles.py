@@ -0,0 +1,317 @@
+import numpy as np
+import pygame
+from time import perf_counter
+from ..object_classes.base_object import Object
+from ..point_math.splat_points import splat_points, step_points
+from ..utility_objects.tracer import traced
+
+# the longest step update takes, so a stalled frame does not throw particles across the scene
+max_time_step = 0.1
+
+
+class Particles(Object):
+    def __init__(
+        self,
+        capacity=1024,
+        gravity=(0.0, 0.0, 0.0),
+        drag=0.0,
+        round_points=True,
+        auto_update=True,
+    ):
+        """
+        Particle system that keeps every particle in flat arrays, one entry per particle, instead of an object each.
+        Particles move and age in one pass per frame, slots of dead particles are reused by new ones
+        and all particles are drawn in one pass straight into the pixels of the display
+        :param capacity: the number of particles to make room for, the arrays grow when more are spawned
+        :param gravity: the acceleration of every particle
+        :param drag: the fraction of its velocity a particle loses per second
+        :param round_points: draw particles as discs instead of squares
+        :param auto_update: move the particles by the time since the last frame in update, otherwise call step
+        """
+        super().__init__(position=np.zeros(3), color=(0, 0, 0))
+        self.compile_verts = False
+        self.gravity = np.array(gravity, dtype=float)
+        self.drag = drag
+        self.round_points = round_points
+        self.auto_update = auto_update
+
+        self.positions = np.zeros((0, 3))
+        self.velocities = np.zeros((0, 3))
+        self.colors = np.zeros((0, 3), dtype=np.uint8)
+        self.sizes = np.zeros(0)
+        self.ages = np.zeros(0)
+        self.lifetimes = np.zeros(0)
+        self.alive = np.zeros(0, dtype=bool)
+
+        # stack of the free slots, the last _free_count entries of _free are the slots to use next
+        self._free = np.zeros(0, dtype=np.int64)
+        self._free_count = 0
+        self.count = 0
+
+        self._last_update = None
+        # the box around the live particles, step finds it while moving them
+        self._bounds = None
+        self._bounds_version = None
+
+        # reused between frames
+        self._depth_buffer = np.empty((0, 0))
+
+        self._grow(capacity)
+        self.show()
+
+    def __len__(self):
+        return self.count
+
+    def _grow(self, capacity):
+        """
+        Make room for at least capacity particles, the new slots are free
+        :param capacity: the number of particles to make room for
+        :return:
+        """
+        old_capacity = len(self.alive)
+        if capacity <= old_capacity:
+            return
+        capacity = max(capacity, 2 * old_capacity)
+        added = capacity - old_capacity
+
+        self.positions = np.concatenate((self.positions, np.zeros((added, 3))))
+        self.velocities = np.concatenate((self.velocities, np.zeros((added, 3))))
+        self.colors = np.concatenate(
+            (self.colors, np.zeros((added, 3), dtype=np.uint8))
+        )
+        self.sizes = np.concatenate((self.sizes, np.zeros(added)))
+        self.ages = np.concatenate((self.ages, np.zeros(added)))
+        self.lifetimes = np.concatenate((self.lifetimes, np.zeros(added)))
+        self.alive = np.concatenate((self.alive, np.zeros(added, dtype=bool)))
+
+        # the new slots go under the free ones, lower slots are used first
+        free = np.zeros(capacity, dtype=np.int64)
+        free[:added] = np.arange(capacity - 1, old_capacity - 1, -1)
+        free[added : added + self._free_count] = self._free[: self._free_count]
+        self._free = free
+        self._free_count += added
+
+    @traced
+    def spawn(
+        self, positions, velocities=None, colors=(0, 0, 0), sizes=0.02, lifetimes=np.inf
+    ):
+        """
+        Add particles
+        :param positions: (n, 3) positions of the particles
+        :param velocities: (n, 3) velocities of the particles, None for still particles
+        :param colors: (n, 3) colors or one color for every particle
+        :param sizes: (n,) radii in world units or one radius for every particle
+        :param lifetimes: (n,) seconds until the particles die or one lifetime for every particle
+        :return: the slots of the new particles
+        """
+        positions = np.asarray(positions, dtype=float).reshape(-1, 3)
+        count = len(positions)
+
+        self.wait_for_draw()
+
+        self.ambiguous = True
+        self._grow(self.count + count)
+        slots = self._free[self._free_count - count : self._free_count][::-1].copy()
+        self._free_count -= count
+
+        self.positions[slots] = positions
+        self.velocities[slots] = 0 if velocities is None else velocities
+        self.colors[slots] = np.clip(colors, 0, 255)
+        self.sizes[slots] = sizes
+        self.ages[slots] = 0
+        self.lifetimes[slots] = lifetimes
+        self.alive[slots] = True
+        self.count += count
+        self.mark_dirty()
+        self.ambiguous = False
+        return slots
+
+    def emit(
+        self,
+        count,
+        position,
+        velocity=(0.0, 0.0, 0.0),
+        spread=1.0,
+        colors=(0, 0, 0),
+        sizes=0.02,
+        lifetimes=np.inf,
+        rng=np.random,
+    ):
+        """
+        Spawn particles at a point flying out in random directions
+        :param count: the number of particles
+        :param position: the point they start at
+        :param velocity: the velocity they share
+        :param spread: the largest speed added in a random direction
+        :param colors: the colors of the particles, see spawn
+        :param sizes: the radii of the particles, see spawn
+        :param lifetimes: the lifetimes of the particles, see spawn
+        :param rng: the random generator to use
+        :return: the slots of the new particles
+        """
+        directions = rng.normal(size=(count, 3))
+        directions /= np.maximum(np.linalg.norm(directions, axis=1), 1e-12)[
+            :, np.newaxis
+        ]
+        speeds = spread * rng.random(count) ** (1 / 3)
+
+        return self.spawn(
+            np.broadcast_to(np.asarray(position, dtype=float), (count, 3)),
+            np.asarray(velocity, dtype=float) + directions * speeds[:, np.newaxis],
+            colors,
+            sizes,
+            lifetimes,
+        )
+
+    @traced
+    def kill(self, slots):
+        """
+        Remove particles, their slots are reused by the next particles spawned
+        :param slots: the slots of the particles
+        :return:
+        """
+        slots = np.asarray(slots, dtype=np.int64).reshape(-1)
+        slots = np.unique(slots[self.alive[slots]])
+
+        self.wait_for_draw()
+
+        self.ambiguous = True
+        self._kill(slots)
+        self.mark_dirty()
+        self.ambiguous = False
+
+    def _kill(self, slots):
+        self.alive[slots] = False
+        # pushed highest first, so the lowest slots are used first again
+        self._free[self._free_count : self._free_count + len(slots)] = slots[::-1]
+        self._free_count += len(slots)
+        self.count -= len(slots)
+
+    def clear(self):
+        self.kill(np.flatnonzero(self.alive))
+
+    @traced
+    def step(self, time_step):
+        """
+        Move and age every particle, particles past their lifetime die
+        :param time_step: the number of seconds to move by
+        :return:
+        """
+        self.wait_for_draw()
+
+        self.ambiguous = True
+        died, bounds = step_points(
+            self.positions,
+            self.velocities,
+            self.ages,
+            self.lifetimes,
+            self.alive,
+            self.sizes,
+            self.gravity,
+            max(1 - self.drag * time_step, 0),
+            time_step,
+        )
+        # step_points marked them dead already
+        self._kill(died)
+        self.mark_dirty()
+        # the bounds are infinite when no particle is left
+        self._bounds = bounds if self.count else None
+        self._bounds_version = self.version
+        self.ambiguous = False
+
+    def move_relative(self, vector):
+        """
+        Move every particle by a relative amount
+        :param vector: the amount to move by
+        :return:
+        """
+        self.wait_for_draw()
+
+        self.ambiguous = True
+        self.positions += np.asarray(vector, dtype=float)
+        self.mark_dirty()
+        self.ambiguous = False
+
+    def update(self):
+        if not self.auto_update:
+            return
+
+        now = perf_counter()
+        if self._last_update is not None and self.count:
+            self.step(min(now - self._last_update, max_time_step))
+        self._last_update = now
+
+    def get_bounding_sphere(self):
+        """
+        Sphere around every live particle, recomputed only after the particles changed
+        :return: (center, radius)
+        """
+        version = self.version
+        if self._bounds_version != version:
+            alive = self.alive
+            if self.count:
+                sizes = self.sizes[alive, np.newaxis]
+                positions = self.positions[alive]
+                self._bounds = np.array(
+                    ((positions - sizes).min(axis=0), (positions + sizes).max(axis=0))
+                )
+            else:
+                self._bounds = None
+            self._bounds_version = version
+
+        if self._bounds is None or not np.all(np.isfinite(self._bounds)):
+            return np.zeros(3), 0.0
+        low, high = self._bounds
+        return (low + high) / 2, float(np.linalg.norm(high - low)) / 2
+
+    def get_screen_rect(self, camera, screen_size, point_radius=0):
+        # particles are at least a pixel wide however far away they are
+        return super().get_screen_rect(camera, screen_size, max(point_radius, 1))
+
+    def get_primitive_counts(self):
+        return self.count, 0
+
+    def draw(self, renderer):
+        """
+        Draw every live particle in one pass
+        :param renderer: the renderer to draw with
+        :return:
+        """
+        camera = renderer.camera
+        surface = renderer.display
+
+        self.wait_for_ambiguous()
+        self.drawing = True
+
+        size = surface.get_size()
+        if self._depth_buffer.shape != size:
+            self._depth_buffer = np.empty(size)
+        clip = surface.get_clip()
+        self._depth_buffer[clip.left : clip.right, clip.top : clip.bottom] = np.inf
+
+        pixels = pygame.surfarray.pixels3d(surface)
+        try:
+            splat_points(
+                self.positions,
+                self.alive,
+                self.colors,
+                self.sizes,
+                np.asarray(camera.position, dtype=float),
+                camera.rotation_matrix,
+                camera.offset_array,
+                camera.focal_length,
+                np.asarray(renderer.display_size, dtype=float),
+                camera.fov_side,
+                camera.fov_top,
+                self.round_points,
+                np.array(
+                    (clip.left, clip.top, clip.right, clip.bottom), dtype=np.int64
+                ),
+                pixels,
+                self._depth_buffer,
+            )
+        finally:
+            # the surface stays locked while the pixel array exists
+            del pixels
+
+        self.drawing = False
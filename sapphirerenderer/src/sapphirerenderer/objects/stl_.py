@@ -1,22 +1,15 @@
 import numpy as np
-from stl import mesh
 from ..object_classes.wireframe_object import WireframeObject
+from ..mesh_loading.stl_loader import load_stl_edges
+from ..mesh_loading.mesh_cache import mesh_cache
 
 
 class Stl(WireframeObject):
-    def __init__(self, filename, position=np.array([0.0, 0.0, 0.0]), color=(0, 0, 0)):
-        # Load STL file
-        mesh_data = mesh.Mesh.from_file(filename)
-
-        # Extract vertices
-        vertices = np.unique(mesh_data.vectors.reshape(-1, 3), axis=0)
+    # parses the file that is the first arg, see AsyncLoader
+    mesh_loader = staticmethod(load_stl_edges)
 
-        # Generate line segments
-        line_segments = []
-        for triangle in mesh_data.vectors:
-            for i in range(3):
-                p1 = np.nonzero((vertices == triangle[i]).all(axis=1))[0][0]
-                p2 = np.nonzero((vertices == triangle[(i + 1) % 3]).all(axis=1))[0][0]
-                line_segments.append((p1, p2))
+    def __init__(self, filename, position=np.array([0.0, 0.0, 0.0]), color=(0, 0, 0)):
+        # Load STL file, the cached arrays are shared with every other object of the file
+        vertices, edges = mesh_cache.load(self.mesh_loader, filename)
 
-        super().__init__(vertices, np.array(line_segments), position, color)
+        super().__init__(vertices, edges, position, color)
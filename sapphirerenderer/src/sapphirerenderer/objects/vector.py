@@ -47,6 +47,7 @@ class Vector(FlatFacesObject):
             compile_verts=True,
             position=start_point,
             move_to_zero=False,
+            back_face_culling=False,
         )
 
     def get_start_point(self):
@@ -109,3 +110,4 @@ class Vector(FlatFacesObject):
         vertices, _ = self.create_faces(direction)
 
         self.vertices = vertices
+        self.mark_dirty()
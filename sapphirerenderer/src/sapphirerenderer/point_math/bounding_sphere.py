@@ -0,0 +1,16 @@
+import numpy as np
+
+
+def bounding_sphere(points):
+    """
+    Sphere around the bounding box of a list of points
+    :param points: list of points
+    :return: center of the sphere, radius of the sphere
+    """
+    points = np.asarray(points, dtype=float)
+    if len(points) == 0:
+        return np.zeros(3), 0.0
+
+    center = (points.min(axis=0) + points.max(axis=0)) / 2
+    radius = np.sqrt(np.max(np.sum((points - center) ** 2, axis=1)))
+    return center, radius
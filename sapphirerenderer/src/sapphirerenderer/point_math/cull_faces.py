@@ -0,0 +1,78 @@
+import numpy as np
+from numba import njit
+
+
+@njit(fastmath=True, nogil=True)
+def cull_faces(
+    faces,
+    face_offsets,
+    face_indices,
+    face_windings,
+    projected_points,
+    visible,
+    min_face_area,
+):
+    """
+    Drop faces that point away from the camera or are too small to cover a pixel
+    :param faces: the indices of the faces to test
+    :param face_offsets: face i uses face_indices[face_offsets[i]:face_offsets[i + 1]]
+    :param face_indices: the vertex indices of all faces
+    :param face_windings: 1 if a face is counter clockwise seen from outside, -1 if clockwise,
+        0 to never back face cull it
+    :param projected_points: (n, 2) screen positions of the vertices
+    :param visible: (n,) whether each vertex is on screen
+    :param min_face_area: faces with a smaller projected area in pixels are dropped
+    :return: the faces that were kept
+    """
+    kept = np.empty(len(faces), dtype=np.int64)
+    kept_count = 0
+
+    for face in faces:
+        start = face_offsets[face]
+        end = face_offsets[face + 1]
+
+        # faces that are partly off screen can not be judged from their projection
+        all_visible = True
+        for k in range(start, end):
+            if not visible[face_indices[k]]:
+                all_visible = False
+                break
+        if not all_visible:
+            kept[kept_count] = face
+            kept_count += 1
+            continue
+
+        area = 0.0
+        min_x = np.inf
+        min_y = np.inf
+        max_x = -np.inf
+        max_y = -np.inf
+        for k in range(start, end):
+            point = projected_points[face_indices[k]]
+            next_k = k + 1 if k + 1 < end else start
+            next_point = projected_points[face_indices[next_k]]
+            area += point[0] * next_point[1] - next_point[0] * point[1]
+
+            min_x = min(min_x, point[0])
+            max_x = max(max_x, point[0])
+            min_y = min(min_y, point[1])
+            max_y = max(max_y, point[1])
+        area *= 0.5
+
+        # screen y points down, so faces facing the camera have a negative signed area
+        if face_windings[face] * area > 0:
+            continue
+
+        if abs(area) < min_face_area:
+            continue
+
+        # faces whose bounding box holds no pixel center can not cover a pixel
+        if np.ceil(min_x - 0.5) > np.floor(max_x - 0.5) or np.ceil(
+            min_y - 0.5
+        ) > np.floor(max_y - 0.5):
+            continue
+
+        kept[kept_count] = face
+        kept_count += 1
+
+    return kept[:kept_count]
@@ -29,3 +29,44 @@ def get_pitch_yaw_matrix(pitch, yaw):
 
 def get_pitch_yaw_roll_matrix(yaw, pitch, roll):
     return np.dot(get_pitch_yaw_matrix(yaw, pitch), get_pitch_matrix(roll))
+
+
+def get_pitch_yaw_roll_matrices(yaw, pitch, roll):
+    """
+    get_pitch_yaw_roll_matrix for arrays of angles
+    :param yaw: (n,) angles in radians
+    :param pitch: (n,) angles in radians
+    :param roll: (n,) angles in radians
+    :return: (n, 3, 3) matrices
+    """
+    yaw, pitch, roll = (
+        np.asarray(angles, dtype=float) for angles in (yaw, pitch, roll)
+    )
+    zeros = np.zeros_like(yaw)
+    ones = np.ones_like(yaw)
+
+    def stack(rows):
+        return np.stack([np.stack(row, axis=-1) for row in rows], axis=-2)
+
+    roll_matrices = stack(
+        [
+            [ones, zeros, zeros],
+            [zeros, np.cos(yaw), -np.sin(yaw)],
+            [zeros, np.sin(yaw), np.cos(yaw)],
+        ]
+    )
+    yaw_matrices = stack(
+        [
+            [np.cos(pitch), -np.sin(pitch), zeros],
+            [np.sin(pitch), np.cos(pitch), zeros],
+            [zeros, zeros, ones],
+        ]
+    )
+    pitch_matrices = stack(
+        [
+            [np.cos(roll), zeros, np.sin(roll)],
+            [zeros, ones, zeros],
+            [-np.sin(roll), zeros, np.cos(roll)],
+        ]
+    )
+    return roll_matrices @ yaw_matrices @ pitch_matrices
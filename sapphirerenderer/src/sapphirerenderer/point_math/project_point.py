@@ -2,7 +2,7 @@ import numpy as np
 from numba import njit
 
 
-@njit(fastmath=True)
+@njit(fastmath=True, nogil=True)
 def project_point(point, offset_array, focal_length, screen_size, fov_side, fov_top):
     if point[1] <= 0:
         return None, 1
@@ -35,3 +35,110 @@ def project_point(point, offset_array, focal_length, screen_size, fov_side, fov_
     point_size = 1 / np.linalg.norm(point)
 
     return projected_point, point_size
+
+
+@njit(fastmath=True, nogil=True)
+def project_points_into(
+    vertices,
+    camera_position,
+    rotation_matrix,
+    offset_array,
+    focal_length,
+    screen_size,
+    fov_side,
+    fov_top,
+    projected_points,
+    visible,
+    point_sizes,
+    depths,
+):
+    """
+    Move vertices into camera space and project them in one pass, writing into preallocated arrays
+    :param vertices: (n, 3) world space vertices
+    :param camera_position: the position of the camera
+    :param rotation_matrix: the rotation matrix of the camera
+    :param offset_array: the offset of the screen center
+    :param focal_length: the focal length of the camera
+    :param screen_size: the size of the screen
+    :param fov_side: the horizontal field of view
+    :param fov_top: the vertical field of view
+    :param projected_points: (n, 2) output screen positions
+    :param visible: (n,) output, False where project_point would return None
+    :param point_sizes: (n,) output point sizes
+    :param depths: (n,) output camera space depth of every vertex
+    """
+    for i in range(len(vertices)):
+        x = vertices[i, 0] - camera_position[0]
+        y = vertices[i, 1] - camera_position[1]
+        z = vertices[i, 2] - camera_position[2]
+
+        point_x = rotation_matrix[0, 0] * x + rotation_matrix[0, 1] * y
+        point_x += rotation_matrix[0, 2] * z
+        point_y = rotation_matrix[1, 0] * x + rotation_matrix[1, 1] * y
+        point_y += rotation_matrix[1, 2] * z
+        point_z = rotation_matrix[2, 0] * x + rotation_matrix[2, 1] * y
+        point_z += rotation_matrix[2, 2] * z
+
+        visible[i] = False
+        point_sizes[i] = 1
+        depths[i] = point_y
+
+        if point_y <= 0:
+            continue
+
+        # if point is out of view, skip it
+        top_angle = np.arctan2(point_z, point_y)
+        side_angle = np.arctan2(point_x, point_y)
+
+        if abs(top_angle) > fov_top or abs(side_angle) > fov_side:
+            continue
+
+        focal_length_divided_by_y = focal_length / point_y
+
+        projected_x = point_x * focal_length_divided_by_y + offset_array[0]
+        projected_y = -point_z * focal_length_divided_by_y + offset_array[1]
+
+        # if the point is more than 2000 pixels off the edge of the screen, skip it
+        if (
+            abs(projected_x) > screen_size[0] + 2000
+            or abs(projected_y) > screen_size[1] + 2000
+        ):
+            continue
+
+        projected_points[i, 0] = projected_x
+        projected_points[i, 1] = projected_y
+        visible[i] = True
+        point_sizes[i] = 1 / np.sqrt(
+            point_x * point_x + point_y * point_y + point_z * point_z
+        )
+
+
+def project_points(vertices, camera, screen_size):
+    """
+    Project an array of world space vertices with a camera
+    :param vertices: (n, 3) world space vertices
+    :param camera: the camera to project with
+    :param screen_size: the size of the screen
+    :return: (n, 2) screen positions, (n,) visibility mask, (n,) point sizes
+    """
+    vertices = np.asarray(vertices, dtype=float)
+    projected_points = np.zeros((len(vertices), 2))
+    visible = np.empty(len(vertices), dtype=np.bool_)
+    point_sizes = np.empty(len(vertices))
+    depths = np.empty(len(vertices))
+
+    project_points_into(
+        vertices,
+        np.asarray(camera.position, dtype=float),
+        camera.rotation_matrix,
+        camera.offset_array,
+        camera.focal_length,
+        np.asarray(screen_size, dtype=float),
+        camera.fov_side,
+        camera.fov_top,
+        projected_points,
+        visible,
+        point_sizes,
+        depths,
+    )
+    return projected_points, visible, point_sizes
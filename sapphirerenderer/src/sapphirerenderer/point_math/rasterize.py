@@ -0,0 +1,283 @@
+import numpy as np
+from numba import njit, prange
+
+
+@njit(fastmath=True, nogil=True)
+def rasterize_triangle(
+    x0,
+    y0,
+    w0,
+    x1,
+    y1,
+    w1,
+    x2,
+    y2,
+    w2,
+    color,
+    color_buffer,
+    depth_buffer,
+    clip_min_x,
+    clip_min_y,
+    clip_max_x,
+    clip_max_y,
+):
+    """
+    Fill a screen space triangle, keeping the pixels closest to the camera
+    :param x0: screen x of the first vertex, same for the other vertices
+    :param y0: screen y of the first vertex
+    :param w0: inverse camera depth of the first vertex
+    :param color: the color to fill with
+    :param color_buffer: (width, height, 3) color buffer to write into
+    :param depth_buffer: (width, height) buffer of inverse depths
+    :param clip_min_x: first pixel column that may be written, same for the other clip bounds
+    :param clip_max_x: last pixel column that may be written
+    """
+    area = (x1 - x0) * (y2 - y0) - (y1 - y0) * (x2 - x0)
+    if area == 0:
+        return
+    inverse_area = 1 / area
+
+    min_x = max(int(np.floor(min(x0, x1, x2))), clip_min_x)
+    max_x = min(int(np.ceil(max(x0, x1, x2))), clip_max_x)
+    min_y = max(int(np.floor(min(y0, y1, y2))), clip_min_y)
+    max_y = min(int(np.ceil(max(y0, y1, y2))), clip_max_y)
+
+    for pixel_y in range(min_y, max_y + 1):
+        center_y = pixel_y + 0.5
+        for pixel_x in range(min_x, max_x + 1):
+            center_x = pixel_x + 0.5
+
+            # barycentric weights, all positive inside the triangle for either winding
+            weight0 = (x2 - x1) * (center_y - y1) - (y2 - y1) * (center_x - x1)
+            weight0 *= inverse_area
+            weight1 = (x0 - x2) * (center_y - y2) - (y0 - y2) * (center_x - x2)
+            weight1 *= inverse_area
+            weight2 = 1 - weight0 - weight1
+            if weight0 < 0 or weight1 < 0 or weight2 < 0:
+                continue
+
+            # inverse depth is linear in screen space, bigger is closer
+            inverse_depth = weight0 * w0 + weight1 * w1 + weight2 * w2
+            if inverse_depth <= depth_buffer[pixel_x, pixel_y]:
+                continue
+
+            depth_buffer[pixel_x, pixel_y] = inverse_depth
+            color_buffer[pixel_x, pixel_y, 0] = color[0]
+            color_buffer[pixel_x, pixel_y, 1] = color[1]
+            color_buffer[pixel_x, pixel_y, 2] = color[2]
+
+
+@njit(fastmath=True, nogil=True)
+def rasterize_faces(
+    faces,
+    face_offsets,
+    face_indices,
+    face_colors,
+    projected_points,
+    visible,
+    depths,
+    color_buffer,
+    depth_buffer,
+):
+    """
+    Fill packed faces into a color buffer with a depth test, polygons are split into triangle fans
+    :param faces: the indices of the faces to draw
+    :param face_offsets: face i uses face_indices[face_offsets[i]:face_offsets[i + 1]]
+    :param face_indices: the vertex indices of all faces
+    :param face_colors: (face_count, 3) colors of the faces
+    :param projected_points: (n, 2) screen positions of the vertices
+    :param visible: (n,) whether each vertex is on screen
+    :param depths: (n,) camera space depth of the vertices
+    :param color_buffer: (width, height, 3) color buffer to write into
+    :param depth_buffer: (width, height) buffer of inverse depths, 0 is infinitely far
+    """
+    width = color_buffer.shape[0]
+    height = color_buffer.shape[1]
+
+    for face in faces:
+        start = face_offsets[face]
+        end = face_offsets[face + 1]
+        first = face_indices[start]
+        if not visible[first]:
+            continue
+
+        for k in range(start + 1, end - 1):
+            second = face_indices[k]
+            third = face_indices[k + 1]
+            if not visible[second] or not visible[third]:
+                continue
+
+            rasterize_triangle(
+                projected_points[first, 0],
+                projected_points[first, 1],
+                1 / depths[first],
+                projected_points[second, 0],
+                projected_points[second, 1],
+                1 / depths[second],
+                projected_points[third, 0],
+                projected_points[third, 1],
+                1 / depths[third],
+                face_colors[face],
+                color_buffer,
+                depth_buffer,
+                0,
+                0,
+                width - 1,
+                height - 1,
+            )
+
+
+@njit(fastmath=True, nogil=True)
+def triangulate_faces(faces, face_offsets, face_indices, visible):
+    """
+    Split packed faces into triangle fans, dropping triangles with a vertex off screen
+    :param faces: the indices of the faces to split
+    :param face_offsets: face i uses face_indices[face_offsets[i]:face_offsets[i + 1]]
+    :param face_indices: the vertex indices of all faces
+    :param visible: (n,) whether each vertex is on screen
+    :return: (t, 3) vertex indices of the triangles and (t,) face of every triangle
+    """
+    triangle_count = 0
+    for face in faces:
+        triangle_count += max(face_offsets[face + 1] - face_offsets[face] - 2, 0)
+
+    triangles = np.empty((triangle_count, 3), dtype=np.int64)
+    triangle_faces = np.empty(triangle_count, dtype=np.int64)
+
+    triangle = 0
+    for face in faces:
+        start = face_offsets[face]
+        end = face_offsets[face + 1]
+        first = face_indices[start]
+        for k in range(start + 1, end - 1):
+            second = face_indices[k]
+            third = face_indices[k + 1]
+            if visible[first] and visible[second] and visible[third]:
+                triangles[triangle, 0] = first
+                triangles[triangle, 1] = second
+                triangles[triangle, 2] = third
+                triangle_faces[triangle] = face
+                triangle += 1
+
+    return triangles[:triangle], triangle_faces[:triangle]
+
+
+@njit(fastmath=True, nogil=True)
+def bin_triangles(triangles, projected_points, tile_size, tiles_x, tiles_y):
+    """
+    Sort triangles into the screen tiles their bounding boxes touch
+    :param triangles: (t, 3) vertex indices of the triangles
+    :param projected_points: (n, 2) screen positions of the vertices
+    :param tile_size: the width and height of a tile in pixels
+    :param tiles_x: the number of tile columns
+    :param tiles_y: the number of tile rows
+    :return: tile i holds tile_triangles[tile_offsets[i]:tile_offsets[i + 1]]
+    """
+    tile_ranges = np.empty((len(triangles), 4), dtype=np.int64)
+    tile_counts = np.zeros(tiles_x * tiles_y, dtype=np.int64)
+
+    for t in range(len(triangles)):
+        min_x = np.inf
+        min_y = np.inf
+        max_x = -np.inf
+        max_y = -np.inf
+        for corner in range(3):
+            point = projected_points[triangles[t, corner]]
+            min_x = min(min_x, point[0])
+            max_x = max(max_x, point[0])
+            min_y = min(min_y, point[1])
+            max_y = max(max_y, point[1])
+
+        first_x = max(int(np.floor(min_x)) // tile_size, 0)
+        last_x = min(int(np.ceil(max_x)) // tile_size, tiles_x - 1)
+        first_y = max(int(np.floor(min_y)) // tile_size, 0)
+        last_y = min(int(np.ceil(max_y)) // tile_size, tiles_y - 1)
+        tile_ranges[t, 0] = first_x
+        tile_ranges[t, 1] = last_x
+        tile_ranges[t, 2] = first_y
+        tile_ranges[t, 3] = last_y
+
+        for tile_y in range(first_y, last_y + 1):
+            for tile_x in range(first_x, last_x + 1):
+                tile_counts[tile_y * tiles_x + tile_x] += 1
+
+    tile_offsets = np.zeros(tiles_x * tiles_y + 1, dtype=np.int64)
+    for tile in range(tiles_x * tiles_y):
+        tile_offsets[tile + 1] = tile_offsets[tile] + tile_counts[tile]
+
+    tile_triangles = np.empty(tile_offsets[-1], dtype=np.int64)
+    tile_fill = tile_offsets[:-1].copy()
+    for t in range(len(triangles)):
+        for tile_y in range(tile_ranges[t, 2], tile_ranges[t, 3] + 1):
+            for tile_x in range(tile_ranges[t, 0], tile_ranges[t, 1] + 1):
+                tile = tile_y * tiles_x + tile_x
+                tile_triangles[tile_fill[tile]] = t
+                tile_fill[tile] += 1
+
+    return tile_offsets, tile_triangles
+
+
+@njit(fastmath=True, nogil=True, parallel=True)
+def rasterize_tiles(
+    triangles,
+    triangle_faces,
+    tile_offsets,
+    tile_triangles,
+    tile_size,
+    tiles_x,
+    face_colors,
+    projected_points,
+    depths,
+    color_buffer,
+    depth_buffer,
+):
+    """
+    Clear and rasterize every screen tile in parallel, tiles never share pixels so no locking is needed
+    :param triangles: (t, 3) vertex indices of the triangles
+    :param triangle_faces: (t,) face of every triangle
+    :param tile_offsets: tile i holds tile_triangles[tile_offsets[i]:tile_offsets[i + 1]]
+    :param tile_triangles: the triangles of all tiles
+    :param tile_size: the width and height of a tile in pixels
+    :param tiles_x: the number of tile columns
+    :param face_colors: (face_count, 3) colors of the faces
+    :param projected_points: (n, 2) screen positions of the vertices
+    :param depths: (n,) camera space depth of the vertices
+    :param color_buffer: (width, height, 3) color buffer to write into
+    :param depth_buffer: (width, height) buffer of inverse depths
+    """
+    width = color_buffer.shape[0]
+    height = color_buffer.shape[1]
+
+    for tile in prange(len(tile_offsets) - 1):
+        clip_min_x = (tile % tiles_x) * tile_size
+        clip_min_y = (tile // tiles_x) * tile_size
+        clip_max_x = min(clip_min_x + tile_size, width) - 1
+        clip_max_y = min(clip_min_y + tile_size, height) - 1
+
+        color_buffer[clip_min_x : clip_max_x + 1, clip_min_y : clip_max_y + 1] = 255
+        depth_buffer[clip_min_x : clip_max_x + 1, clip_min_y : clip_max_y + 1] = 0
+
+        for k in range(tile_offsets[tile], tile_offsets[tile + 1]):
+            triangle = tile_triangles[k]
+            first = triangles[triangle, 0]
+            second = triangles[triangle, 1]
+            third = triangles[triangle, 2]
+
+            rasterize_triangle(
+                projected_points[first, 0],
+                projected_points[first, 1],
+                1 / depths[first],
+                projected_points[second, 0],
+                projected_points[second, 1],
+                1 / depths[second],
+                projected_points[third, 0],
+                projected_points[third, 1],
+                1 / depths[third],
+                face_colors[triangle_faces[triangle]],
+                color_buffer,
+                depth_buffer,
+                clip_min_x,
+                clip_min_y,
+                clip_max_x,
+                clip_max_y,
+            )
@@ -0,0 +1,143 @@
+import numpy as np
+from numba import njit
+
+
+@njit(fastmath=True, nogil=True)
+def splat_points(
+    points,
+    alive,
+    colors,
+    sizes,
+    camera_position,
+    rotation_matrix,
+    offset_array,
+    focal_length,
+    screen_size,
+    fov_side,
+    fov_top,
+    round_points,
+    clip,
+    pixels,
+    depth_buffer,
+):
+    """
+    Project points and draw them as screen aligned squares or discs straight into a pixel array in one pass,
+    the nearest point wins every pixel. Projects like project_points_into
+    :param points: (n, 3) world space points
+    :param alive: (n,) whether each point is drawn
+    :param colors: (n, 3) uint8 colors
+    :param sizes: (n,) radius of every point in world units, points are at least a pixel
+    :param camera_position: the position of the camera
+    :param rotation_matrix: the rotation matrix of the camera
+    :param offset_array: the offset of the screen center
+    :param focal_length: the focal length of the camera
+    :param screen_size: the size of the screen
+    :param fov_side: the horizontal field of view
+    :param fov_top: the vertical field of view
+    :param round_points: draw discs instead of squares
+    :param clip: (left, top, right, bottom) part of the pixels to draw in
+    :param pixels: (width, height, 3) uint8 pixels, like pygame.surfarray.pixels3d
+    :param depth_buffer: (width, height) depths, inf where nothing is drawn
+    :return: the number of points drawn
+    """
+    # comparing against the tangents is the same as comparing the angles for points in front of the camera
+    tan_side = np.tan(fov_side) if fov_side < np.pi / 2 else np.inf
+    tan_top = np.tan(fov_top) if fov_top < np.pi / 2 else np.inf
+
+    drawn = 0
+    for i in range(len(points)):
+        if not alive[i]:
+            continue
+
+        x = points[i, 0] - camera_position[0]
+        y = points[i, 1] - camera_position[1]
+        z = points[i, 2] - camera_position[2]
+
+        point_x = rotation_matrix[0, 0] * x + rotation_matrix[0, 1] * y
+        point_x += rotation_matrix[0, 2] * z
+        depth = rotation_matrix[1, 0] * x + rotation_matrix[1, 1] * y
+        depth += rotation_matrix[1, 2] * z
+        point_z = rotation_matrix[2, 0] * x + rotation_matrix[2, 1] * y
+        point_z += rotation_matrix[2, 2] * z
+
+        if depth <= 0:
+            continue
+        if abs(point_z) > tan_top * depth or abs(point_x) > tan_side * depth:
+            continue
+
+        focal_length_divided_by_depth = focal_length / depth
+        center_x = point_x * focal_length_divided_by_depth + offset_array[0]
+        center_y = -point_z * focal_length_divided_by_depth + offset_array[1]
+        if (
+            abs(center_x) > screen_size[0] + 2000
+            or abs(center_y) > screen_size[1] + 2000
+        ):
+            continue
+
+        radius = sizes[i] * focal_length_divided_by_depth
+        left = max(int(np.floor(center_x - radius)), clip[0])
+        right = min(int(np.floor(center_x + radius)) + 1, clip[2])
+        top = max(int(np.floor(center_y - radius)), clip[1])
+        bottom = min(int(np.floor(center_y + radius)) + 1, clip[3])
+        if left >= right or top >= bottom:
+            continue
+
+        # the pixel under the center is always drawn
+        squared_radius = max(radius * radius, 0.5)
+        for pixel_x in range(left, right):
+            dx = pixel_x + 0.5 - center_x
+            for pixel_y in range(top, bottom):
+                if round_points:
+                    dy = pixel_y + 0.5 - center_y
+                    if dx * dx + dy * dy > squared_radius:
+                        continue
+                if depth < depth_buffer[pixel_x, pixel_y]:
+                    depth_buffer[pixel_x, pixel_y] = depth
+                    pixels[pixel_x, pixel_y, 0] = colors[i, 0]
+                    pixels[pixel_x, pixel_y, 1] = colors[i, 1]
+                    pixels[pixel_x, pixel_y, 2] = colors[i, 2]
+        drawn += 1
+    return drawn
+
+
+@njit(fastmath=True, nogil=True)
+def step_points(
+    points, velocities, ages, lifetimes, alive, sizes, acceleration, damping, time_step
+):
+    """
+    Move and age points in one pass, points past their lifetime stop being alive
+    :param points: (n, 3) positions, changed in place
+    :param velocities: (n, 3) velocities, changed in place
+    :param ages: (n,) ages in seconds, changed in place
+    :param lifetimes: (n,) seconds every point lives
+    :param alive: (n,) whether each point is alive, changed in place
+    :param sizes: (n,) radius of every point, the bounds include it
+    :param acceleration: the acceleration of every point
+    :param damping: the factor the velocities are multiplied by
+    :param time_step: the number of seconds to move by
+    :return: (k,) indices of the points that died, (2, 3) low and high corner of the box around the live points
+    """
+    died = np.empty(len(points), dtype=np.int64)
+    died_count = 0
+    bounds = np.empty((2, 3))
+    bounds[0] = np.inf
+    bounds[1] = -np.inf
+
+    for i in range(len(points)):
+        if not alive[i]:
+            continue
+
+        ages[i] += time_step
+        if ages[i] >= lifetimes[i]:
+            alive[i] = False
+            died[died_count] = i
+            died_count += 1
+            continue
+
+        for k in range(3):
+            velocities[i, k] = velocities[i, k] * damping + acceleration[k] * time_step
+            points[i, k] += velocities[i, k] * time_step
+            bounds[0, k] = min(bounds[0, k], points[i, k] - sizes[i])
+            bounds[1, k] = max(bounds[1, k], points[i, k] + sizes[i])
+
+    return died[:died_count], bounds
@@ -0,0 +1,28 @@
+from numba import njit
+
+
+@njit(fastmath=True, nogil=True)
+def transform_instances_into(vertices, matrices, positions, out):
+    """
+    Place a copy of a mesh at every instance in one pass, writing into a preallocated array
+    :param vertices: (v, 3) vertices of the mesh
+    :param matrices: (n, 3, 3) rotation and scale of every instance
+    :param positions: (n, 3) position of every instance
+    :param out: (n * v, 3) array the vertices of instance i are written to rows i * v to (i + 1) * v
+    :return:
+    """
+    vertex_count = len(vertices)
+    for i in range(len(matrices)):
+        matrix = matrices[i]
+        start = i * vertex_count
+        for j in range(vertex_count):
+            x = vertices[j, 0]
+            y = vertices[j, 1]
+            z = vertices[j, 2]
+            for k in range(3):
+                out[start + j, k] = (
+                    matrix[k, 0] * x
+                    + matrix[k, 1] * y
+                    + matrix[k, 2] * z
+                    + positions[i, k]
+                )
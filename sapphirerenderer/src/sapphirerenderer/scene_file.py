@@ -0,0 +1,292 @@
+import os
+import json
+import importlib
+import numpy as np
+from .object_classes import base_object
+from .object_classes.base_object import Object
+from .utility_objects.packed_faces import PackedFaces
+from .utility_objects.mesh_resource import MeshResource
+
+# the package the module names of the classes are saved relative to
+package_name = __name__.rpartition(".")[0]
+
+scene_magic = b"SAPHSCN1"
+scene_version = 1
+
+# arrays are aligned to this many bytes in the file
+array_alignment = 64
+
+# arrays with fewer values are written into the header instead
+inline_array_size = 16
+
+
+class _Encoder:
+    def __init__(self):
+        """
+        Turns the attributes of objects into json, arrays are collected to be written after the header.
+        Arrays, lists, packed faces and meshes that are shared between attributes or objects are written once
+        and are shared again after loading
+        """
+        self.arrays = []
+        self.refs = {}
+        # keeps the values alive, so their ids are not reused while encoding
+        self.values = []
+
+    @staticmethod
+    def get_key(value):
+        # views of the same memory, like the triangles of meshes loaded from the same file, are written once
+        if isinstance(value, np.ndarray):
+            return (
+                value.__array_interface__["data"][0],
+                value.shape,
+                value.strides,
+                value.dtype.str,
+            )
+        return id(value)
+
+    def encode(self, value):
+        if value is None or isinstance(value, (bool, int, float, str)):
+            return value
+        if isinstance(value, np.generic):
+            return value.item()
+        if isinstance(value, tuple):
+            return {"__tuple__": [self.encode(item) for item in value]}
+
+        key = self.get_key(value)
+        ref = self.refs.get(key)
+        if ref is not None:
+            return {"__ref__": ref}
+
+        if isinstance(value, np.ndarray):
+            if value.dtype.hasobject:
+                raise TypeError("arrays of python objects can not be saved")
+            if value.size < inline_array_size:
+                # the shape is kept, the values of an empty array do not tell it
+                return {
+                    "__small_array__": value.dtype.str,
+                    "shape": value.shape,
+                    "data": value.ravel().tolist(),
+                }
+            self.arrays.append(np.ascontiguousarray(value))
+            encoded = {"__array__": len(self.arrays) - 1}
+        elif isinstance(value, list):
+            encoded = {"__list__": [self.encode(item) for item in value]}
+        elif isinstance(value, dict):
+            # the keys of a json object are always strings, dicts are saved as lists of pairs
+            encoded = {
+                "__dict__": [[self.encode(k), self.encode(v)] for k, v in value.items()]
+            }
+        elif isinstance(value, PackedFaces):
+            encoded = {"__packed_faces__": self.encode(vars(value))}
+        elif isinstance(value, MeshResource):
+            encoded = {"__mesh_resource__": self.encode(vars(value))}
+        else:
+            raise TypeError(f"{type(value).__name__} attributes can not be saved")
+
+        ref = len(self.refs)
+        self.refs[key] = ref
+        self.values.append(value)
+        return {"__ref__": ref, "value": encoded}
+
+
+class _Decoder:
+    def __init__(self, arrays):
+        """
+        Turns json made by _Encoder back into attributes
+        :param arrays: the arrays the json refers to
+        """
+        self.arrays = arrays
+        self.refs = {}
+
+    def decode(self, value):
+        if isinstance(value, list):
+            return [self.decode(item) for item in value]
+        if not isinstance(value, dict):
+            return value
+
+        if "__tuple__" in value:
+            return tuple(self.decode(item) for item in value["__tuple__"])
+        if "__small_array__" in value:
+            small_array = np.array(value["data"], dtype=value["__small_array__"])
+            # files saved before the shape was kept only have the nested values
+            if "shape" in value:
+                small_array = small_array.reshape(value["shape"])
+            return small_array
+        if "__ref__" in value:
+            if "value" not in value:
+                return self.refs[value["__ref__"]]
+            decoded = self.decode(value["value"])
+            self.refs[value["__ref__"]] = decoded
+            return decoded
+        if "__array__" in value:
+            return self.arrays[value["__array__"]]
+        if "__list__" in value:
+            return self.decode(value["__list__"])
+        if "__dict__" in value:
+            return {self.decode(k): self.decode(v) for k, v in value["__dict__"]}
+        if "__packed_faces__" in value:
+            packed_faces = PackedFaces.__new__(PackedFaces)
+            vars(packed_faces).update(self.decode(value["__packed_faces__"]))
+            return packed_faces
+        if "__mesh_resource__" in value:
+            mesh = MeshResource.__new__(MeshResource)
+            vars(mesh).update(self.decode(value["__mesh_resource__"]))
+            return mesh
+        raise ValueError(f"Unknown value in scene file: {list(value)}")
+
+
+def _get_class_names(cls):
+    """
+    Get the names of a class and its base classes that are objects, a class that can not be imported
+    when the scene is loaded is replaced by the first of its bases that can
+    :param cls: the class of an object
+    :return: list of (module, qualified name), module names in this package start with a dot
+    """
+    names = []
+    for base in cls.__mro__:
+        if not (isinstance(base, type) and issubclass(base, Object)):
+            continue
+        module = base.__module__
+        if module.startswith(package_name + "."):
+            module = module[len(package_name) :]
+        names.append((module, base.__qualname__))
+    return names
+
+
+def _import_class(names):
+    """
+    Import the first class of _get_class_names that can be imported
+    :param names: the names of the class and its bases
+    :return: the class
+    """
+    for module_name, qualname in names:
+        try:
+            module = importlib.import_module(module_name, package_name)
+            cls = module
+            for part in qualname.split("."):
+                cls = getattr(cls, part)
+        except (ImportError, AttributeError):
+            continue
+
+        if isinstance(cls, type) and issubclass(cls, Object):
+            if (module_name, qualname) != tuple(names[0]):
+                print(f"Failed to import {names[0][1]}, loading it as {qualname}")
+            return cls
+    raise ImportError(f"Can not import {names[0][1]} or any of its base classes")
+
+
+def save_scene(objects, path):
+    """
+    Save objects into one file, a json header describes the objects and their arrays follow it,
+    so the file can be memory mapped instead of read when it is loaded
+    :param objects: the objects to save
+    :param path: the path of the file
+    :return:
+    """
+    encoder = _Encoder()
+    class_ids = {}
+    class_names = []
+    entries = []
+
+    for obj in objects:
+        cls = type(obj)
+        if cls not in class_ids:
+            class_ids[cls] = len(class_names)
+            class_names.append(_get_class_names(cls))
+        # objects can leave out what they rebuild, like caches, the same way they do for pickle
+        get_state = getattr(obj, "__getstate__", None)
+        state = get_state() if get_state is not None else vars(obj)
+        entries.append({"class": class_ids[cls], "state": encoder.encode(state)})
+
+    layout = []
+    offset = 0
+    for array in encoder.arrays:
+        offset = -(-offset // array_alignment) * array_alignment
+        layout.append((array.dtype.str, array.shape, offset))
+        offset += array.nbytes
+
+    header = json.dumps(
+        {
+            "version": scene_version,
+            "classes": class_names,
+            "objects": entries,
+            "arrays": layout,
+        }
+    ).encode()
+
+    # the arrays start at the first aligned offset after the header
+    data_start = len(scene_magic) + 8 + len(header)
+    data_start = -(-data_start // array_alignment) * array_alignment
+
+    # objects loaded from an older version of the file keep mapping it, so it is replaced instead of overwritten
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "wb") as file:
+        file.write(scene_magic)
+        file.write(np.array(len(header), dtype="<u8").tobytes())
+        file.write(header)
+        for array, (_, _, array_offset) in zip(encoder.arrays, layout):
+            file.seek(data_start + array_offset)
+            file.write(array.tobytes())
+        file.truncate(data_start + offset)
+    os.replace(temp_path, path)
+
+
+def load_scene(path):
+    """
+    Load the objects of a file made by save_scene without running their constructors.
+    The arrays are memory mapped copy on write, they are only read from the disk when they are used,
+    and processes that load the same file share the memory until they change an array
+    :param path: the path of the file
+    :return: the objects in the order they were saved
+    """
+    with open(path, "rb") as file:
+        if file.read(len(scene_magic)) != scene_magic:
+            raise ValueError(f"{path} is not a scene file")
+        header_size = int(np.frombuffer(file.read(8), dtype="<u8")[0])
+        header = json.loads(file.read(header_size))
+
+    if header["version"] != scene_version:
+        raise ValueError(
+            f"{path} is a version {header['version']} scene file, expected version {scene_version}"
+        )
+
+    data_start = len(scene_magic) + 8 + header_size
+    data_start = -(-data_start // array_alignment) * array_alignment
+
+    data_size = 0
+    for dtype, shape, offset in header["arrays"]:
+        data_size = max(
+            data_size, offset + int(np.prod(shape)) * np.dtype(dtype).itemsize
+        )
+
+    arrays = []
+    if data_size:
+        # one mapping for the whole file, every array is a plain array view into it
+        data = np.memmap(
+            path, dtype=np.uint8, mode="c", offset=data_start, shape=data_size
+        )
+        for dtype, shape, offset in header["arrays"]:
+            arrays.append(
+                np.ndarray(tuple(shape), dtype=dtype, buffer=data, offset=offset)
+            )
+
+    classes = [_import_class(names) for names in header["classes"]]
+    decoder = _Decoder(arrays)
+
+    objects = []
+    for entry in header["objects"]:
+        obj = classes[entry["class"]].__new__(classes[entry["class"]])
+        state = decoder.decode(entry["state"])
+        # objects that left out what they rebuild put it back, the same way they do for pickle
+        set_state = getattr(obj, "__setstate__", None)
+        if set_state is not None:
+            set_state(state)
+        else:
+            vars(obj).update(state)
+
+        # a loaded object is a new object that is not being drawn
+        obj.object_id = next(base_object._object_ids)
+        obj.drawing = False
+        obj.ambiguous = False
+        objects.append(obj)
+    return objects
@@ -10,3 +10,44 @@ camera_rotate_speed = 0.02
 fps = 60
 lock_fps = False
 show_fps = True
+
+# draw the timings of the render stages over the frame, stats are kept for the last stats_size frames
+show_stats = False
+stats_size = 120
+
+# "painter" sorts faces and draws them back to front, "zbuffer" rasterizes them with a depth buffer,
+# "tiled" rasterizes screen tiles in parallel on render_threads cores (0 uses every core)
+render_backend = "painter"
+render_tile_size = 64
+render_threads = 0
+
+# skip faces pointing away from the camera or too small to cover a pixel, faces with a projected
+# area below min_face_area pixels are skipped too
+face_culling = True
+min_face_area = 0
+
+# objects further from the camera than this are not drawn, None draws everything
+far_distance = None
+
+# only redraw the part of the screen that changed, frames where nothing changed are skipped,
+# when more than max_damage_fraction of the screen changed all of it is redrawn.
+# It only sees changes made through the methods of objects, scenes that set attributes of objects directly
+# or draw on renderer.display themselves have to call renderer.invalidate() when they turn it on
+damage_tracking = False
+max_damage_fraction = 0.5
+
+# record spans of the render stages, object draws, mutations and waits on every thread,
+# the last trace_size spans are kept and can be saved as a Chrome trace with save_trace
+trace = False
+trace_size = 100000
+
+# parsed STL and OBJ files are kept in memory up to mesh_cache_size bytes, loading a file again that did not
+# change skips parsing it. Set mesh_cache_dir, like "~/.cache/sapphirerenderer/meshes", to also save them there
+# for later runs, the directory is not limited in size and clear(disk=True) of mesh_cache empties it
+mesh_cache_size = 256 * 1024 * 1024
+mesh_cache_dir = None
+
+# objects added with add_object_async are built on load_threads threads (0 uses every core), with load_processes
+# above 0 and mesh_cache_dir set their mesh files are parsed on that many processes first and passed back through it
+load_threads = 0
+load_processes = 0
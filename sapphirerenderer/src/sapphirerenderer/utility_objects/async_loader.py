@@ -0,0 +1,222 @@
+import os
+import threading
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from ..mesh_loading.mesh_cache import mesh_cache, prefetch_mesh
+
+
+class ObjectHandle:
+    def __init__(self, obj_class, placeholder=None):
+        """
+        Stand in for an object that is built in the background, returned by add_object_async.
+        Calls of methods of the object made before it is built are queued and run on it once it is,
+        they return None. Reading any other attribute waits for the object to be built
+        :param obj_class: the class of the object
+        :param placeholder: the object shown in its place until it is in the scene, None to show nothing
+        """
+        self.obj_class = obj_class
+        self.placeholder = placeholder
+        self.loaded_object = None
+        self.error = None
+
+        self._calls = []
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+
+    def __getattr__(self, name):
+        # only called for attributes the handle does not have itself
+        obj = self.loaded_object
+        if obj is not None:
+            return getattr(obj, name)
+
+        if not callable(getattr(self.obj_class, name, None)):
+            return getattr(self.result(), name)
+
+        def queued_call(*args, **kwargs):
+            with self._lock:
+                if not self._done.is_set():
+                    self._calls.append((name, args, kwargs))
+                    return None
+            return getattr(self.result(), name)(*args, **kwargs)
+
+        return queued_call
+
+    def done(self):
+        return self._done.is_set()
+
+    def result(self, timeout=None):
+        """
+        Wait for the object to be built
+        :param timeout: the number of seconds to wait, None waits until it is built
+        :return: the object, the queued calls have run on it
+        """
+        if not self._done.wait(timeout):
+            raise TimeoutError(f"{self.obj_class.__name__} is still loading")
+        if self.error is not None:
+            raise self.error
+        return self.loaded_object
+
+    def _finish(self, obj, error):
+        """
+        Run the queued calls on the built object, called on the loading thread before the object is in the scene
+        :param obj: the built object, None if building it failed
+        :param error: the exception building it raised
+        :return:
+        """
+        with self._lock:
+            if error is None:
+                try:
+                    for name, args, kwargs in self._calls:
+                        getattr(obj, name)(*args, **kwargs)
+                except Exception as e:
+                    error = e
+
+            self.loaded_object = obj if error is None else None
+            self.error = error
+            self._calls = []
+            self._done.set()
+
+    def __str__(self):
+        if self.loaded_object is not None:
+            return str(self.loaded_object)
+        return f"{self.obj_class.__name__} (loading)"
+
+
+class AsyncLoader:
+    def __init__(self, threads=0, processes=0):
+        """
+        Builds objects on a pool of threads and puts them into the scene at the start of a frame.
+        Objects that load a mesh file can have the file parsed on a pool of processes first,
+        the parsed mesh is passed back through the directory of the mesh cache
+        :param threads: the number of threads building objects, 0 uses every core
+        :param processes: the number of processes parsing mesh files, 0 parses them on the threads
+        """
+        self.threads = threads
+        self.processes = processes
+
+        self._thread_pool = None
+        self._process_pool = None
+        self._pending = []
+        self._lock = threading.Lock()
+
+    def _get_thread_pool(self):
+        if self._thread_pool is None:
+            self._thread_pool = ThreadPoolExecutor(
+                self.threads or os.cpu_count(), thread_name_prefix="loader"
+            )
+        return self._thread_pool
+
+    def _get_process_pool(self):
+        if self._process_pool is None:
+            self._process_pool = ProcessPoolExecutor(
+                self.processes, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._process_pool
+
+    def load(self, obj_class, args=None, placeholder=None):
+        """
+        Start building an object in the background
+        :param obj_class: the class of the object
+        :param args: the args to pass to the init of the class
+        :param placeholder: the object shown in its place until it is in the scene
+        :return: the handle of the object
+        """
+        args = tuple(args) if args is not None else ()
+        handle = ObjectHandle(obj_class, placeholder)
+
+        # the mesh file is the first arg of objects that load one
+        loader = getattr(obj_class, "mesh_loader", None)
+        prefetch = None
+        if (
+            self.processes > 0
+            and loader is not None
+            and args
+            and mesh_cache.enabled
+            and mesh_cache.directory is not None
+        ):
+            prefetch = self._get_process_pool().submit(
+                prefetch_mesh, loader, args[0], mesh_cache.directory
+            )
+
+        with self._lock:
+            self._pending.append(handle)
+        self._get_thread_pool().submit(self._build, handle, obj_class, args, prefetch)
+        return handle
+
+    @staticmethod
+    def _build(handle, obj_class, args, prefetch):
+        try:
+            if prefetch is not None:
+                try:
+                    prefetch.result()
+                except Exception:
+                    # the object parses the file itself and raises the error
+                    pass
+            obj = obj_class(*args)
+        except Exception as e:
+            handle._finish(None, e)
+        else:
+            handle._finish(obj, None)
+
+    def swap(self, objects):
+        """
+        Put the objects that finished building into the scene in place of their placeholders
+        :param objects: the list of objects of the scene
+        :return: whether the scene changed
+        """
+        with self._lock:
+            finished = [handle for handle in self._pending if handle.done()]
+            if not finished:
+                return False
+            self._pending = [
+                handle for handle in self._pending if handle not in finished
+            ]
+
+        for handle in finished:
+            placeholder_index = None
+            for i, obj in enumerate(objects):
+                if obj is handle.placeholder:
+                    placeholder_index = i
+                    break
+
+            if handle.loaded_object is not None:
+                if placeholder_index is None:
+                    objects.append(handle.loaded_object)
+                else:
+                    objects[placeholder_index] = handle.loaded_object
+            else:
+                if placeholder_index is not None:
+                    objects.pop(placeholder_index)
+                print(f"Failed to load {handle.obj_class.__name__}: {handle.error}")
+        return True
+
+    def discard(self, handle):
+        """
+        Keep an object that is still loading out of the scene
+        :param handle: the handle of the object
+        :return:
+        """
+        with self._lock:
+            if handle in self._pending:
+                self._pending.remove(handle)
+
+    def wait(self, timeout=None):
+        """
+        Wait for every object that is loading to be built, they are put into the scene at the start of the next frame
+        :param timeout: the number of seconds to wait for each object, None waits until it is built
+        :return: whether every object was built
+        """
+        with self._lock:
+            pending = list(self._pending)
+        return all(handle._done.wait(timeout) for handle in pending)
+
+    def shutdown(self):
+        """
+        Stop the pools, objects that did not start building are never built
+        :return:
+        """
+        for pool in (self._thread_pool, self._process_pool):
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
+        self._thread_pool = None
+        self._process_pool = None
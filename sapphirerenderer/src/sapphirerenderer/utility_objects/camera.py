@@ -1,4 +1,5 @@
 import numpy as np
+import pygame
 from ..point_math.matricies import get_pitch_yaw_matrix
 
 
@@ -41,3 +42,75 @@ class Camera:
 
     def get_rotation_matrix(self):
         return get_pitch_yaw_matrix(*self.rotation)
+
+    def spheres_in_view(self, centers, radii, far_distance=None):
+        """
+        Test bounding spheres against the view frustum of the camera
+        :param centers: (n, 3) world space centers of the spheres
+        :param radii: (n,) radii of the spheres
+        :param far_distance: spheres further away than this are out of view, None for no limit
+        :return: (n,) bool array, True where a sphere may be visible
+        """
+        centers = np.asarray(centers, dtype=float).reshape(-1, 3)
+        radii = np.asarray(radii, dtype=float)
+        camera_space = (centers - self.position) @ self.rotation_matrix.T
+        side, depth, top = camera_space[:, 0], camera_space[:, 1], camera_space[:, 2]
+
+        # nothing in front of the camera
+        in_view = depth + radii > 0
+        if far_distance is not None:
+            in_view &= depth - radii <= far_distance
+
+        # distance outside the side and top planes of the frustum
+        for offset, fov in ((side, self.fov_side), (top, self.fov_top)):
+            if fov < np.pi / 2:
+                in_view &= np.abs(offset) * np.cos(fov) - depth * np.sin(fov) <= radii
+
+        return in_view
+
+    def object_in_view(self, obj, far_distance=None):
+        """
+        Test the bounding sphere of an object against the view frustum of the camera
+        :param obj: the object to test
+        :param far_distance: objects further away than this are out of view, None for no limit
+        :return: False if the object is certainly out of view
+        """
+        sphere = obj.get_bounding_sphere()
+        if sphere is None:
+            return True
+        return bool(self.spheres_in_view(sphere[0], [sphere[1]], far_distance)[0])
+
+    def sphere_screen_rect(self, center, radius, screen_size, point_radius=0):
+        """
+        Screen area that a sphere can cover, anything drawn inside the sphere lands inside it
+        :param center: world space center of the sphere
+        :param radius: radius of the sphere
+        :param screen_size: the size of the screen
+        :param point_radius: radius in pixels at distance 1 of points drawn on the sphere,
+            they shrink with distance like the points of wireframe objects
+        :return: a pygame Rect clipped to the screen, empty if the sphere is behind the camera
+        """
+        screen = pygame.Rect((0, 0), (int(screen_size[0]), int(screen_size[1])))
+        side, depth, top = (np.asarray(center, dtype=float) - self.position) @ (
+            self.rotation_matrix.T
+        )
+
+        if depth + radius <= 0:
+            return pygame.Rect(0, 0, 0, 0)
+        if depth - radius <= 1e-6:
+            # vertices right in front of the camera can be projected anywhere
+            return screen
+
+        # x / y only grows or shrinks along each axis, so the corners of the box around the sphere
+        # project to the extremes
+        depths = np.array((depth - radius, depth + radius))
+        xs = np.outer((side - radius, side + radius), self.focal_length / depths)
+        ys = np.outer((-top - radius, -top + radius), self.focal_length / depths)
+
+        padding = 2 + point_radius / (depth - radius)
+        left = int(np.floor(xs.min() + self.offset_array[0] - padding))
+        right = int(np.ceil(xs.max() + self.offset_array[0] + padding))
+        upper = int(np.floor(ys.min() + self.offset_array[1] - padding))
+        lower = int(np.ceil(ys.max() + self.offset_array[1] + padding))
+
+        return pygame.Rect(left, upper, right - left, lower - upper).clip(screen)
@@ -0,0 +1,135 @@
+import numpy as np
+import pygame
+
+
+class DamageTracker:
+    def __init__(self, max_damage_fraction=0.5):
+        """
+        Remembers what the last frame showed, so frames where nothing changed can be skipped and
+        frames where a few objects changed only redraw the part of the screen they touch
+        :param max_damage_fraction: redraw the whole screen when the changed area is bigger than this part of it
+        """
+        self.max_damage_fraction = max_damage_fraction
+
+        self.invalid = True
+        self.camera_state = None
+        self.scene_version = None
+        self.object_states = {}
+        self.screen_rects = {}
+
+    def invalidate(self):
+        """
+        Redraw the whole screen next frame
+        :return:
+        """
+        self.invalid = True
+
+    @staticmethod
+    def get_object_state(obj):
+        return obj.version, obj.is_hidden()
+
+    @staticmethod
+    def get_camera_state(camera, screen_size):
+        return (
+            tuple(np.ravel(camera.position)),
+            tuple(np.ravel(camera.rotation)),
+            camera.fov,
+            tuple(screen_size),
+        )
+
+    def get_damage(self, objects, scene_version, camera, screen_size):
+        """
+        Find the part of the screen that changed since the last frame
+        :param objects: the objects in the scene
+        :param scene_version: changes whenever objects are added or removed
+        :param camera: the camera the frame is drawn with
+        :param screen_size: the size of the screen
+        :return: a pygame Rect to redraw, the whole screen for a full redraw, or None if nothing changed
+        """
+        screen = pygame.Rect((0, 0), (int(screen_size[0]), int(screen_size[1])))
+
+        camera_state = self.get_camera_state(camera, screen_size)
+        camera_moved = camera_state != self.camera_state
+        if camera_moved:
+            # every object moved on screen
+            self.screen_rects = {}
+
+        full_redraw = self.invalid or camera_moved
+        damage = None
+
+        object_states = {}
+        for obj in objects:
+            key = id(obj)
+            state = self.get_object_state(obj)
+            object_states[key] = (obj, state)
+
+            previous = self.object_states.get(key)
+            if previous is not None and previous[0] is obj and previous[1] == state:
+                continue
+
+            if full_redraw:
+                self.screen_rects.pop(key, None)
+                continue
+
+            # the object has to be cleared where it was and drawn where it is now
+            old_rect = self.screen_rects.get(key) if previous is not None else None
+            new_rect = obj.get_screen_rect(camera, screen_size)
+            self.screen_rects[key] = new_rect
+
+            if (previous is not None and old_rect is None) or new_rect is None:
+                full_redraw = True
+                continue
+
+            damage = self._add_damage(damage, old_rect)
+            damage = self._add_damage(damage, new_rect)
+
+        if scene_version != self.scene_version:
+            for key in self.object_states.keys() - object_states.keys():
+                old_rect = self.screen_rects.pop(key, None)
+                if old_rect is None:
+                    full_redraw = True
+                elif not full_redraw:
+                    damage = self._add_damage(damage, old_rect)
+
+        if not camera_moved:
+            # the screen rects stay valid until the camera moves, so only find them once it stopped
+            for key, (obj, _) in object_states.items():
+                if key not in self.screen_rects:
+                    self.screen_rects[key] = obj.get_screen_rect(camera, screen_size)
+
+        self.invalid = False
+        self.camera_state = camera_state
+        self.scene_version = scene_version
+        self.object_states = object_states
+
+        if full_redraw:
+            return screen
+        if damage is None:
+            return None
+
+        damage = damage.clip(screen)
+        if (
+            damage.width * damage.height
+            > self.max_damage_fraction * screen.width * screen.height
+        ):
+            return screen
+        return damage
+
+    @staticmethod
+    def _add_damage(damage, rect):
+        if rect is None or rect.width == 0 or rect.height == 0:
+            return damage
+        if damage is None:
+            return pygame.Rect(rect)
+        return damage.union(rect)
+
+    def check_unchanged(self):
+        """
+        Call after drawing a frame, objects that changed while they were drawn may have been drawn
+        half way, so the whole screen is redrawn next frame
+        :return:
+        """
+        for obj, state in self.object_states.values():
+            if self.get_object_state(obj) != state:
+                self.invalidate()
+                return
@@ -0,0 +1,76 @@
+import numpy as np
+from numba import njit
+
+
+@njit(nogil=True)
+def insertion_sort_descending(items, keys, max_shifts):
+    """
+    Sort items by descending key in place, fast when the input is already nearly sorted
+    :param items: the items to sort
+    :param keys: the key of every item, sorted along with the items
+    :param max_shifts: give up after moving items this many places in total
+    :return: True if the items are sorted, False if the sort gave up
+    """
+    shifts = 0
+    for i in range(1, len(keys)):
+        key = keys[i]
+        item = items[i]
+        j = i - 1
+        while j >= 0 and keys[j] < key:
+            keys[j + 1] = keys[j]
+            items[j + 1] = items[j]
+            j -= 1
+            shifts += 1
+            if shifts > max_shifts:
+                keys[j + 1] = key
+                items[j + 1] = item
+                return False
+        keys[j + 1] = key
+        items[j + 1] = item
+    return True
+
+
+class DepthSorter:
+    def __init__(self, max_shifts_per_item=8):
+        """
+        Keeps the order of the last frame and repairs it instead of sorting from scratch
+        :param max_shifts_per_item: how much repair work per item is allowed before falling back to a full sort
+        """
+        self.max_shifts_per_item = max_shifts_per_item
+        self.order = np.empty(0, dtype=np.int64)
+        self.state = None
+
+    def reset(self):
+        self.order = np.empty(0, dtype=np.int64)
+        self.state = None
+
+    def sort(self, items, get_keys, item_count, state=None):
+        """
+        Sort items from furthest to closest
+        :param items: int array of the items to sort, each below item_count
+        :param get_keys: function that returns the distance of every item in an array of items
+        :param item_count: the number of possible items
+        :param state: anything that changes whenever a distance may have changed, if it equals the
+            state of the last sort the last order is returned without computing any distance
+        :return: the items ordered by descending distance
+        """
+        if state is not None and self.state is not None and state == self.state:
+            return self.order
+
+        # start from the last order, dropping items that are gone and adding new ones at the end
+        is_item = np.zeros(item_count, dtype=bool)
+        is_item[items] = True
+        was_item = np.zeros(item_count, dtype=bool)
+        previous = self.order[self.order < item_count]
+        was_item[previous] = True
+        order = np.concatenate((previous[is_item[previous]], items[~was_item[items]]))
+
+        keys = np.asarray(get_keys(order), dtype=float)
+        if not insertion_sort_descending(
+            order, keys, self.max_shifts_per_item * len(order)
+        ):
+            order = order[np.argsort(keys, kind="stable")[::-1]]
+
+        self.order = order
+        self.state = state
+        return order
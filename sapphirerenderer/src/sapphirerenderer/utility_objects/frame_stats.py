@@ -0,0 +1,283 @@
+import numpy as np
+import pygame
+from collections import deque
+from time import perf_counter
+from .tracer import tracer
+
+stage_names = (
+    "events",
+    "update",
+    "damage",
+    "object_sort",
+    "compile",
+    "shading",
+    "culling",
+    "projection",
+    "face_sort",
+    "draw",
+    "flip",
+    "idle",
+)
+
+counter_names = (
+    "objects_submitted",
+    "objects_culled",
+    "objects_drawn",
+    "faces_submitted",
+    "faces_culled",
+    "faces_drawn",
+    "vertices_submitted",
+    "vertices_culled",
+    "vertices_drawn",
+)
+
+
+class FrameStats:
+    def __init__(self, size=120):
+        """
+        Timings of every stage of the last frames and counts of what they drew, kept in a ring buffer.
+        Stages can be nested, a stage only gets the time not spent in the stages inside it,
+        so the stage times of a frame add up to the frame time
+        :param size: the number of frames to keep
+        """
+        self.size = size
+        self.stage_indices = {name: i for i, name in enumerate(stage_names)}
+        self.counter_indices = {name: i for i, name in enumerate(counter_names)}
+
+        self.frame_times = np.zeros(size)
+        self.stage_times = np.zeros((size, len(stage_names)))
+        self.counters = np.zeros((size, len(counter_names)), dtype=np.int64)
+        self.frame_count = 0
+
+        # the frame being recorded
+        self._frame_start = None
+        self._times = [0.0] * len(stage_names)
+        self._counts = [0] * len(counter_names)
+        self._stack = []
+        self._next_stage = None
+
+        # time and geometry of every object per frame, keyed by object id: [name, time, vertices, primitives]
+        self.object_costs = deque(maxlen=size)
+        self._object_costs = {}
+
+        self._font = None
+
+    def begin_frame(self):
+        self._frame_start = perf_counter()
+
+    def end_frame(self):
+        """
+        Store the frame in the ring buffer and start a new one
+        :return:
+        """
+        if self._frame_start is None:
+            return
+
+        end = perf_counter()
+        tracer.add_span("frame", self._frame_start, end)
+
+        row = self.frame_count % self.size
+        self.frame_times[row] = end - self._frame_start
+        self.stage_times[row] = self._times
+        self.counters[row] = self._counts
+        self.frame_count += 1
+        self.object_costs.append(self._object_costs)
+
+        self._frame_start = None
+        self._times = [0.0] * len(stage_names)
+        self._counts = [0] * len(counter_names)
+        self._object_costs = {}
+
+    def stage(self, name):
+        """
+        Time a stage of the frame, use as a context manager: with stats.stage("draw"):
+        :param name: the name of the stage, one of stage_names
+        :return: the context manager
+        """
+        self._next_stage = self.stage_indices[name]
+        return self
+
+    def __enter__(self):
+        self._stack.append([self._next_stage, perf_counter(), 0.0])
+        return self
+
+    def __exit__(self, *args):
+        stage, start, inner_time = self._stack.pop()
+        end = perf_counter()
+        tracer.add_span(stage_names[stage], start, end)
+
+        elapsed = end - start
+        self._times[stage] += elapsed - inner_time
+        if self._stack:
+            self._stack[-1][2] += elapsed
+
+    def count(self, name, amount):
+        """
+        Add to a counter of the frame
+        :param name: the name of the counter, one of counter_names
+        :param amount: the amount to add
+        :return:
+        """
+        self._counts[self.counter_indices[name]] += amount
+
+    def add_object_cost(self, obj, seconds, vertices=0, primitives=0):
+        """
+        Attribute time and geometry of the frame to an object
+        :param obj: the object
+        :param seconds: the time spent compiling or drawing the object
+        :param vertices: the number of vertices drawn of the object
+        :param primitives: the number of faces or lines drawn of the object
+        :return:
+        """
+        cost = self._object_costs.get(obj.object_id)
+        if cost is None:
+            self._object_costs[obj.object_id] = [
+                str(obj),
+                seconds,
+                vertices,
+                primitives,
+            ]
+        else:
+            cost[1] += seconds
+            cost[2] += vertices
+            cost[3] += primitives
+
+    def object_report(self, top=10):
+        """
+        Find the objects that cost the most time over the frames in the ring buffer
+        :param top: the number of objects to report, None for all of them
+        :return: list of dicts with the id, name, mean and max time per frame, total time,
+            number of frames the object was compiled or drawn in and its mean vertex and
+            primitive counts, most expensive first
+        """
+        frames = len(self.object_costs)
+        totals = {}
+        for frame_costs in self.object_costs:
+            for object_id, (name, seconds, vertices, primitives) in frame_costs.items():
+                total = totals.get(object_id)
+                if total is None:
+                    totals[object_id] = [
+                        name,
+                        seconds,
+                        seconds,
+                        1,
+                        vertices,
+                        primitives,
+                    ]
+                else:
+                    total[1] += seconds
+                    total[2] = max(total[2], seconds)
+                    total[3] += 1
+                    total[4] += vertices
+                    total[5] += primitives
+
+        report = [
+            {
+                "id": object_id,
+                "name": name,
+                "time": {
+                    "mean": seconds / frames,
+                    "max": max_seconds,
+                    "total": seconds,
+                },
+                "frames": count,
+                "vertices": vertices / count,
+                "primitives": primitives / count,
+            }
+            for object_id, (
+                name,
+                seconds,
+                max_seconds,
+                count,
+                vertices,
+                primitives,
+            ) in totals.items()
+        ]
+        report.sort(key=lambda entry: entry["time"]["total"], reverse=True)
+        return report if top is None else report[:top]
+
+    def get_fps(self, frames=10):
+        """
+        Get the average fps of the last frames
+        :param frames: the number of frames to average over
+        :return: the fps, 0 before the first frame
+        """
+        frames = min(frames, self.frame_count, self.size)
+        if frames == 0:
+            return 0.0
+
+        rows = (self.frame_count - 1 - np.arange(frames)) % self.size
+        return float(frames / self.frame_times[rows].sum())
+
+    def summary(self):
+        """
+        Summarize the frames in the ring buffer
+        :return: dict with the frame count, the average fps and the mean, max and last value of
+            the frame time, every stage time and every counter, times are in seconds
+        """
+        frames = min(self.frame_count, self.size)
+        if frames == 0:
+            return {
+                "frames": 0,
+                "fps": 0.0,
+                "frame_time": {},
+                "stages": {},
+                "counters": {},
+            }
+
+        last = (self.frame_count - 1) % self.size
+
+        def describe(values):
+            return {
+                "mean": float(values[:frames].mean()),
+                "max": float(values[:frames].max()),
+                "last": values[last].item(),
+            }
+
+        total_time = self.frame_times[:frames].sum()
+        return {
+            "frames": self.frame_count,
+            "fps": float(frames / total_time) if total_time > 0 else 0.0,
+            "frame_time": describe(self.frame_times),
+            "stages": {
+                name: describe(self.stage_times[:, i])
+                for i, name in enumerate(stage_names)
+            },
+            "counters": {
+                name: describe(self.counters[:, i])
+                for i, name in enumerate(counter_names)
+            },
+        }
+
+    def get_overlay(self):
+        """
+        Render the summary as text to draw over the frame
+        :return: a pygame surface with the text on a white background
+        """
+        if self._font is None:
+            self._font = pygame.font.Font(None, 20)
+
+        summary = self.summary()
+        lines = [f"fps {summary['fps']:.1f}"]
+        if summary["frames"]:
+            lines[0] += f"  frame {summary['frame_time']['mean'] * 1000:.2f} ms"
+            for name, values in summary["stages"].items():
+                if values["mean"] > 0:
+                    lines.append(f"{name} {values['mean'] * 1000:.2f} ms")
+            for kind in ("objects", "faces", "vertices"):
+                counters = summary["counters"]
+                lines.append(
+                    f"{kind} {counters[kind + '_drawn']['last']} drawn, "
+                    f"{counters[kind + '_culled']['last']} culled"
+                )
+
+        texts = [self._font.render(line, True, (0, 0, 0)) for line in lines]
+        line_height = self._font.get_linesize()
+        overlay = pygame.Surface(
+            (max(text.get_width() for text in texts) + 8, line_height * len(texts) + 8)
+        )
+        overlay.fill((255, 255, 255))
+        for i, text in enumerate(texts):
+            overlay.blit(text, (4, 4 + i * line_height))
+
+        return overlay
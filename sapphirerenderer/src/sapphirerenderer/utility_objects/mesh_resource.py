@@ -0,0 +1,75 @@
+import numpy as np
+from .packed_faces import PackedFaces
+from ..point_math.bounding_sphere import bounding_sphere
+from ..object_classes.flat_faces_object import get_face_windings
+
+
+class MeshResource:
+    def __init__(self, vertices, faces, windings=None):
+        """
+        Mesh that does not change, shared by every instance drawn with it. The arrays are made read only,
+        copy them to build a changed mesh
+        :param vertices: (v, 3) vertices of the mesh
+        :param faces: the PackedFaces of the mesh, the normals are in the frame of the vertices
+        :param windings: (f,) int8 windings of the faces, None to find them from the vertices and normals
+        """
+        self.vertices = np.array(vertices, dtype=float)
+        self.faces = faces
+        if windings is None:
+            windings = get_face_windings(faces, self.vertices)
+        self.windings = np.array(windings, dtype=np.int8)
+        self.bounding_sphere = bounding_sphere(self.vertices)
+
+        for array in (
+            self.vertices,
+            self.windings,
+            faces.offsets,
+            faces.indices,
+            faces.colors,
+            faces.normals,
+        ):
+            array.flags.writeable = False
+
+    @classmethod
+    def from_object(cls, obj):
+        """
+        Take the mesh of a flat faces object as it is now, around its position and with its rotation and scale
+        :param obj: the flat faces object
+        :return: the mesh
+        """
+        packed_faces = obj.get_packed_faces()
+        # turn the normals with the object, like its shading does
+        faces = PackedFaces(
+            packed_faces.offsets.copy(),
+            packed_faces.indices.copy(),
+            packed_faces.colors,
+            np.dot(packed_faces.normals, obj.negative_rotation_matrix),
+        )
+        return cls(
+            np.asarray(obj.vertices, dtype=float) - obj.position,
+            faces,
+            obj.get_face_windings(),
+        )
+
+    def __len__(self):
+        return len(self.faces)
+
+    def get_info(self):
+        """
+        :return: dict with the number of vertices, faces and bytes of the mesh
+        """
+        return {
+            "vertices": len(self.vertices),
+            "faces": len(self.faces),
+            "bytes": sum(
+                array.nbytes
+                for array in (
+                    self.vertices,
+                    self.windings,
+                    self.faces.offsets,
+                    self.faces.indices,
+                    self.faces.colors,
+                    self.faces.normals,
+                )
+            ),
+        }
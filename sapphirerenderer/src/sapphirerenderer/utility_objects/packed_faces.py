@@ -0,0 +1,84 @@
+import numpy as np
+
+
+class PackedFaces:
+    def __init__(self, offsets, indices, colors, normals=None):
+        """
+        Faces of a mesh stored as flat numpy arrays instead of a list of tuples
+        :param offsets: int array of length face_count + 1, face i uses indices[offsets[i]:offsets[i + 1]]
+        :param indices: int array of vertex indices for all faces
+        :param colors: (face_count, 3) array of face colors
+        :param normals: (face_count, 3) array of face normals, rows of nan mean the face has no normal
+        """
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int64)
+        self.colors = np.clip(np.asarray(colors, dtype=float), 0, 255).astype(np.uint8)
+
+        if normals is None:
+            normals = np.full((len(self.offsets) - 1, 3), np.nan)
+        self.normals = np.asarray(normals, dtype=float)
+
+    @classmethod
+    def from_faces(cls, faces, default_color=(0, 0, 0)):
+        """
+        Pack a list of faces in the (indices, color, normal) tuple format
+        :param faces: the faces to pack, color and normal are optional
+        :param default_color: the color to use for faces without one
+        :return: the packed faces
+        """
+        face_count = len(faces)
+        offsets = np.zeros(face_count + 1, dtype=np.int64)
+        colors = np.empty((face_count, 3), dtype=float)
+        normals = np.full((face_count, 3), np.nan)
+        indices = []
+
+        for i, face in enumerate(faces):
+            indices.extend(face[0])
+            offsets[i + 1] = offsets[i] + len(face[0])
+            colors[i] = face[1] if len(face) > 1 else default_color
+            if len(face) > 2 and face[2] is not None:
+                normals[i] = face[2]
+
+        return cls(offsets, np.array(indices, dtype=np.int64), colors, normals)
+
+    @classmethod
+    def from_polygons(cls, polygons, colors, normals=None):
+        """
+        Pack faces that all have the same number of vertices
+        :param polygons: (face_count, n) array of vertex indices
+        :param colors: (face_count, 3) array of colors or a single color for every face
+        :param normals: optional (face_count, 3) array of face normals
+        :return: the packed faces
+        """
+        polygons = np.asarray(polygons, dtype=np.int64)
+        face_count, width = polygons.shape
+        offsets = np.arange(face_count + 1, dtype=np.int64) * width
+        colors = np.broadcast_to(np.asarray(colors, dtype=float), (face_count, 3))
+        return cls(offsets, polygons.reshape(-1), colors, normals)
+
+    def face_sizes(self):
+        return np.diff(self.offsets)
+
+    def has_normals(self):
+        return ~np.isnan(self.normals).any(axis=1)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        """
+        Get a face in the (indices, color, normal) tuple format
+        :param index: the index of the face
+        :return: the face tuple, the normal is None if the face has none
+        """
+        start, end = self.offsets[index], self.offsets[index + 1]
+        normal = self.normals[index]
+        return (
+            self.indices[start:end].tolist(),
+            tuple(self.colors[index].tolist()),
+            None if np.isnan(normal).any() else normal,
+        )
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
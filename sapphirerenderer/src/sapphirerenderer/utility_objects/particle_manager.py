@@ -4,6 +4,13 @@ from ..main import SapphireRenderer
 
 class ParticleManager:
     def __init__(self, parent_object, renderer: SapphireRenderer, hide_parent=True):
+        """
+        Adds copies of an object to the scene as particles, every particle is an object of its own.
+        For many small particles use the Particles object, which keeps them all in one object
+        :param parent_object: the object to copy, it needs a copy method
+        :param renderer: the renderer to add the particles to
+        :param hide_parent: whether to hide the parent object
+        """
         self.particles = []
         self.parent_object = parent_object
         self.renderer = renderer
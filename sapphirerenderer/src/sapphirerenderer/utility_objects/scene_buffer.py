@@ -0,0 +1,552 @@
+import numpy as np
+import numba
+import pygame
+from time import perf_counter
+from ..point_math.project_point import project_points_into
+from ..point_math.cull_faces import cull_faces
+from .depth_sorter import DepthSorter
+from .frame_stats import FrameStats
+from .tracer import tracer
+from ..point_math.rasterize import (
+    rasterize_faces,
+    triangulate_faces,
+    bin_triangles,
+    rasterize_tiles,
+)
+from ..object_classes.flat_faces_object import get_selected_face_distances
+
+
+def fit_array(array, length):
+    """
+    Get an array with room for at least length rows, growing geometrically so reallocations are rare
+    :param array: the current array
+    :param length: the number of rows needed
+    :return: the same array if it is big enough, otherwise a new uninitialized one
+    """
+    if len(array) >= length:
+        return array
+    return np.empty((max(length, 2 * len(array)),) + array.shape[1:], dtype=array.dtype)
+
+
+class SceneBuffer:
+    def __init__(
+        self, tile_size=64, threads=0, face_culling=True, min_face_area=0, stats=None
+    ):
+        """
+        Persistent packed vertices and faces of every compiled object in the scene.
+        Each object owns a slice of the arrays, only objects whose version changed are rewritten.
+        :param tile_size: the size in pixels of the screen tiles of the tiled backend
+        :param threads: the number of threads of the tiled backend, 0 uses every core
+        :param face_culling: whether to drop back facing and sub pixel faces before drawing
+        :param min_face_area: faces with a smaller projected area in pixels are dropped
+        :param stats: the frame stats to record timings and counts in
+        """
+        self.tile_size = tile_size
+        self.threads = threads
+        self.face_culling = face_culling
+        self.min_face_area = min_face_area
+        self.stats = stats if stats is not None else FrameStats()
+
+        self.objects = []
+        self.slots = {}
+
+        self.vertex_starts = np.zeros(0, dtype=np.int64)
+        self.vertex_counts = np.zeros(0, dtype=np.int64)
+        self.face_starts = np.zeros(0, dtype=np.int64)
+        self.face_counts = np.zeros(0, dtype=np.int64)
+
+        self.vertex_count = 0
+        self.face_count = 0
+
+        self.vertices = np.empty((0, 3), dtype=float)
+        self.face_offsets = np.zeros(1, dtype=np.int64)
+        self.face_indices = np.empty(0, dtype=np.int64)
+        self.face_colors = np.empty((0, 3), dtype=np.uint8)
+        self.face_normals = np.empty((0, 3), dtype=float)
+        self.face_windings = np.empty(0, dtype=np.int8)
+        self.face_objects = np.empty(0, dtype=np.int64)
+        self.shaded_colors = np.empty((0, 3), dtype=np.int64)
+
+        self._geometry_keys = []
+        self._versions = []
+        self._shading_keys = []
+        self._layout_generation = 0
+
+        self.face_sorter = DepthSorter()
+
+        self._offset_list = [0]
+        self._index_list = []
+        self._color_list = []
+
+        # slots that are shown and inside the view frustum this frame
+        self.visible_objects = np.zeros(0, dtype=bool)
+
+        # per frame scratch arrays, reused between frames
+        self._projected_vertices = np.zeros((0, 2), dtype=float)
+        self._visible_vertices = np.empty(0, dtype=np.bool_)
+        self._point_sizes = np.empty(0, dtype=float)
+        self._depths = np.empty(0, dtype=float)
+
+        self.color_buffer = np.empty((0, 0, 3), dtype=np.uint8)
+        self.depth_buffer = np.empty((0, 0), dtype=float)
+
+    def sync(self, objects, camera=None, far_distance=None):
+        """
+        Bring the buffer up to date with the compiled objects of the scene
+        :param objects: the objects to compile, their order does not matter
+        :param camera: objects outside the view of this camera are skipped, None to keep all
+        :param far_distance: objects further away than this are skipped, None for no limit
+        :return:
+        """
+        with self.stats.stage("compile"):
+            if self._needs_layout(objects):
+                self._layout(objects)
+
+            with self.stats.stage("culling"):
+                self.visible_objects = self._find_visible_objects(camera, far_distance)
+
+            # objects out of view keep their old vertices until they come back into view
+            for slot in np.flatnonzero(self.visible_objects).tolist():
+                obj = self.objects[slot]
+
+                if obj.version != self._versions[slot]:
+                    self._write_object(slot, obj)
+                elif (obj.shadow, obj.shadow_effect) != self._shading_keys[slot]:
+                    self._shade_object(slot, obj)
+
+    def _find_visible_objects(self, camera, far_distance):
+        """
+        Find the slots that are shown and whose bounding sphere is in view
+        :param camera: the camera to test against, None to only check if objects are hidden
+        :param far_distance: objects further away than this are out of view
+        :return: bool array with an entry per slot
+        """
+        visible = np.array([not obj.is_hidden() for obj in self.objects], dtype=bool)
+        if camera is None or not visible.any():
+            return visible
+
+        slots = np.flatnonzero(visible)
+        spheres = [self.objects[slot].get_bounding_sphere() for slot in slots]
+        visible[slots] = camera.spheres_in_view(
+            [sphere[0] for sphere in spheres],
+            [sphere[1] for sphere in spheres],
+            far_distance,
+        )
+        return visible
+
+    def _needs_layout(self, objects):
+        if len(objects) != len(self.objects):
+            return True
+
+        for obj in objects:
+            slot = self.slots.get(id(obj))
+            if slot is None or self.objects[slot] is not obj:
+                return True
+            if self._geometry_keys[slot] != self._geometry_key(obj):
+                return True
+
+        return False
+
+    @staticmethod
+    def _geometry_key(obj):
+        return (
+            obj.get_primitive_counts()[0],
+            obj.get_face_layout(),
+            obj.back_face_culling,
+        )
+
+    def _layout(self, objects):
+        """
+        Assign every object a slice of the buffer and pack the faces of all objects together
+        :param objects: the objects to compile
+        :return:
+        """
+        # keep objects that are already in the buffer in their old order so slices stay stable
+        current = {id(obj) for obj in objects}
+        kept = [obj for obj in self.objects if id(obj) in current]
+        kept_ids = {id(obj) for obj in kept}
+        self.objects = kept + [obj for obj in objects if id(obj) not in kept_ids]
+        self.slots = {id(obj): slot for slot, obj in enumerate(self.objects)}
+
+        self._geometry_keys = [self._geometry_key(obj) for obj in self.objects]
+        layouts = [key[1] for key in self._geometry_keys]
+
+        self.vertex_counts = np.array(
+            [key[0] for key in self._geometry_keys], dtype=np.int64
+        )
+        self.face_counts = np.array([layout[1] for layout in layouts], dtype=np.int64)
+        self.vertex_starts = np.concatenate(([0], np.cumsum(self.vertex_counts)[:-1]))
+        self.face_starts = np.concatenate(([0], np.cumsum(self.face_counts)[:-1]))
+        self.vertex_starts = self.vertex_starts.astype(np.int64)
+        self.face_starts = self.face_starts.astype(np.int64)
+        self.vertex_count = int(self.vertex_counts.sum())
+        self.face_count = int(self.face_counts.sum())
+        index_count = sum(layout[2] for layout in layouts)
+
+        self.vertices = fit_array(self.vertices, self.vertex_count)
+        self.face_offsets = fit_array(self.face_offsets, self.face_count + 1)
+        self.face_indices = fit_array(self.face_indices, index_count)
+        self.face_colors = fit_array(self.face_colors, self.face_count)
+        self.face_normals = fit_array(self.face_normals, self.face_count)
+        self.face_windings = fit_array(self.face_windings, self.face_count)
+        self.face_objects = fit_array(self.face_objects, self.face_count)
+        self.shaded_colors = fit_array(self.shaded_colors, self.face_count)
+
+        self.face_offsets[0] = 0
+        index_start = 0
+        for slot, layout in enumerate(layouts):
+            face_start = self.face_starts[slot]
+            face_end = face_start + self.face_counts[slot]
+            index_end = index_start + layout[2]
+
+            indices = self.face_indices[index_start:index_end]
+            offsets = self.face_offsets[face_start + 1 : face_end + 1]
+            self.objects[slot].write_faces(
+                indices,
+                offsets,
+                self.face_colors[face_start:face_end],
+                self.face_normals[face_start:face_end],
+            )
+            indices += self.vertex_starts[slot]
+            offsets += index_start
+            self.face_objects[face_start:face_end] = slot
+
+            index_start = index_end
+
+        self._offset_list = self.face_offsets[: self.face_count + 1].tolist()
+        self._index_list = self.face_indices[:index_start].tolist()
+        self._color_list = [None] * self.face_count
+
+        self._versions = [None] * len(self.objects)
+        self._shading_keys = [None] * len(self.objects)
+        self._layout_generation += 1
+        self.face_sorter.reset()
+        for slot, obj in enumerate(self.objects):
+            self._write_object(slot, obj)
+
+    def _write_object(self, slot, obj):
+        """
+        Copy the vertices of an object into its slice of the buffer
+        :param slot: the slot of the object
+        :param obj: the object
+        :return:
+        """
+        # read the version first so a change made while copying is picked up next frame
+        version = obj.version
+
+        # compiled objects are drawn together, copying them in is the part of drawing done per object
+        with tracer.span("write " + str(obj), "object"):
+            write_start = perf_counter()
+            obj.drawing = True
+            obj.wait_for_ambiguous()
+
+            start = self.vertex_starts[slot]
+            obj.write_vertices(self.vertices[start : start + self.vertex_counts[slot]])
+
+            # the windings flip when the object is mirrored, so they are written with the vertices
+            face_start = self.face_starts[slot]
+            face_end = face_start + self.face_counts[slot]
+            if obj.back_face_culling:
+                self.face_windings[face_start:face_end] = obj.get_face_windings()
+            else:
+                self.face_windings[face_start:face_end] = 0
+
+            self._shade_object(slot, obj)
+
+            obj.drawing = False
+        self._versions[slot] = version
+        self.stats.add_object_cost(obj, perf_counter() - write_start)
+
+    def _shade_object(self, slot, obj):
+        """
+        Compute the shaded face colors of an object from its face normals and rotation
+        :param slot: the slot of the object
+        :param obj: the object
+        :return:
+        """
+        with self.stats.stage("shading"):
+            start = self.face_starts[slot]
+            end = start + self.face_counts[slot]
+            colors = self.face_colors[start:end]
+
+            if obj.shadow:
+                self.shaded_colors[start:end] = obj.get_shaded_colors(
+                    colors, self.face_normals[start:end]
+                )
+            else:
+                self.shaded_colors[start:end] = colors
+
+            self._color_list[start:end] = self.shaded_colors[start:end].tolist()
+            self._shading_keys[slot] = (obj.shadow, obj.shadow_effect)
+
+    def draw(self, surface, camera, display_size, backend="painter"):
+        """
+        Draw all faces of the objects found visible by the last sync
+        :param surface: the pygame surface to draw on
+        :param camera: the camera to draw from
+        :param display_size: the size of the display
+        :param backend: "painter" to sort faces and draw them back to front,
+            "zbuffer" to rasterize them with a depth buffer, "tiled" to rasterize screen tiles in parallel
+        :return:
+        """
+        if len(self.visible_objects) == 0:
+            return
+
+        start = perf_counter()
+        drawn_faces = self._draw_faces(surface, camera, display_size, backend)
+        self._attribute_costs(perf_counter() - start, drawn_faces)
+
+    def _draw_faces(self, surface, camera, display_size, backend):
+        """
+        Project, cull and draw the faces of the visible objects
+        :param surface: the pygame surface to draw on
+        :param camera: the camera to draw from
+        :param display_size: the size of the display
+        :param backend: the backend to draw with, see draw
+        :return: the indices of the faces that were drawn
+        """
+        visible_faces = np.flatnonzero(
+            self.visible_objects[self.face_objects[: self.face_count]]
+        )
+        visible_vertices = int(self.vertex_counts[self.visible_objects].sum())
+
+        self.stats.count("faces_submitted", self.face_count)
+        self.stats.count("vertices_submitted", self.vertex_count)
+        self.stats.count("vertices_culled", self.vertex_count - visible_vertices)
+        self.stats.count("vertices_drawn", visible_vertices)
+
+        if len(visible_faces) > 0:
+            with self.stats.stage("projection"):
+                self._project(camera, display_size)
+
+            if self.face_culling:
+                with self.stats.stage("culling"):
+                    visible_faces = cull_faces(
+                        visible_faces,
+                        self.face_offsets,
+                        self.face_indices,
+                        self.face_windings,
+                        self._projected_vertices,
+                        self._visible_vertices,
+                        self.min_face_area,
+                    )
+
+        self.stats.count("faces_culled", self.face_count - len(visible_faces))
+        self.stats.count("faces_drawn", len(visible_faces))
+        if len(visible_faces) == 0:
+            return visible_faces
+
+        with self.stats.stage("draw"):
+            if backend == "zbuffer":
+                self._draw_zbuffer(surface, visible_faces)
+            elif backend == "tiled":
+                self._draw_tiled(surface, visible_faces)
+            else:
+                self._draw_painter(surface, camera, visible_faces)
+
+        return visible_faces
+
+    def _attribute_costs(self, seconds, drawn_faces):
+        """
+        Share the time spent drawing the compiled objects among the visible ones by their number of faces
+        :param seconds: the time spent drawing
+        :param drawn_faces: the indices of the faces that were drawn
+        :return:
+        """
+        slots = np.flatnonzero(self.visible_objects)
+        if len(slots) == 0:
+            return
+
+        face_counts = self.face_counts[slots]
+        total_faces = face_counts.sum()
+        if total_faces > 0:
+            shares = seconds * face_counts / total_faces
+        else:
+            shares = np.full(len(slots), seconds / len(slots))
+
+        drawn_counts = np.bincount(
+            self.face_objects[drawn_faces], minlength=len(self.visible_objects)
+        )[slots]
+
+        for slot, share, vertices, faces in zip(
+            slots.tolist(),
+            shares.tolist(),
+            self.vertex_counts[slots].tolist(),
+            drawn_counts.tolist(),
+        ):
+            self.stats.add_object_cost(self.objects[slot], share, vertices, faces)
+
+    def _project(self, camera, display_size):
+        """
+        Project the vertices of visible objects into the reused scratch arrays
+        :param camera: the camera to project with
+        :param display_size: the size of the display
+        :return:
+        """
+        self._projected_vertices = fit_array(
+            self._projected_vertices, self.vertex_count
+        )
+        self._visible_vertices = fit_array(self._visible_vertices, self.vertex_count)
+        self._point_sizes = fit_array(self._point_sizes, self.vertex_count)
+        self._depths = fit_array(self._depths, self.vertex_count)
+
+        # project runs of neighbouring visible objects together, culled objects are skipped
+        visible_slots = np.flatnonzero(self.visible_objects)
+        run_breaks = np.flatnonzero(np.diff(visible_slots) != 1) + 1
+        for run in np.split(visible_slots, run_breaks):
+            start = self.vertex_starts[run[0]]
+            end = self.vertex_starts[run[-1]] + self.vertex_counts[run[-1]]
+
+            project_points_into(
+                self.vertices[start:end],
+                np.asarray(camera.position, dtype=float),
+                camera.rotation_matrix,
+                camera.offset_array,
+                camera.focal_length,
+                np.asarray(display_size, dtype=float),
+                camera.fov_side,
+                camera.fov_top,
+                self._projected_vertices[start:end],
+                self._visible_vertices[start:end],
+                self._point_sizes[start:end],
+                self._depths[start:end],
+            )
+
+    def _draw_painter(self, surface, camera, visible_faces):
+        """
+        Sort faces by distance and draw them back to front with pygame
+        :param surface: the pygame surface to draw on
+        :param camera: the camera to draw from
+        :param visible_faces: the indices of the faces to draw
+        :return:
+        """
+        camera_position = np.asarray(camera.position, dtype=float)
+
+        def get_face_distances(faces):
+            return get_selected_face_distances(
+                faces,
+                self.face_offsets,
+                self.face_indices,
+                self.vertices,
+                camera_position,
+            )
+
+        # the faces only move relative to each other when the camera or an object changed
+        state = (
+            tuple(camera_position),
+            tuple(camera.rotation_matrix.ravel()),
+            self._layout_generation,
+            tuple(self._versions),
+            self.visible_objects.tobytes(),
+        )
+
+        # sort visible faces in descending order of distance
+        with self.stats.stage("face_sort"):
+            sorted_faces = self.face_sorter.sort(
+                visible_faces, get_face_distances, self.face_count, state
+            )
+
+        points = self._projected_vertices[: self.vertex_count].tolist()
+        visible = self._visible_vertices[: self.vertex_count].tolist()
+        offsets = self._offset_list
+        indices = self._index_list
+        colors = self._color_list
+
+        for face in sorted_faces.tolist():
+            valid_verts = [
+                points[vertex]
+                for vertex in indices[offsets[face] : offsets[face + 1]]
+                if visible[vertex]
+            ]
+            if len(valid_verts) < 3:
+                continue
+
+            pygame.draw.polygon(surface, colors[face], valid_verts)
+
+    def _draw_zbuffer(self, surface, visible_faces):
+        """
+        Rasterize faces into a numpy color buffer with a depth test and blit it in one call
+        :param surface: the pygame surface to draw on
+        :param visible_faces: the indices of the faces to draw
+        :return:
+        """
+        self._fit_frame_buffers(surface.get_size())
+        self.color_buffer.fill(255)
+        self.depth_buffer.fill(0)
+
+        rasterize_faces(
+            visible_faces,
+            self.face_offsets[: self.face_count + 1],
+            self.face_indices,
+            self.shaded_colors,
+            self._projected_vertices,
+            self._visible_vertices,
+            self._depths,
+            self.color_buffer,
+            self.depth_buffer,
+        )
+
+        self._blit(surface)
+
+    def _draw_tiled(self, surface, visible_faces):
+        """
+        Bin triangles into screen tiles and rasterize the tiles on all cores without holding the GIL
+        :param surface: the pygame surface to draw on
+        :param visible_faces: the indices of the faces to draw
+        :return:
+        """
+        size = surface.get_size()
+        self._fit_frame_buffers(size)
+
+        if self.threads > 0:
+            numba.set_num_threads(min(self.threads, numba.config.NUMBA_NUM_THREADS))
+
+        tiles_x = -(-size[0] // self.tile_size)
+        tiles_y = -(-size[1] // self.tile_size)
+
+        triangles, triangle_faces = triangulate_faces(
+            visible_faces,
+            self.face_offsets[: self.face_count + 1],
+            self.face_indices,
+            self._visible_vertices,
+        )
+        tile_offsets, tile_triangles = bin_triangles(
+            triangles, self._projected_vertices, self.tile_size, tiles_x, tiles_y
+        )
+        rasterize_tiles(
+            triangles,
+            triangle_faces,
+            tile_offsets,
+            tile_triangles,
+            self.tile_size,
+            tiles_x,
+            self.shaded_colors,
+            self._projected_vertices,
+            self._depths,
+            self.color_buffer,
+            self.depth_buffer,
+        )
+
+        self._blit(surface)
+
+    def _blit(self, surface):
+        """
+        Copy the color buffer to the surface, only inside its clip area like other drawing does
+        :param surface: the pygame surface to draw on
+        :return:
+        """
+        clip = surface.get_clip()
+        pygame.surfarray.blit_array(
+            surface.subsurface(clip),
+            self.color_buffer[clip.left : clip.right, clip.top : clip.bottom],
+        )
+
+    def _fit_frame_buffers(self, size):
+        """
+        Make sure the color and depth buffers match the surface size
+        :param size: the size of the surface
+        :return:
+        """
+        if self.color_buffer.shape[:2] != size:
+            self.color_buffer = np.empty(size + (3,), dtype=np.uint8)
+            self.depth_buffer = np.empty(size, dtype=float)
@@ -0,0 +1,133 @@
+import numpy as np
+from multiprocessing import shared_memory
+from .depth_sorter import DepthSorter
+from .scene_buffer import SceneBuffer
+
+# the arrays a scene buffer needs to draw, copied into shared memory
+shared_array_names = (
+    "vertices",
+    "face_offsets",
+    "face_indices",
+    "face_windings",
+    "face_objects",
+    "shaded_colors",
+    "vertex_starts",
+    "vertex_counts",
+    "face_starts",
+    "face_counts",
+    "sphere_centers",
+    "sphere_radii",
+    "hidden",
+)
+
+
+def share_scene_buffer(scene_buffer):
+    """
+    Copy the arrays of a synced scene buffer into a single block of shared memory
+    :param scene_buffer: the scene buffer to share, every object must have been written by sync
+    :return: (the shared memory block, layout of the arrays for SharedSceneBuffer), the caller unlinks the block
+    """
+    index_count = int(scene_buffer.face_offsets[scene_buffer.face_count])
+    spheres = [obj.get_bounding_sphere() for obj in scene_buffer.objects]
+
+    arrays = {
+        "vertices": scene_buffer.vertices[: scene_buffer.vertex_count],
+        "face_offsets": scene_buffer.face_offsets[: scene_buffer.face_count + 1],
+        "face_indices": scene_buffer.face_indices[:index_count],
+        "face_windings": scene_buffer.face_windings[: scene_buffer.face_count],
+        "face_objects": scene_buffer.face_objects[: scene_buffer.face_count],
+        "shaded_colors": scene_buffer.shaded_colors[: scene_buffer.face_count],
+        "vertex_starts": scene_buffer.vertex_starts,
+        "vertex_counts": scene_buffer.vertex_counts,
+        "face_starts": scene_buffer.face_starts,
+        "face_counts": scene_buffer.face_counts,
+        # objects without a bounding sphere are never culled
+        "sphere_centers": np.array(
+            [(0, 0, 0) if sphere is None else sphere[0] for sphere in spheres],
+            dtype=float,
+        ).reshape(-1, 3),
+        "sphere_radii": np.array(
+            [np.inf if sphere is None else sphere[1] for sphere in spheres],
+            dtype=float,
+        ),
+        "hidden": np.array([obj.is_hidden() for obj in scene_buffer.objects]),
+    }
+
+    layout = []
+    offset = 0
+    for name in shared_array_names:
+        array = np.ascontiguousarray(arrays[name])
+        # keep every array aligned to 8 bytes
+        offset = -(-offset // 8) * 8
+        layout.append((name, array.dtype.str, array.shape, offset))
+        offset += array.nbytes
+
+    block = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+    for name, dtype, shape, offset in layout:
+        np.ndarray(shape, dtype=dtype, buffer=block.buf, offset=offset)[...] = arrays[
+            name
+        ]
+
+    return block, layout
+
+
+class SharedSceneBuffer(SceneBuffer):
+    def __init__(
+        self,
+        block_name,
+        layout,
+        tile_size=64,
+        threads=0,
+        face_culling=True,
+        min_face_area=0,
+        stats=None,
+    ):
+        """
+        Read only scene buffer whose arrays live in shared memory made by share_scene_buffer,
+        lets other processes draw a static scene without copying or pickling its geometry
+        :param block_name: the name of the shared memory block
+        :param layout: the layout returned by share_scene_buffer
+        :param tile_size: the size in pixels of the screen tiles of the tiled backend
+        :param threads: the number of threads of the tiled backend, 0 uses every core
+        :param face_culling: whether to drop back facing and sub pixel faces before drawing
+        :param min_face_area: faces with a smaller projected area in pixels are dropped
+        :param stats: the frame stats to record timings and counts in
+        """
+        super().__init__(tile_size, threads, face_culling, min_face_area, stats)
+
+        self.block = shared_memory.SharedMemory(name=block_name)
+        for name, dtype, shape, offset in layout:
+            setattr(
+                self,
+                name,
+                np.ndarray(shape, dtype=dtype, buffer=self.block.buf, offset=offset),
+            )
+
+        self.vertex_count = len(self.vertices)
+        self.face_count = len(self.face_objects)
+
+        self._offset_list = self.face_offsets.tolist()
+        self._index_list = self.face_indices.tolist()
+        self._color_list = self.shaded_colors.tolist()
+        self._versions = [0] * len(self.hidden)
+        self.face_sorter = DepthSorter()
+
+    def sync(self, objects=None, camera=None, far_distance=None):
+        """
+        The geometry can not change, only find the objects in view of the camera
+        :param objects: ignored, the objects are the ones the buffer was shared with
+        :param camera: objects outside the view of this camera are skipped, None to keep all
+        :param far_distance: objects further away than this are skipped, None for no limit
+        :return:
+        """
+        with self.stats.stage("culling"):
+            visible = ~self.hidden
+            if camera is not None and visible.any():
+                visible &= camera.spheres_in_view(
+                    self.sphere_centers, self.sphere_radii, far_distance
+                )
+            self.visible_objects = visible
+
+    def _attribute_costs(self, seconds, drawn_faces):
+        # the objects live in the process that shared the buffer, there is nothing to attribute to
+        pass
@@ -0,0 +1,150 @@
+import os
+import json
+import threading
+from collections import deque
+from functools import wraps
+from time import perf_counter
+
+
+class Tracer:
+    def __init__(self, max_events=100000):
+        """
+        Records spans of time from every thread and saves them as Chrome trace events,
+        open the file in chrome://tracing or ui.perfetto.dev. Nothing is recorded until it is enabled
+        :param max_events: the number of spans to keep, the oldest are dropped first
+        """
+        self.enabled = False
+        self.events = deque(maxlen=max_events)
+        self.thread_names = {}
+
+    def enable(self, max_events=None):
+        """
+        Start recording spans
+        :param max_events: change the number of spans to keep, None to keep the current size
+        :return:
+        """
+        if max_events is not None and max_events != self.events.maxlen:
+            self.events = deque(self.events, maxlen=max_events)
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def clear(self):
+        self.events.clear()
+
+    def add_span(self, name, start, end, category="render", args=None):
+        """
+        Record a span that already ended
+        :param name: the name of the span
+        :param start: perf_counter time the span started
+        :param end: perf_counter time the span ended
+        :param category: the category of the span
+        :param args: optional dict shown with the span
+        :return:
+        """
+        if not self.enabled:
+            return
+
+        thread = threading.current_thread()
+        self.thread_names[thread.ident] = thread.name
+        self.events.append((name, category, start, end, thread.ident, args))
+
+    def span(self, name, category="render", args=None):
+        """
+        Record a span around a block of code: with tracer.span("draw"):
+        :param name: the name of the span
+        :param category: the category of the span
+        :param args: optional dict shown with the span
+        :return: the context manager
+        """
+        return _Span(self, name, category, args)
+
+    def get_trace(self):
+        """
+        Get the recorded spans in the Chrome trace event format
+        :return: dict that can be saved as json
+        """
+        pid = os.getpid()
+        trace_events = [
+            {
+                "name": "thread_name",
+                "ph": "M",
+                "pid": pid,
+                "tid": tid,
+                "args": {"name": name},
+            }
+            for tid, name in list(self.thread_names.items())
+        ]
+
+        for name, category, start, end, tid, args in list(self.events):
+            event = {
+                "name": name,
+                "cat": category,
+                "ph": "X",
+                "ts": start * 1e6,
+                "dur": (end - start) * 1e6,
+                "pid": pid,
+                "tid": tid,
+            }
+            if args:
+                event["args"] = args
+            trace_events.append(event)
+
+        return {"traceEvents": trace_events, "displayTimeUnit": "ms"}
+
+    def save(self, path):
+        """
+        Save the recorded spans as a Chrome trace event json file
+        :param path: the path of the file
+        :return:
+        """
+        with open(path, "w") as file:
+            json.dump(self.get_trace(), file)
+
+
+class _Span:
+    __slots__ = ("tracer", "name", "category", "args", "start")
+
+    def __init__(self, tracer, name, category, args):
+        self.tracer = tracer
+        self.name = name
+        self.category = category
+        self.args = args
+
+    def __enter__(self):
+        self.start = perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        self.tracer.add_span(
+            self.name, self.start, perf_counter(), self.category, self.args
+        )
+
+
+# the tracer every part of the renderer records to
+tracer = Tracer()
+
+
+def traced(function):
+    """
+    Decorator that records a span around every call of an object method while tracing is enabled
+    :param function: the method to trace
+    :return: the traced method
+    """
+    name = function.__name__
+
+    @wraps(function)
+    def wrapper(self, *args, **kwargs):
+        if not tracer.enabled:
+            return function(self, *args, **kwargs)
+
+        start = perf_counter()
+        try:
+            return function(self, *args, **kwargs)
+        finally:
+            tracer.add_span(
+                name, start, perf_counter(), "mutation", {"object": str(self)}
+            )
+
+    return wrapper